@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Ball tracking - Ping Pong Scorer
+Optional analytics on the replay camera's frames: finds the ball in every
+frame the capture process writes to the ring, tracks it and sums each rally
+up as hits, average and peak ball speed and duration. The numbers are stored
+with the saved rally and go into /metrics.
+Frames are read in place from the shared ring and looked at every SCALE-th
+pixel, so a frame costs a few small NumPy array ops. The ball is the pixels
+that are both ball-coloured and changed since the last frame analysed. When
+analysis falls behind the capture it jumps to the newest frame, and if
+frames still take longer than the budget it analyses fewer of them.
+Needs numpy (pip3 install numpy); without it the tracker is simply off.
+"""
+import threading
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+SCALE = 4                  # analyse every 4th pixel in each direction
+BALL_COLOR = (255, 140, 0) # orange ball; a white one is (245, 245, 245)
+COLOR_TOLERANCE = 120      # summed |R-r| + |G-g| + |B-b|
+MOTION_THRESHOLD = 40      # summed channel change that counts as moved
+MIN_PIXELS = 2             # at SCALE; fewer is noise
+MAX_PIXELS = 400           # more is a shirt or a bat, not the ball
+MAX_GAP_S = 0.25           # lost the ball for longer: don't join the two sightings
+MIN_SPEED = 0.3            # frame widths per second; slower isn't a shot
+MAX_SPEED_MS = 35.0        # faster than any real shot: a jump to something else
+BUDGET = 0.5               # share of the capture frame interval analysis may use
+MAX_EVERY = 8
+
+# Speeds are in m/s assuming the table's length spans this much of the frame
+# width - set it for the camera
+TABLE_LENGTH_M = 2.74
+TABLE_SPAN = 0.8
+
+
+def available():
+    return np is not None
+
+
+class Rally:
+    """Running totals for one rally, updated per sighting"""
+
+    def __init__(self):
+        self.first = None   # time of the first and last sighting
+        self.last = None
+        self.hits = 0
+        self.direction = 0  # sign of the ball's last horizontal movement
+        self.speed_sum = 0.0
+        self.speeds = 0
+        self.peak = 0.0
+
+    def to_dict(self, m_per_px):
+        return {
+            "hits": self.hits,
+            "duration_s": round(self.last - self.first, 2) if self.first is not None else 0.0,
+            "avg_speed_ms": round(self.speed_sum / self.speeds * m_per_px, 2) if self.speeds else None,
+            "peak_speed_ms": round(self.peak * m_per_px, 2) if self.speeds else None,
+        }
+
+
+class BallTracker:
+    """Follows one FrameRing on a thread of its own"""
+
+    def __init__(self, ring):
+        self.ring = ring
+        self.height, self.width = ring.size[1], ring.size[0]
+        self.m_per_px = TABLE_LENGTH_M / (TABLE_SPAN * self.width)
+        ys, xs = np.mgrid[0:self.height:SCALE, 0:self.width:SCALE]
+        self.xs = xs.astype(np.float32)
+        self.ys = ys.astype(np.float32)
+        self.color = np.array(BALL_COLOR, dtype=np.int16)
+        self.previous = None    # last frame analysed, at SCALE
+        self.previous_t = None
+        self.sighting = None    # (time, x, y) of the last ball seen
+        self.rally = Rally()
+        self.last_rally = None
+        self.lock = threading.Lock()
+        self.every = 1          # analyse one frame in every
+        self.analysed = 0
+        self.skipped = 0
+        self.found = 0
+        self.rallies = 0
+        self.frame_ms = 0.0     # moving average
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._loop, name="ball-tracker", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=1)
+
+    def _loop(self):
+        last = self.ring.write_seq() - 1
+        interval = 1 / 30  # capture frame interval, until the ring's timestamps say otherwise
+        while not self.stop_event.is_set():
+            newest = self.ring.write_seq() - 1
+            if newest < last + self.every:
+                self.stop_event.wait(interval / 2)
+                continue
+            self.skipped += newest - last - 1  # behind: only the newest frame matters
+            t0 = time.perf_counter()
+            timestamp = self.ring.timestamp(newest)
+            if timestamp is not None:
+                if self.previous_t is not None and timestamp > self.previous_t:
+                    interval = 0.9 * interval + 0.1 * (timestamp - self.previous_t) / (newest - last)
+                self.analyse(newest, timestamp)
+            last = newest
+            spent = time.perf_counter() - t0
+            self.frame_ms = 0.9 * self.frame_ms + 0.1 * spent * 1000
+            # Over budget even on the newest frame: look at fewer frames
+            if spent > interval * BUDGET * self.every and self.every < MAX_EVERY:
+                self.every += 1
+            elif spent < interval * BUDGET * (self.every - 1) / 2 and self.every > 1:
+                self.every -= 1
+
+    def analyse(self, seq, timestamp):
+        view = self.ring.pixels(seq)
+        if view is None:
+            return
+        frame = np.frombuffer(view, dtype=np.uint8).reshape(self.height, self.width, 3)
+        small = frame[::SCALE, ::SCALE].astype(np.int16)
+        del frame, view
+        if not self.ring.is_valid(seq):
+            return  # overwritten while we read it
+        self.analysed += 1
+        previous, self.previous, self.previous_t = self.previous, small, timestamp
+        if previous is None:
+            return
+        mask = np.abs(small - self.color).sum(axis=2) < COLOR_TOLERANCE
+        mask &= np.abs(small - previous).sum(axis=2) > MOTION_THRESHOLD
+        count = int(np.count_nonzero(mask))
+        if count < MIN_PIXELS or count > MAX_PIXELS:
+            return
+        x = float(self.xs[mask].mean())
+        y = float(self.ys[mask].mean())
+        self.found += 1
+        self.seen(timestamp, x, y)
+
+    def seen(self, timestamp, x, y):
+        with self.lock:
+            rally = self.rally
+            if rally.first is None:
+                rally.first = timestamp
+            rally.last = timestamp
+            last, self.sighting = self.sighting, (timestamp, x, y)
+            if last is None or not 0 < timestamp - last[0] <= MAX_GAP_S:
+                return
+            dt = timestamp - last[0]
+            dx = x - last[1]
+            speed = ((dx ** 2 + (y - last[2]) ** 2) ** 0.5) / dt  # px/s
+            if speed < MIN_SPEED * self.width or speed * self.m_per_px > MAX_SPEED_MS:
+                return
+            rally.speed_sum += speed
+            rally.speeds += 1
+            rally.peak = max(rally.peak, speed)
+            # A hit sends the ball back the other way along the table
+            direction = 1 if dx > 0 else -1
+            if abs(dx) / dt >= MIN_SPEED * self.width and direction != rally.direction:
+                rally.hits += 1
+                rally.direction = direction
+
+    def finish_rally(self):
+        """Summary of the rally so far (None if the ball was never seen); the next one starts now"""
+        with self.lock:
+            rally, self.rally, self.sighting = self.rally, Rally(), None
+            if rally.first is None:
+                return None
+            self.last_rally = rally.to_dict(self.m_per_px)
+            self.rallies += 1
+            return self.last_rally
+
+    def reset_rally(self):
+        with self.lock:
+            self.rally, self.sighting = Rally(), None
+
+    def stats(self):
+        return {
+            "analysed": self.analysed,
+            "skipped": self.skipped,
+            "ball_found": self.found,
+            "every": self.every,
+            "frame_ms": round(self.frame_ms, 2),
+            "rallies": self.rallies,
+            "last_rally": self.last_rally,
+        }
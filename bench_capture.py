@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Capture pipeline benchmark
+Serves a fake replay stream on loopback (fake_replay_server.py), runs the
+real StreamCapture process against it and reports capture fps, decode time,
+frame loss and private memory growth of the capture process, as JSON tagged
+with the git commit so runs can be compared across commits. Runs headless on
+the SDL dummy driver.
+Usage: python3 bench_capture.py [--seconds 10] [--fps 30] [--size 800x480]
+                                [--source-size 1280x720] [--chunk 4096] [--jitter 0.005]
+                                [--source rallies/3.mjpeg] [--memory-mb 128] [--out result.json]
+"""
+import os
+import json
+import subprocess
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+from capture_process import StreamCapture
+from fake_replay_server import FakeReplayServer, option, parse_size
+
+SAMPLE_EVERY_S = 0.5
+CONNECT_TIMEOUT_S = 15
+
+
+def rss_mb(pid):
+    """Private resident memory of pid from /proc (None where there is no /proc).
+    The frame ring's shared memory is left out - it fills up to its fixed size
+    as the ring wraps and would hide real growth."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("RssAnon:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def slope_per_minute(samples):
+    """Least-squares slope of (seconds, value) samples, per minute"""
+    if len(samples) < 2:
+        return None
+    n = len(samples)
+    mean_t = sum(t for t, _ in samples) / n
+    mean_v = sum(v for _, v in samples) / n
+    var = sum((t - mean_t) ** 2 for t, _ in samples)
+    if var == 0:
+        return None
+    return sum((t - mean_t) * (v - mean_v) for t, v in samples) / var * 60
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    config = {
+        "seconds": option("--seconds", 10.0, float),
+        "fps": option("--fps", 30.0, float),
+        "size": option("--size", (800, 480), parse_size),
+        "source_size": option("--source-size", (1280, 720), parse_size),
+        "chunk": option("--chunk", 4096, int),
+        "jitter": option("--jitter", 0.0, float),
+        "source": option("--source", None),
+        "memory_mb": option("--memory-mb", 128, int),
+    }
+    out = option("--out", None)
+
+    server = FakeReplayServer(port=0, fps=config["fps"], size=config["source_size"], chunk=config["chunk"],
+                              jitter=config["jitter"], source=config["source"]).start()
+    capture = StreamCapture(f"{server.url}/stream", config["size"], config["memory_mb"])
+    capture.start()
+    capture.set_recording(True)
+    try:
+        # Wait for the first decoded frame so process start-up isn't measured
+        deadline = time.time() + CONNECT_TIMEOUT_S
+        while capture.stats_dict()["frames"] == 0:
+            if time.time() > deadline:
+                raise SystemExit("capture never produced a frame")
+            time.sleep(0.05)
+
+        start_stats = capture.stats_dict()
+        start_sent = server.frames_sent
+        t0 = time.perf_counter()
+        rss = []
+        while time.perf_counter() - t0 < config["seconds"]:
+            mb = rss_mb(capture.process.pid)
+            if mb is not None:
+                rss.append((time.perf_counter() - t0, mb))
+            time.sleep(SAMPLE_EVERY_S)
+        elapsed = time.perf_counter() - t0
+        end_stats = capture.stats_dict()
+        sent = server.frames_sent - start_sent
+    finally:
+        capture.stop()
+        server.stop()
+
+    captured = end_stats["frames"] - start_stats["frames"]
+    decode_total = end_stats["decode_ms_avg"] * end_stats["frames"] - start_stats["decode_ms_avg"] * start_stats["frames"]
+    results = {
+        "source_fps": round(sent / elapsed, 2),
+        "capture_fps": round(captured / elapsed, 2),
+        "frames_sent": sent,
+        "frames_captured": captured,
+        # Frames the server sent that never reached the ring (a frame in flight counts too)
+        "frame_loss": round(max(0, sent - captured) / sent, 4) if sent else None,
+        "decode_ms_avg": round(decode_total / captured, 2) if captured else None,
+        "decode_ms_max": round(end_stats["decode_ms_max"], 2),
+        "decode_errors": end_stats["errors"] - start_stats["errors"],
+        "stream_mbit_s": round((end_stats["bytes"] - start_stats["bytes"]) * 8 / elapsed / 1e6, 2),
+        "private_mb_start": round(rss[0][1], 1) if rss else None,
+        "private_mb_end": round(rss[-1][1], 1) if rss else None,
+        "private_mb_per_min": round(slope_per_minute(rss), 2) if len(rss) > 1 else None,
+        "ring_slots": end_stats["ring_slots"],
+    }
+    config["size"] = "x".join(map(str, config["size"]))
+    config["source_size"] = "x".join(map(str, config["source_size"]))
+    report = {"commit": git_commit(), "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "config": config, "results": results}
+    print(json.dumps(report, indent=2))
+    if out:
+        with open(out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+GPIO press-to-screen latency benchmark
+Runs the real display loop on the SDL dummy driver with the fake pin backend.
+Usage: python3 bench_gpio_latency.py [presses]
+"""
+import os
+import sys
+import json
+import random
+import threading
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")  # stdout is the JSON report
+
+import pygame
+from gpio_input import FakePinBackend, BUTTON_PINS
+from ping_pong_scorer import PingPongDisplay
+
+
+def main():
+    presses = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    backend = FakePinBackend()
+    stdout, sys.stdout = sys.stdout, open(os.devnull, "w")  # the app prints every point
+    display = PingPongDisplay(size=(800, 480), gpio_backend=backend, point_log="off")
+    display.game.points_to_win = 10 ** 6  # never end the game mid-benchmark
+    display.game.start()
+    display.start_gpio()
+
+    pins = list(BUTTON_PINS)
+    done = threading.Event()
+
+    def presser():
+        for _ in range(presses):
+            # Sleep past the debounce window, then press with some contact bounce
+            time.sleep(display.gpio.debounce_ms / 1000 + random.uniform(0.01, 0.05))
+            backend.press(random.choice(pins), bounces=random.randint(0, 3))
+        time.sleep(0.1)
+        done.set()
+
+    threading.Thread(target=presser, daemon=True).start()
+    clock = pygame.time.Clock()
+    while not done.is_set():
+        pygame.event.pump()
+        display.render_frame()
+        clock.tick(60)
+
+    result = {
+        "presses": display.gpio.presses,
+        "bounces_ignored": display.gpio.bounces_ignored,
+        "score": [display.game.p1_score, display.game.p2_score],
+        "press_to_screen": display.latency.snapshot()["press_to_screen"].get("gpio"),
+    }
+    display.gpio.close()
+    display.events.close()
+    pygame.quit()
+    sys.stdout = stdout
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
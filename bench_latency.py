@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Input-to-pixel latency benchmark
+Runs the display loop on the SDL dummy driver, drives the real HTTP routes
+over loopback and prints the per-stage histograms from /metrics as JSON.
+Usage: python3 bench_latency.py [taps] [port]
+"""
+import os
+import sys
+import json
+import logging
+import random
+import threading
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")  # stdout is the JSON report
+
+import pygame
+import requests
+from latency import percentile
+from ping_pong_scorer import PingPongDisplay
+
+
+def main():
+    taps = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 5055
+    base = f"http://127.0.0.1:{port}"
+    random.seed(1234)  # same tap sequence every run
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    stdout, sys.stdout = sys.stdout, open(os.devnull, "w")  # the app prints every point
+    display = PingPongDisplay(size=(800, 480), gpio_backend="off", point_log="off")
+    display.game.points_to_win = 10 ** 6  # never end the game mid-benchmark
+    display.game.start()
+    display.start_flask(port=port)
+
+    rtt_ms = []
+    done = threading.Event()
+
+    def tapper():
+        session = requests.Session()
+        for _ in range(50):
+            try:
+                session.get(f"{base}/status", timeout=1)
+                break
+            except requests.ConnectionError:
+                time.sleep(0.1)
+        for _ in range(taps):
+            time.sleep(random.uniform(0.02, 0.06))
+            t0 = time.perf_counter()
+            session.post(f"{base}/score/player{random.choice((1, 2))}")
+            rtt_ms.append((time.perf_counter() - t0) * 1000)
+        time.sleep(0.1)  # let the last tap reach the screen
+        done.set()
+
+    threading.Thread(target=tapper, daemon=True).start()
+    clock = pygame.time.Clock()
+    while not done.is_set():
+        pygame.event.pump()
+        display.render_frame()
+        clock.tick(60)
+
+    metrics = requests.get(f"{base}/metrics").json()
+    result = {
+        "taps": taps,
+        "score_total": display.game.p1_score + display.game.p2_score,
+        "client_rtt": {"p50_ms": percentile(rtt_ms, 50), "p99_ms": percentile(rtt_ms, 99)},
+        "latency": metrics["latency"],
+    }
+    display.events.close()
+    pygame.quit()
+    sys.stdout = stdout
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
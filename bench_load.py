@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+HTTP load test for the scoring routes
+Drives /score/playerN and /status on the display app (rendering on the SDL
+dummy driver) or on ping_pong_headless.py, with a growing number of client
+processes and a configurable request mix. After each round the final score
+must equal the number of taps that got a reply, which catches lost updates.
+Reports requests/s and p50/p99 latency per round as JSON.
+Regression mode: --baseline compares requests/s with an earlier --save and
+exits 1 if any round dropped by more than --max-drop (or a score didn't match).
+Usage: python3 bench_load.py [--target display|headless] [--seconds 3] [--clients 1,2,4,8]
+                             [--mix score=1,status=3] [--port 5057]
+                             [--save load.json] [--baseline load.json] [--max-drop 0.15]
+"""
+import os
+import sys
+import json
+import logging
+import multiprocessing
+import random
+import threading
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import requests
+from werkzeug.serving import make_server
+
+from fake_replay_server import option
+from latency import percentile
+
+# Route -> player whose score it adds to (the display's buttons are swapped:
+# button 1 is on player 2's side)
+SCORED_PLAYER = {
+    "display": {1: 2, 2: 1},
+    "headless": {1: 1, 2: 2},
+}
+MAX_DROP = 0.15
+
+
+def parse_mix(text):
+    """'score=1,status=3' -> {'score': 1.0, 'status': 3.0}"""
+    mix = {}
+    for part in text.split(","):
+        kind, weight = part.split("=")
+        if kind not in ("score", "status"):
+            raise SystemExit(f"unknown request kind {kind!r} (score, status)")
+        mix[kind] = float(weight)
+    return mix
+
+
+def serve_headless(port):
+    import ping_pong_headless
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    sys.stdout = open(os.devnull, "w")  # the app prints every point
+    ping_pong_headless.tables.defaults["points_to_win"] = 10 ** 9  # games never end
+    make_server("127.0.0.1", port, ping_pong_headless.app, threaded=True).serve_forever()
+
+
+def client(base, n, mix, stop, results):
+    """One remote in its own process, so client work doesn't share the server's GIL"""
+    rng = random.Random(1234 + n)  # same request sequence every run
+    kinds, weights = list(mix), list(mix.values())
+    session = requests.Session()
+    latencies = {kind: [] for kind in kinds}
+    taps = {1: 0, 2: 0}
+    errors = 0
+    while time.time() < stop:
+        kind = rng.choices(kinds, weights)[0]
+        t0 = time.perf_counter()
+        try:
+            if kind == "score":
+                button = rng.choice((1, 2))
+                r = session.post(f"{base}/score/player{button}", timeout=5)
+                if r.ok and r.json()["status"] == "ok":
+                    taps[button] += 1
+            else:
+                r = session.get(f"{base}/status", timeout=5)
+            r.raise_for_status()
+        except (requests.RequestException, ValueError):
+            errors += 1
+            continue
+        latencies[kind].append((time.perf_counter() - t0) * 1000)
+    results.put((latencies, taps, errors))
+
+
+def scores(status):
+    """(p1, p2) from either app's /status"""
+    if "player1" in status:
+        return status["player1"]["score"], status["player2"]["score"]
+    return status["p1_score"], status["p2_score"]
+
+
+def run_round(base, target, clients, mix, seconds):
+    requests.post(f"{base}/reset")
+    stop = time.time() + seconds
+    results = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=client, args=(base, n, mix, stop, results)) for n in range(clients)]
+    for p in procs:
+        p.start()
+    latencies = {kind: [] for kind in mix}
+    taps = {1: 0, 2: 0}
+    errors = 0
+    for _ in procs:
+        mine, my_taps, my_errors = results.get()
+        for kind, values in mine.items():
+            latencies[kind].extend(values)
+        for button, count in my_taps.items():
+            taps[button] += count
+        errors += my_errors
+    for p in procs:
+        p.join()
+
+    expected = [0, 0]
+    for button, count in taps.items():
+        expected[SCORED_PLAYER[target][button] - 1] += count
+    final = scores(requests.get(f"{base}/status").json())
+    everything = [ms for values in latencies.values() for ms in values]
+    return {
+        "clients": clients,
+        "requests_per_s": round(len(everything) / seconds, 1),
+        "p50_ms": percentile(everything, 50),
+        "p99_ms": percentile(everything, 99),
+        "by_kind": {kind: {"count": len(v), "p50_ms": percentile(v, 50), "p99_ms": percentile(v, 99)}
+                    for kind, v in latencies.items()},
+        "errors": errors,
+        "expected_scores": expected,
+        "final_scores": list(final),
+        "scores_match": list(final) == expected,
+    }
+
+
+def regressions(rounds, baseline, max_drop):
+    """Messages for every round that got slower than baseline allows"""
+    before = {r["clients"]: r["requests_per_s"] for r in baseline["rounds"]}
+    problems = []
+    for r in rounds:
+        if not r["scores_match"]:
+            problems.append(f"{r['clients']} clients: lost updates ({r['final_scores']} != {r['expected_scores']})")
+        old = before.get(r["clients"])
+        if old and r["requests_per_s"] < old * (1 - max_drop):
+            problems.append(f"{r['clients']} clients: {r['requests_per_s']} req/s, baseline {old} (-{1 - r['requests_per_s'] / old:.0%})")
+    return problems
+
+
+def run_display(port, run_rounds):
+    """Serve the display app and keep it rendering while the rounds run"""
+    import pygame
+    from ping_pong_scorer import PingPongDisplay
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    stdout, sys.stdout = sys.stdout, open(os.devnull, "w")  # the app prints every point
+    display = PingPongDisplay(size=(800, 480), gpio_backend="off", point_log="off")
+    display.game.points_to_win = 10 ** 9  # games never end
+    display.game.start()
+    display.start_flask(port=port)
+    rounds = []
+    thread = threading.Thread(target=lambda: rounds.extend(run_rounds()), daemon=True)
+    thread.start()
+    clock = pygame.time.Clock()
+    while thread.is_alive():
+        pygame.event.pump()
+        display.render_frame()
+        clock.tick(60)
+    pygame.quit()
+    sys.stdout = stdout
+    return rounds
+
+
+def wait_for(base):
+    for _ in range(100):
+        try:
+            requests.get(f"{base}/status", timeout=1)
+            return
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    raise SystemExit(f"no server at {base}")
+
+
+def main():
+    target = option("--target", "display")
+    if target not in SCORED_PLAYER:
+        raise SystemExit("--target must be display or headless")
+    seconds = option("--seconds", 3.0, float)
+    client_counts = option("--clients", [1, 2, 4, 8], lambda text: [int(n) for n in text.split(",")])
+    mix = option("--mix", {"score": 1.0, "status": 3.0}, parse_mix)
+    port = option("--port", 5057, int)
+    save = option("--save", None)
+    baseline = option("--baseline", None)
+    max_drop = option("--max-drop", MAX_DROP, float)
+    base = f"http://127.0.0.1:{port}"
+
+    def run_rounds():
+        wait_for(base)
+        return [run_round(base, target, n, mix, seconds) for n in client_counts]
+
+    if target == "display":
+        rounds = run_display(port, run_rounds)
+    else:
+        server = multiprocessing.Process(target=serve_headless, args=(port,), daemon=True)
+        server.start()
+        try:
+            rounds = run_rounds()
+        finally:
+            server.terminate()
+
+    result = {"target": target, "seconds": seconds, "mix": mix, "rounds": rounds,
+              "peak_requests_per_s": max(r["requests_per_s"] for r in rounds)}
+    print(json.dumps(result, indent=2))
+    if save:
+        with open(save, "w") as f:
+            json.dump(result, f, indent=2)
+
+    problems = [f"{r['clients']} clients: lost updates" for r in rounds if not r["scores_match"]]
+    if baseline:
+        with open(baseline) as f:
+            problems = regressions(rounds, json.load(f), max_drop)
+    if problems:
+        print("FAIL\n  " + "\n  ".join(problems), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Mirror display benchmark
+Runs a primary MirrorServer and a few followers on loopback, scores points
+at random intervals and reports the publish-to-applied lag per follower
+(target: under one 60 fps frame). Halfway through, one follower is made to
+miss a delta to check that it recovers with a snapshot. Every follower must
+end up with the primary's state.
+Usage: python3 bench_mirror.py [points] [followers]
+"""
+import sys
+import json
+import random
+import time
+
+from game_state import GameState
+from mirror import MirrorServer, MirrorFollower, FIELDS
+
+FRAME_MS = 1000 / 60
+
+
+def main():
+    points = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    random.seed(1234)  # same points every run
+
+    game = GameState(points_to_win=10 ** 9)
+    game.start()
+    server = MirrorServer(game, port=0, host="127.0.0.1").start()
+    followers = [MirrorFollower("127.0.0.1", server.port).start() for _ in range(count)]
+    deadline = time.time() + 5
+    while not all(f.version is not None for f in followers) and time.time() < deadline:
+        time.sleep(0.01)
+
+    for i in range(points):
+        if i == points // 2:
+            followers[0].version -= 1  # as if a delta had been lost
+        game.score(random.choice((1, 2)))
+        time.sleep(random.uniform(0.002, 0.02))
+    time.sleep(0.2)
+
+    state = game.to_dict()
+    expected = {k: state[k] for k in FIELDS}
+    result = {
+        "points": points,
+        "frame_ms": round(FRAME_MS, 1),
+        "server": server.stats(),
+        "followers": [],
+    }
+    for f in followers:
+        stats = f.stats()
+        result["followers"].append({
+            "in_sync": f.state == expected,
+            "applied": stats["applied"],
+            "gaps": stats["gaps"],
+            "snapshots": stats["snapshots"],
+            "lag_p50_ms": stats["lag"]["p50_ms"],
+            "lag_p99_ms": stats["lag"]["p99_ms"],
+            "lag_max_ms": stats["lag"]["max_ms"],
+            "under_one_frame": stats["lag"]["p99_ms"] is not None and stats["lag"]["p99_ms"] < FRAME_MS,
+        })
+        f.stop()
+    server.close()
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
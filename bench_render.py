@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Rendering benchmark with golden frames
+Draws the setup screen, the game screen, the point flash fading out and
+replay playback on the SDL dummy driver at 720p, 1080p and 4K, and reports
+per-call timings (p50/p90/p99/max) and what each frame allocates: Python
+heap (tracemalloc) and pygame.Surface pixel buffers created during the call.
+The first frame of each scene is hashed and compared with
+bench_render_golden.json, so an optimization that changes what ends up on
+screen fails the run (exit 1). Mismatching frames can be written as PNGs
+next to the golden ones with --diff-dir. After an intended visual change,
+rerun with --update-golden and commit the new hashes.
+Golden frames depend on the pygame/SDL build (font rasterizing); the file
+records the version it was made with.
+Usage: python3 bench_render.py [--sizes 720p,1080p,4k] [--frames 300]
+                               [--out result.json] [--diff-dir frames/]
+                               [--golden bench_render_golden.json] [--update-golden]
+"""
+import os
+import sys
+import json
+import hashlib
+import time
+import tracemalloc
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+
+from bench_capture import git_commit
+from fake_replay_server import option, parse_size
+from frame_ring import FrameRing
+from latency import percentile
+from rally_store import Rally
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_render_golden.json")
+SIZES = {"720p": (1280, 720), "1080p": (1920, 1080), "4k": (3840, 2160)}
+SCENES = ("setup", "game", "flash", "replay")
+REPLAY_FRAMES = 4  # ring slots of synthetic camera frames, looped
+ALLOC_FRAMES = 20  # traced separately - tracemalloc slows every call down
+
+
+class FakeCapture:
+    """Stands in for StreamCapture: a ring of synthetic frames, no process"""
+
+    def __init__(self, size, count=REPLAY_FRAMES):
+        self.ring = FrameRing.create(count, size)
+        width, height = size
+        for i in range(count):
+            frame = pygame.Surface(size)
+            frame.fill((20, 90, 60))
+            pygame.draw.line(frame, (255, 255, 255), (width // 2, 0), (width // 2, height), 4)
+            x = int(width * (0.1 + 0.8 * i / max(1, count - 1)))
+            pygame.draw.circle(frame, (255, 140, 0), (x, height // 3), max(4, width // 80))
+            seq, view = self.ring.begin_write()
+            view[:] = pygame.image.tobytes(frame, "RGB")
+            del view
+            self.ring.commit(seq, float(i))
+
+    def set_recording(self, recording):
+        pass
+
+    def stop(self):
+        self.ring.close()
+
+
+class SurfaceCounter:
+    """Counts pygame.Surface(...) calls (and their pixel bytes) while active"""
+
+    def __init__(self):
+        self.count = 0
+        self.bytes = 0
+        self.original = pygame.Surface
+        counter = self
+
+        class CountingSurface(pygame.Surface):
+            def __init__(self, size, *args, **kwargs):
+                super().__init__(size, *args, **kwargs)
+                counter.count += 1
+                counter.bytes += self.get_width() * self.get_height() * self.get_bytesize()
+
+        self.counting = CountingSurface
+
+    def __enter__(self):
+        pygame.Surface = self.counting
+        return self
+
+    def __exit__(self, *exc):
+        pygame.Surface = self.original
+
+
+def prepare(display, scene):
+    """Put display into a fixed state for scene. Returns the call to measure."""
+    game = display.game
+    game.stop()
+    display.playing_replay = False
+    display.flash_alpha_p1 = display.flash_alpha_p2 = 0
+    if scene == "setup":
+        return display.draw_setup
+    game.points_to_win = 11
+    game.start("Ryan", "Ethan")
+    for player in (1, 2, 1, 1, 2, 1, 2, 1, 1, 2, 2, 1):
+        game.score(player)
+    if scene == "flash":
+        def flash():
+            # A point every 22 frames, so each call is somewhere in a fade
+            if display.flash_alpha_p1 == 0:
+                display.flash_alpha_p1 = 255
+            display.draw_game()
+        return flash
+    if scene == "replay":
+        # A stored rally whose frames are all still in the ring (drawn without decoding)
+        rally = Rally(0, "", [(0, 0, float(seq)) for seq in range(REPLAY_FRAMES)])
+        rally.ring, rally.seqs = display.captures[0].ring, list(range(REPLAY_FRAMES))
+        rally.ready.set()
+        display.replay_rallies = [rally]
+        display.replay_frames = [(i,) for i in range(REPLAY_FRAMES)]
+        display.replay_frame_idx = 0
+        display.replay_last_frame_time = pygame.time.get_ticks()
+        display.playing_replay = True
+    return display.draw_game
+
+
+def frame_hash(surface):
+    return hashlib.sha256(pygame.image.tobytes(surface, "RGB")).hexdigest()[:16]
+
+
+def run_scene(display, scene, frames):
+    draw = prepare(display, scene)
+    # Golden frame: the first call, before any animation has moved on
+    display.replay_frame_ms = 10 ** 9
+    draw()
+    golden = frame_hash(display.screen)
+    snapshot = display.screen.copy()
+
+    draw = prepare(display, scene)
+    display.replay_frame_ms = -1  # next replay frame on every call
+    timings = []
+    for _ in range(frames):
+        t0 = time.perf_counter()
+        draw()
+        timings.append((time.perf_counter() - t0) * 1000)
+
+    tracemalloc.start()
+    with SurfaceCounter() as surfaces:
+        peaks = []
+        for _ in range(ALLOC_FRAMES):
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            draw()
+            peaks.append(tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+
+    return snapshot, {
+        "hash": golden,
+        "calls": frames,
+        "mean_ms": round(sum(timings) / len(timings), 3),
+        "p50_ms": round(percentile(timings, 50), 3),
+        "p90_ms": round(percentile(timings, 90), 3),
+        "p99_ms": round(percentile(timings, 99), 3),
+        "max_ms": round(max(timings), 3),
+        "py_alloc_peak_kb": round(percentile(peaks, 50) / 1024, 1),
+        "surfaces_per_frame": round(surfaces.count / ALLOC_FRAMES, 2),
+        "surface_kb_per_frame": round(surfaces.bytes / ALLOC_FRAMES / 1024, 1),
+    }
+
+
+def parse_sizes(text):
+    return [(name, SIZES[name.lower()] if name.lower() in SIZES else parse_size(name)) for name in text.split(",")]
+
+
+def main():
+    sizes = option("--sizes", list(SIZES.items()), parse_sizes)
+    frames = option("--frames", 300, int)
+    out = option("--out", None)
+    diff_dir = option("--diff-dir", None)
+    golden_path = option("--golden", GOLDEN_PATH)
+    update = "--update-golden" in sys.argv
+
+    from ping_pong_scorer import PingPongDisplay
+    stdout, sys.stdout = sys.stdout, open(os.devnull, "w")  # the app prints every point
+    display = PingPongDisplay(size=sizes[0][1], gpio_backend="off", point_log="off")
+    sys.stdout = stdout
+
+    golden = {"pygame": pygame.version.ver, "sdl": ".".join(map(str, pygame.get_sdl_version())), "frames": {}}
+    if os.path.exists(golden_path):
+        with open(golden_path) as f:
+            golden = json.load(f)
+    version_note = None
+    if golden["pygame"] != pygame.version.ver:
+        version_note = f"golden frames are from pygame {golden['pygame']}, this is {pygame.version.ver}"
+
+    results = {}
+    mismatches = []
+    for name, size in sizes:
+        pygame.display.set_mode(size)
+        display.on_resize()
+        display.captures = [FakeCapture(size)]
+        key = f"{size[0]}x{size[1]}"
+        results[key] = {}
+        for scene in SCENES:
+            snapshot, result = run_scene(display, scene, frames)
+            expected = golden["frames"].get(key, {}).get(scene)
+            result["golden"] = "updated" if update else ("missing" if expected is None else
+                                                         "match" if expected == result["hash"] else "MISMATCH")
+            if update:
+                golden["frames"].setdefault(key, {})[scene] = result["hash"]
+            elif result["golden"] == "MISMATCH":
+                mismatches.append(f"{key} {scene}: {result['hash']} != {expected}")
+                if diff_dir:
+                    os.makedirs(diff_dir, exist_ok=True)
+                    pygame.image.save(snapshot, os.path.join(diff_dir, f"{key}-{scene}.png"))
+            results[key][scene] = result
+            print(f"{key} {scene}: p50 {result['p50_ms']} ms, p99 {result['p99_ms']} ms, "
+                  f"{result['surface_kb_per_frame']} KB surfaces/frame [{result['golden']}]", file=sys.stderr)
+        for capture in display.captures:
+            capture.stop()
+        display.captures = []
+
+    if update:
+        golden["pygame"] = pygame.version.ver
+        golden["sdl"] = ".".join(map(str, pygame.get_sdl_version()))
+        with open(golden_path, "w") as f:
+            json.dump(golden, f, indent=2)
+            f.write("\n")
+
+    report = {
+        "commit": git_commit(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "pygame": pygame.version.ver,
+        "frames": frames,
+        "golden_note": version_note,
+        "results": results,
+        "mismatches": mismatches,
+    }
+    print(json.dumps(report, indent=2))
+    if out:
+        with open(out, "w") as f:
+            json.dump(report, f, indent=2)
+    pygame.quit()
+    if mismatches:
+        print("FAIL: rendering changed\n  " + "\n  ".join(mismatches), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Cold start benchmark
+Starts the scorer in fresh interpreters on the SDL dummy driver and reports
+time-to-first-frame (target: under 1 s on a Pi 4) and when the background
+stages (sound, ip, http, gpio) finished.
+Usage: python3 bench_startup.py [runs]
+"""
+import os
+import sys
+import json
+import subprocess
+import time
+
+from latency import percentile
+
+CHILD = """
+import sys, json, time, tempfile
+from ping_pong_scorer import PingPongDisplay
+# Empty point log: opening it is part of startup, but not the real history
+display = PingPongDisplay(size=(800, 480), gpio_backend="off", point_log=tempfile.mkdtemp())
+display.render_frame()
+lazy = "flask" not in sys.modules and "requests" not in sys.modules
+print("FIRST_FRAME", flush=True)
+display.start_background_services()
+deadline = time.time() + 10
+while time.time() < deadline and not {"sound", "ip", "http", "gpio"} <= set(display.startup):
+    time.sleep(0.01)
+print("RESULT " + json.dumps({"startup": display.startup, "lazy_imports": lazy}), flush=True)
+"""
+
+
+def one_run():
+    env = dict(os.environ, SDL_VIDEODRIVER="dummy", SDL_AUDIODRIVER="dummy", PYGAME_HIDE_SUPPORT_PROMPT="1")
+    t0 = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-c", CHILD], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                            text=True, env=env, cwd=os.path.dirname(os.path.abspath(__file__)))
+    spawn_to_frame = None
+    result = None
+    for line in proc.stdout:
+        if line.startswith("FIRST_FRAME"):
+            spawn_to_frame = (time.perf_counter() - t0) * 1000
+        elif line.startswith("RESULT "):
+            result = json.loads(line[len("RESULT "):])
+    proc.wait()
+    result["spawn_to_first_frame_ms"] = round(spawn_to_frame, 1)
+    return result
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    results = [one_run() for _ in range(runs)]
+    stages = sorted({stage for r in results for stage in r["startup"]})
+    summary = {
+        "runs": runs,
+        "lazy_imports": all(r["lazy_imports"] for r in results),
+        "spawn_to_first_frame_ms": {
+            "p50": percentile([r["spawn_to_first_frame_ms"] for r in results], 50),
+            "max": max(r["spawn_to_first_frame_ms"] for r in results),
+        },
+        "stages_p50_ms": {s: percentile([r["startup"][s] for r in results if s in r["startup"]], 50) for s in stages},
+        "target_ms": 1000,
+    }
+    summary["meets_target"] = summary["spawn_to_first_frame_ms"]["max"] < summary["target_ms"]
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Multi-table load benchmark for ping_pong_headless.py
+Serves the headless app on loopback and hammers /tables/<id>/score/playerN
+with a few client processes per table, for a growing number of tables. Also runs a
+"hot table" round: one table gets many clients, the rest get one each, and
+the cold tables' latency is reported so cross-table blocking shows up.
+With shards > 1 the server runs as that many worker processes and clients
+go straight to the worker that owns their table.
+Usage: python3 bench_tables.py [seconds_per_round] [shards] [port]
+"""
+import os
+import sys
+import json
+import logging
+import multiprocessing
+import time
+
+import requests
+from werkzeug.serving import make_server
+
+import ping_pong_headless
+from latency import percentile
+
+TABLE_COUNTS = [1, 2, 4, 8, 16]
+CLIENTS_PER_TABLE = 2
+
+
+def table_url(port, shards, table_id):
+    owner = ping_pong_headless.shard_for(table_id, shards)
+    return f"http://127.0.0.1:{port + owner}/tables/{table_id}"
+
+
+def serve_shard(index, shards, port):
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    sys.stdout = open(os.devnull, "w")  # the app prints every point
+    ping_pong_headless.BASE_PORT = port
+    ping_pong_headless.shard_index, ping_pong_headless.shard_count = index, shards
+    ping_pong_headless.tables.defaults["points_to_win"] = 10 ** 9  # games never end
+    make_server("127.0.0.1", port + index, ping_pong_headless.app, threaded=True).serve_forever()
+
+
+def client(url, n, stop, results):
+    """One remote in its own process, so client work doesn't share the server's GIL"""
+    session = requests.Session()
+    mine = []
+    ok = 0
+    player = 1 + n % 2
+    while time.time() < stop:
+        t0 = time.perf_counter()
+        r = session.post(f"{url}/score/player{player}")
+        mine.append((time.perf_counter() - t0) * 1000)
+        if r.json()["status"] == "ok":
+            ok += 1
+    results.put((url, mine, ok))
+
+
+def run_round(urls, clients, seconds):
+    """clients: list of table ids, one client process each.
+    Returns (requests/s, latencies per table, taps per table)."""
+    stop = time.time() + seconds
+    results = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=client, args=(urls[t], n, stop, results)) for n, t in enumerate(clients)]
+    for p in procs:
+        p.start()
+    latencies = {}
+    taps = {}
+    by_url = {url: t for t, url in urls.items()}
+    for _ in procs:
+        url, mine, ok = results.get()
+        table_id = by_url[url]
+        latencies.setdefault(table_id, []).extend(mine)
+        taps[table_id] = taps.get(table_id, 0) + ok
+    for p in procs:
+        p.join()
+    total = sum(len(v) for v in latencies.values())
+    return total / seconds, latencies, taps
+
+
+def check_scores(urls, taps):
+    """Every successful tap must show up in that table's score"""
+    for table_id, n in taps.items():
+        status = requests.get(f"{urls[table_id]}/status").json()
+        if status["player1"]["score"] + status["player2"]["score"] != n:
+            return False
+    return True
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 2.0
+    shards = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    port = int(sys.argv[3]) if len(sys.argv) > 3 else 5056
+
+    workers = [multiprocessing.Process(target=serve_shard, args=(i, shards, port), daemon=True) for i in range(shards)]
+    for w in workers:
+        w.start()
+    for i in range(shards):
+        for _ in range(50):
+            try:
+                requests.get(f"http://127.0.0.1:{port + i}/tables", timeout=1)
+                break
+            except requests.ConnectionError:
+                time.sleep(0.1)
+
+    def urls_for(ids):
+        return {t: table_url(port, shards, t) for t in ids}
+
+    results = {"shards": shards, "scaling": [], "hot_table": None}
+    try:
+        for n in TABLE_COUNTS:
+            urls = urls_for(f"scale{n}_{i}" for i in range(n))
+            rps, lat, taps = run_round(urls, list(urls) * CLIENTS_PER_TABLE, seconds)
+            everything = [ms for v in lat.values() for ms in v]
+            results["scaling"].append({
+                "tables": n,
+                "clients": n * CLIENTS_PER_TABLE,
+                "requests_per_s": round(rps, 1),
+                "p50_ms": percentile(everything, 50),
+                "p99_ms": percentile(everything, 99),
+                "scores_match": check_scores(urls, taps),
+            })
+
+        cold = [f"cold_{i}" for i in range(4)]
+        urls = urls_for(["hot"] + cold)
+        rps, lat, taps = run_round(urls, ["hot"] * 8 + cold, seconds)
+        cold_lat = [ms for t in cold for ms in lat[t]]
+        results["hot_table"] = {
+            "requests_per_s": round(rps, 1),
+            "hot_p99_ms": percentile(lat["hot"], 99),
+            "cold_p50_ms": percentile(cold_lat, 50),
+            "cold_p99_ms": percentile(cold_lat, 99),
+            "scores_match": check_scores(urls, taps),
+        }
+    finally:
+        for w in workers:
+            w.terminate()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
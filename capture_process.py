@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Stream capture process - Ping Pong Scorer
+Reads the replay server's MJPEG stream, decodes and scales every frame and
+writes it into a FrameRing. Runs in its own process (spawned, lower
+priority) so JPEG work never competes with the render loop for the GIL.
+"""
+import io
+import os
+import time
+import multiprocessing
+
+from frame_ring import FrameRing, slot_bytes, RING_HEADER_SIZE
+
+CAPTURE_MEMORY_MB = 512  # shared memory for replay frames (decoded + JPEG), split across cameras
+MIN_SLOTS = 16
+MIN_RING_WIDTH = 160   # rings are scaled down to fit MIN_SLOTS, but no further
+CAPTURE_NICE = 5       # keep the display process ahead of us
+
+# Browser-like headers - the replay server expects them
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/144.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
+    "Accept-Encoding": "gzip, deflate",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Connection": "keep-alive",
+    "Cache-Control": "max-age=0",
+    "Upgrade-Insecure-Requests": "1"
+}
+
+# Motion is measured on a tiny copy of each frame (green channel as brightness)
+MOTION_SIZE = (32, 18)
+
+# Shared stats slots (see StreamCapture.stats)
+STAT_FRAMES, STAT_DECODE_MS, STAT_ERRORS, STAT_BYTES, STAT_DECODE_MAX_MS, STAT_SKIPPED = range(6)
+
+
+def ring_geometry(size, memory_mb):
+    """(slots, frame size) of a ring that fits in memory_mb: frames at size if
+    MIN_SLOTS of them fit, else halved until they do. Raises ValueError if
+    not even MIN_RING_WIDTH wide frames fit."""
+    budget = memory_mb * 1024 * 1024 - RING_HEADER_SIZE
+    width, height = size
+    while True:
+        slots = budget // slot_bytes((width, height))
+        if slots >= MIN_SLOTS:
+            return slots, (width, height)
+        if width // 2 < MIN_RING_WIDTH:
+            raise ValueError(f"{memory_mb} MB can't hold {MIN_SLOTS} frames even at {width}x{height}; "
+                             f"raise CAPTURE_MEMORY_MB or use fewer cameras")
+        width, height = width // 2, height // 2
+
+
+def motion(tiny, previous):
+    """Mean brightness change (0-255) between two tiny frames"""
+    if previous is None:
+        return 0.0
+    return sum(abs(a - b) for a, b in zip(tiny, previous)) / len(tiny)
+
+
+def decode_into(ring, jpg_data, stats, previous=None):
+    """Decode one JPEG straight into the next ring slot. previous: what the
+    last call returned. Returns the tiny brightness copy for the next call."""
+    import pygame
+    t0 = time.perf_counter()
+    try:
+        frame = pygame.image.load(io.BytesIO(jpg_data), "frame.jpg")
+    except Exception as e:
+        stats[STAT_ERRORS] += 1
+        print(f"Frame load error: {e}", flush=True)
+        return previous
+    seq, view = ring.begin_write()
+    dest = pygame.image.frombuffer(view, ring.size, "RGB")
+    if frame.get_size() == ring.size:
+        dest.blit(frame, (0, 0))
+    else:
+        try:
+            pygame.transform.scale(frame, ring.size, dest)
+        except ValueError:
+            # Pixel formats differ - scale then convert on blit
+            dest.blit(pygame.transform.scale(frame, ring.size), (0, 0))
+    tiny = pygame.image.tobytes(pygame.transform.scale(dest, MOTION_SIZE), "RGB")[1::3]
+    del dest
+    ring.commit(seq, time.time(), jpg_data, motion(tiny, previous))
+    decode_ms = (time.perf_counter() - t0) * 1000
+    stats[STAT_FRAMES] += 1
+    stats[STAT_DECODE_MS] += decode_ms
+    stats[STAT_DECODE_MAX_MS] = max(stats[STAT_DECODE_MAX_MS], decode_ms)
+    stats[STAT_BYTES] += len(jpg_data)
+    return tiny
+
+
+def capture_main(ring_name, url, recording, stop, stats, decode_every):
+    """Process entry point: reconnecting capture loop"""
+    import requests
+    try:
+        os.nice(CAPTURE_NICE)
+    except (AttributeError, OSError):
+        pass
+    ring = FrameRing.attach(ring_name)
+    print("Starting stream capture...", flush=True)
+    
+    while not stop.is_set():
+        try:
+            response = requests.get(url, headers=HEADERS, stream=True, timeout=30)
+            print(f"Connected to stream, status: {response.status_code}", flush=True)
+            
+            buffer = bytearray()
+            seen = 0
+            tiny = None
+            for chunk in response.iter_content(chunk_size=4096):
+                if stop.is_set():
+                    break
+                
+                # Only capture while the display says a rally is on
+                if not recording.value:
+                    buffer.clear()
+                    continue
+                
+                if not chunk:
+                    continue
+                buffer += chunk
+                
+                # Look for complete JPEG frames
+                while True:
+                    start = buffer.find(b'\xff\xd8')
+                    if start == -1:
+                        buffer.clear()
+                        break
+                    end = buffer.find(b'\xff\xd9', start)
+                    if end == -1:
+                        # Keep data from start marker
+                        del buffer[:start]
+                        break
+                    # The governor thins decoding out when the Pi runs hot
+                    seen += 1
+                    if seen % max(1, decode_every.value) == 0:
+                        tiny = decode_into(ring, bytes(buffer[start:end + 2]), stats, tiny)
+                    else:
+                        stats[STAT_SKIPPED] += 1
+                    del buffer[:end + 2]
+        except Exception as e:
+            print(f"Stream capture error: {e}", flush=True)
+            stop.wait(2)  # Wait before reconnecting
+    
+    ring.close()
+    print("Stream capture stopped", flush=True)
+
+
+class StreamCapture:
+    """Owns the frame ring and the capture process"""
+
+    def __init__(self, url, size, memory_mb=CAPTURE_MEMORY_MB):
+        slots, ring_size = ring_geometry(size, memory_mb)
+        if ring_size != size:
+            print(f"Frame ring: {memory_mb} MB is too little for {MIN_SLOTS} frames at {size[0]}x{size[1]}, "
+                  f"capturing at {ring_size[0]}x{ring_size[1]}", flush=True)
+        size = ring_size
+        frame_bytes = slot_bytes(size)
+        self.ring = FrameRing.create(slots, size)
+        ctx = multiprocessing.get_context("spawn")  # don't fork the pygame/Flask process
+        self.recording = ctx.Value("b", 0, lock=False)
+        self.stop_event = ctx.Event()
+        self.decode_every = ctx.Value("i", 1, lock=False)
+        # frames, decode ms total, errors, bytes, slowest decode ms, frames skipped
+        self.stats = ctx.Array("d", 6, lock=False)
+        self.process = ctx.Process(target=capture_main, daemon=True,
+                                   args=(self.ring.name, url, self.recording, self.stop_event, self.stats,
+                                         self.decode_every))
+        print(f"Frame ring: {slots} slots of {size[0]}x{size[1]} ({slots * frame_bytes // (1024 * 1024)} MB)", flush=True)
+
+    def start(self):
+        self.process.start()
+
+    def set_recording(self, on):
+        if self.recording.value != on:
+            self.recording.value = on
+
+    def set_decode_every(self, n):
+        """Decode one stream frame in n (the rest are skipped, not decoded)"""
+        self.decode_every.value = max(1, n)
+
+    def stats_dict(self):
+        frames = self.stats[STAT_FRAMES]
+        return {
+            'frames': int(frames),
+            'decode_ms_avg': self.stats[STAT_DECODE_MS] / frames if frames else None,
+            'decode_ms_max': self.stats[STAT_DECODE_MAX_MS],
+            'errors': int(self.stats[STAT_ERRORS]),
+            'skipped': int(self.stats[STAT_SKIPPED]),
+            'decode_every': self.decode_every.value,
+            'bytes': int(self.stats[STAT_BYTES]),
+            'ring_slots': self.ring.slots,
+        }
+
+    def stop(self):
+        self.stop_event.set()
+        self.process.join(timeout=3)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.ring.close()
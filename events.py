@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Event bus - Ping Pong Scorer
+Scoring publishes what happened and returns; everything that reacts to a
+point (flash, sound, saving the rally, logging, ...) subscribes here instead
+of running on the request or GPIO thread. Each subscriber has its own
+bounded queue and its own worker thread: a slow subscriber drops its own
+events (counted in stats) and never holds up scoring or the other
+subscribers.
+"""
+import queue
+import threading
+import time
+from collections import namedtuple
+
+QUEUE_SIZE = 64  # per subscriber
+
+# at: time.time() when it happened
+PointScored = namedtuple("PointScored", "player result p1_score p2_score version at")
+GameWon = namedtuple("GameWon", "winner p1_score p2_score version at")
+GameReset = namedtuple("GameReset", "version at")
+ReplayRequested = namedtuple("ReplayRequested", "source at")
+
+_STOP = object()
+
+
+class Subscriber:
+    def __init__(self, name, handler, event_types, queue_size=QUEUE_SIZE):
+        self.name = name
+        self.handler = handler
+        self.event_types = event_types
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.handled = 0
+        self.dropped = 0
+        self.errors = 0
+        self.thread = threading.Thread(target=self._run, name=f"events-{name}", daemon=True)
+        self.thread.start()
+
+    def offer(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            event = self.queue.get()
+            if event is _STOP:
+                return
+            try:
+                self.handler(event)
+            except Exception as e:
+                self.errors += 1
+                print(f"Event handler {self.name} failed on {type(event).__name__}: {e}", flush=True)
+            self.handled += 1
+
+    def stats(self):
+        return {
+            "events": [t.__name__ for t in self.event_types],
+            "queued": self.queue.qsize(),
+            "handled": self.handled,
+            "dropped": self.dropped,
+            "errors": self.errors,
+        }
+
+
+class EventBus:
+    def __init__(self):
+        self.subscribers = []
+        self.by_type = {}  # event type -> subscribers, rebuilt on subscribe
+        self.lock = threading.Lock()
+        self.published = 0
+
+    def subscribe(self, name, handler, *event_types, queue_size=QUEUE_SIZE):
+        """Run handler(event) on a worker thread of its own for each event of event_types"""
+        subscriber = Subscriber(name, handler, event_types, queue_size)
+        with self.lock:
+            self.subscribers.append(subscriber)
+            by_type = {}
+            for s in self.subscribers:
+                for event_type in s.event_types:
+                    by_type.setdefault(event_type, []).append(s)
+            self.by_type = by_type
+        return subscriber
+
+    def publish(self, event):
+        """Queue event for its subscribers and return straight away"""
+        self.published += 1
+        for subscriber in self.by_type.get(type(event), ()):
+            subscriber.offer(event)
+
+    def stats(self):
+        return {
+            "published": self.published,
+            "subscribers": {s.name: s.stats() for s in self.subscribers},
+        }
+
+    def close(self, timeout=1.0):
+        """Let the subscribers finish what's queued (up to timeout)"""
+        deadline = time.monotonic() + timeout
+        for s in self.subscribers:
+            try:
+                s.queue.put(_STOP, timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Full:
+                continue
+        for s in self.subscribers:
+            s.thread.join(max(0.0, deadline - time.monotonic()))
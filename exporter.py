@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Rally export - Ping Pong Scorer
+Turns a stored rally into an MJPEG AVI that plays in VLC, browsers' download
+managers, video editors, etc. The stored JPEGs are copied into the AVI as-is,
+one frame at a time from the rally's memory map, so memory use doesn't grow
+with rally length. Exports run in a small pool of low-priority worker
+processes so scoring and the display never wait on them.
+"""
+import os
+import mmap
+import struct
+import threading
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+EXPORT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "exports")
+MAX_EXPORT_WORKERS = 1   # concurrent exports
+MAX_QUEUED_EXPORTS = 20  # jobs waiting or running
+MAX_FINISHED_EXPORTS = 20  # finished jobs kept (with their files) ...
+EXPORT_KEEP_S = 3600       # ... for at most this long
+EXPORT_NICE = 15
+PROGRESS_EVERY = 25      # frames between progress updates
+DEFAULT_FPS = 15
+
+AVIF_HASINDEX = 0x10
+AVIIF_KEYFRAME = 0x10
+
+
+def jpeg_size(data):
+    """(width, height) from a JPEG's SOF marker"""
+    i = 2
+    while i + 9 < len(data):
+        if data[i] != 0xFF:
+            i += 1
+            continue
+        marker = data[i + 1]
+        if marker in (0xC0, 0xC1, 0xC2):
+            height, width = struct.unpack(">HH", data[i + 5:i + 9])
+            return width, height
+        if marker == 0xD8 or 0xD0 <= marker <= 0xD7:
+            i += 2
+            continue
+        i += 2 + struct.unpack(">H", data[i + 2:i + 4])[0]
+    raise ValueError("no SOF marker in JPEG")
+
+
+def chunk(fourcc, payload):
+    pad = b"\0" if len(payload) % 2 else b""
+    return fourcc + struct.pack("<I", len(payload)) + payload + pad
+
+
+def avi_headers(width, height, frames, fps, max_frame, movi_size, idx_size):
+    """Everything before the first frame. Sizes are known up front, so the
+    file is written front to back with no seeking or patching."""
+    usec = int(1000000 / fps)
+    avih = struct.pack("<14I", usec, int(max_frame * fps), 0, AVIF_HASINDEX, frames, 0, 1,
+                       max_frame, width, height, 0, 0, 0, 0)
+    strh = struct.pack("<4s4sIHHIIIIIIIIhhhh", b"vids", b"MJPG", 0, 0, 0, 0, 1000, int(fps * 1000), 0,
+                       frames, max_frame, 0xFFFFFFFF, 0, 0, 0, width, height)
+    strf = struct.pack("<IiiHH4sIiiII", 40, width, height, 1, 24, b"MJPG", width * height * 3, 0, 0, 0, 0)
+    strl = b"LIST" + struct.pack("<I", 4 + 8 + len(strh) + 8 + len(strf)) + b"strl" + chunk(b"strh", strh) + chunk(b"strf", strf)
+    hdrl_body = b"hdrl" + chunk(b"avih", avih) + strl
+    hdrl = b"LIST" + struct.pack("<I", len(hdrl_body)) + hdrl_body
+    riff_size = 4 + len(hdrl) + 8 + movi_size + 8 + idx_size
+    return b"RIFF" + struct.pack("<I", riff_size) + b"AVI " + hdrl + b"LIST" + struct.pack("<I", movi_size) + b"movi"
+
+
+def write_avi(data_path, frames, out_path, progress=None):
+    """frames: rally index entries (offset, length, timestamp) into data_path"""
+    if not frames:
+        raise ValueError("rally has no frames")
+    duration = frames[-1][2] - frames[0][2]
+    fps = (len(frames) - 1) / duration if duration > 0 else DEFAULT_FPS
+    sizes = [length for _, length, _ in frames]
+    padded = [n + n % 2 for n in sizes]
+    movi_size = 4 + sum(8 + n for n in padded)
+    idx_size = 16 * len(frames)
+
+    with open(data_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data, open(out_path + ".tmp", "wb") as out:
+        width, height = jpeg_size(data[frames[0][0]:frames[0][0] + min(frames[0][1], 65536)])
+        out.write(avi_headers(width, height, len(frames), fps, max(sizes), movi_size, idx_size))
+        for i, (offset, length, _) in enumerate(frames):
+            out.write(b"00dc" + struct.pack("<I", length))
+            out.write(data[offset:offset + length])
+            if length % 2:
+                out.write(b"\0")
+            if progress and (i + 1) % PROGRESS_EVERY == 0:
+                progress(i + 1, len(frames))
+        # idx1: offsets are relative to the "movi" fourcc
+        out.write(b"idx1" + struct.pack("<I", idx_size))
+        pos = 4
+        for length, n in zip(sizes, padded):
+            out.write(struct.pack("<4sIII", b"00dc", AVIIF_KEYFRAME, pos, length))
+            pos += 8 + n
+    os.replace(out_path + ".tmp", out_path)
+    if progress:
+        progress(len(frames), len(frames))
+
+
+# --- worker processes -------------------------------------------------
+
+_progress_queue = None
+
+
+def _worker_init(progress_queue):
+    global _progress_queue
+    _progress_queue = progress_queue
+    try:
+        os.nice(EXPORT_NICE)
+    except (AttributeError, OSError):
+        pass
+
+
+def _export_job(job_id, data_path, frames, out_path):
+    write_avi(data_path, frames, out_path, lambda done, total: _progress_queue.put((job_id, done, total)))
+    return out_path
+
+
+class ExportManager:
+    """Export job queue. Jobs are dicts so routes can jsonify them directly."""
+
+    def __init__(self, directory=EXPORT_DIR, max_workers=MAX_EXPORT_WORKERS, max_queued=MAX_QUEUED_EXPORTS,
+                 max_finished=MAX_FINISHED_EXPORTS, keep_s=EXPORT_KEEP_S):
+        self.directory = directory
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.max_finished = max_finished
+        self.keep_s = keep_s
+        self.jobs = {}
+        self.next_id = 1
+        self.lock = threading.Lock()
+        self.pool = None
+        self.progress = None
+
+    def _start_pool(self):
+        ctx = multiprocessing.get_context("spawn")  # don't fork the pygame/Flask process
+        self.progress = ctx.Queue()
+        self.pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=ctx,
+                                        initializer=_worker_init, initargs=(self.progress,))
+        threading.Thread(target=self._progress_loop, daemon=True).start()
+
+    def _progress_loop(self):
+        while True:
+            job_id, done, total = self.progress.get()
+            with self.lock:
+                job = self.jobs.get(job_id)
+                if job and job["status"] in ("queued", "running"):
+                    job["status"] = "running"
+                    job["progress"] = round(done / total, 3)
+
+    def active(self):
+        return sum(1 for job in self.jobs.values() if job["status"] in ("queued", "running"))
+
+    def submit(self, rally):
+        """Queue an export of rally. Returns the job, or None if the queue is full."""
+        with self.lock:
+            self._expire()
+            if self.active() >= self.max_queued:
+                return None
+            if self.pool is None:
+                os.makedirs(self.directory, exist_ok=True)
+                self._start_pool()
+            job_id = self.next_id
+            self.next_id += 1
+            path = os.path.join(self.directory, f"rally_{rally.id}_{job_id}.avi")
+            job = {"id": job_id, "rally": rally.id, "status": "queued", "progress": 0.0, "file": os.path.basename(path)}
+            self.jobs[job_id] = job
+        future = self.pool.submit(_export_job, job_id, rally.data_path, list(rally.frames), path)
+        future.add_done_callback(lambda f: self._finished(job_id, f))
+        return self.get(job_id)
+
+    def _finished(self, job_id, future):
+        with self.lock:
+            job = self.jobs[job_id]
+            if future.cancelled():
+                job["status"] = "cancelled"
+            elif future.exception():
+                job["status"] = "failed"
+                job["error"] = str(future.exception())
+            else:
+                job["status"] = "done"
+                job["progress"] = 1.0
+            job["finished"] = time.time()
+            self._expire()
+        print(f"Export {job_id}: {job['status']}", flush=True)
+
+    def _expire(self):
+        """Forget finished jobs older than keep_s or past the newest
+        max_finished, and delete their files (call with the lock held)"""
+        finished = sorted((job for job in self.jobs.values() if "finished" in job), key=lambda job: job["id"])
+        cutoff = time.time() - self.keep_s
+        for i, job in enumerate(finished):
+            if job["finished"] >= cutoff and i >= len(finished) - self.max_finished:
+                continue
+            del self.jobs[job["id"]]
+            path = os.path.join(self.directory, job["file"])
+            for stale in (path, path + ".tmp"):
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+
+    def get(self, job_id):
+        with self.lock:
+            self._expire()
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def path(self, job_id):
+        job = self.get(job_id)
+        if job and job["status"] == "done":
+            return os.path.join(self.directory, job["file"])
+        return None
+
+    def shutdown(self):
+        if self.pool:
+            self.pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Fake replay server - Ping Pong Scorer
+Stands in for the camera box at REPLAY_SERVER so the replay path can be run
+and benchmarked anywhere. GET /stream serves a multipart MJPEG stream at a
+set fps, resolution, write size and timing jitter, either from synthetic
+frames (a ball crossing the table) or from a recorded file - a stored rally
+(rallies/<id>.mjpeg) or any concatenated JPEGs. Every other GET is answered
+with 200 and logged, as a target for send_to_replay_server.
+Usage: python3 fake_replay_server.py [--port 8765] [--fps 30] [--size 1280x720]
+                                     [--chunk 4096] [--jitter 0.005] [--source rallies/3.mjpeg]
+"""
+import io
+import os
+import sys
+import json
+import random
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+DEFAULT_PORT = 8765
+SYNTHETIC_FRAMES = 30  # one second loop at 30 fps
+
+
+def synthetic_frames(size, count=SYNTHETIC_FRAMES):
+    """JPEGs of a ball moving across a green table"""
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+    width, height = size
+    frames = []
+    for i in range(count):
+        surface = pygame.Surface(size)
+        surface.fill((20, 90, 60))
+        pygame.draw.line(surface, (255, 255, 255), (width // 2, 0), (width // 2, height), 4)
+        x = int(width * (0.1 + 0.8 * i / max(1, count - 1)))
+        y = int(height * (0.5 - 0.3 * abs(2 * i / max(1, count - 1) - 1)))
+        pygame.draw.circle(surface, (255, 140, 0), (x, y), max(4, width // 80))
+        out = io.BytesIO()
+        pygame.image.save(surface, out, "frame.jpg")
+        frames.append(out.getvalue())
+    return frames
+
+
+def recorded_frames(path):
+    """JPEGs from a stored rally (uses its .json index) or any file of back-to-back JPEGs"""
+    with open(path, "rb") as f:
+        data = f.read()
+    index_path = os.path.splitext(path)[0] + ".json"
+    if os.path.exists(index_path):
+        with open(index_path) as f:
+            return [data[offset:offset + length] for offset, length, _ in json.load(f)["frames"]]
+    frames = []
+    start = data.find(b"\xff\xd8")
+    while start != -1:
+        end = data.find(b"\xff\xd9", start)
+        if end == -1:
+            break
+        frames.append(data[start:end + 2])
+        start = data.find(b"\xff\xd8", end + 2)
+    return frames
+
+
+class FakeReplayServer:
+    """Threaded HTTP server. Counters are read by the benchmarks."""
+
+    def __init__(self, port=DEFAULT_PORT, fps=30, size=(1280, 720), chunk=4096, jitter=0.0, source=None, seed=1234):
+        self.fps = fps
+        self.chunk = chunk
+        self.jitter = jitter
+        self.frames = recorded_frames(source) if source else synthetic_frames(size)
+        if not self.frames:
+            raise ValueError(f"no JPEG frames in {source}")
+        self.random = random.Random(seed)  # same jitter sequence every run
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.requests = []  # (path, time) of every non-stream GET
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self.thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] == "/stream":
+                    server._stream(self)
+                    return
+                with server.lock:
+                    server.requests.append((self.path, time.time()))
+                body = json.dumps({"status": "ok", "path": self.path}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def _stream(self, handler):
+        handler.send_response(200)
+        handler.send_header("Content-Type", "multipart/x-mixed-replace; boundary=frame")
+        handler.end_headers()
+        interval = 1.0 / self.fps
+        next_at = time.perf_counter()
+        i = 0
+        try:
+            while True:
+                jpg = self.frames[i % len(self.frames)]
+                part = b"--frame\r\nContent-Type: image/jpeg\r\nContent-Length: %d\r\n\r\n" % len(jpg) + jpg + b"\r\n"
+                for at in range(0, len(part), self.chunk):
+                    handler.wfile.write(part[at:at + self.chunk])
+                    handler.wfile.flush()
+                with self.lock:
+                    self.frames_sent += 1
+                    self.bytes_sent += len(part)
+                i += 1
+                # Fixed schedule, so jitter moves frames without changing the average fps
+                next_at += interval
+                with self.lock:
+                    delay = next_at + self.random.uniform(-self.jitter, self.jitter) - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client went away
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def option(name, default, convert=str):
+    if name in sys.argv:
+        return convert(sys.argv[sys.argv.index(name) + 1])
+    return default
+
+
+def parse_size(text):
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+if __name__ == "__main__":
+    server = FakeReplayServer(
+        port=option("--port", DEFAULT_PORT, int),
+        fps=option("--fps", 30, float),
+        size=option("--size", (1280, 720), parse_size),
+        chunk=option("--chunk", 4096, int),
+        jitter=option("--jitter", 0.0, float),
+        source=option("--source", None),
+    )
+    print(f"Fake replay server on {server.url} ({len(server.frames)} frames at {server.fps:g} fps)", flush=True)
+    print(f"Point REPLAY_SERVER at {server.url} to use it", flush=True)
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Shared-memory frame ring - Ping Pong Scorer
+One writer (the capture process) and any number of readers. Each slot holds
+a decoded RGB frame and the JPEG it came from; readers get a view straight
+into shared memory, no copy.
+
+Layout:  [ring header][slot header | RGB pixels | JPEG bytes] x slots
+Ring header holds the geometry and write_seq (frames written so far).
+Each slot header holds seq + 1 of the frame in it (0 while being written),
+its capture timestamp, JPEG length and motion (how much the picture changed
+since the frame before, see capture_process.motion). A reader checks the slot seq before and after
+using the pixels; if it moved, the writer lapped the reader and the frame
+is dropped.
+"""
+import bisect
+import struct
+from multiprocessing import shared_memory
+
+import pygame
+
+MAGIC = b"PPFR"
+RING_HEADER = struct.Struct("<4sIIIQI")  # magic, slots, width, height, write_seq, max_jpeg
+SLOT_HEADER = struct.Struct("<QdIf")     # seq + 1, timestamp, jpeg length, motion
+RING_HEADER_SIZE = 64
+SLOT_HEADER_SIZE = 64
+WRITE_SEQ_OFFSET = 16
+MAX_JPEG_BYTES = 256 * 1024  # bigger frames are kept decoded only
+
+
+def slot_bytes(size, max_jpeg=MAX_JPEG_BYTES):
+    return SLOT_HEADER_SIZE + size[0] * size[1] * 3 + max_jpeg
+
+
+class FrameRing:
+    def __init__(self, shm, slots, width, height, max_jpeg, owner):
+        self.shm = shm
+        self.buf = shm.buf
+        self.slots = slots
+        self.size = (width, height)
+        self.frame_bytes = width * height * 3
+        self.max_jpeg = max_jpeg
+        self.slot_bytes = slot_bytes(self.size, max_jpeg)
+        self.owner = owner
+
+    @classmethod
+    def create(cls, slots, size, max_jpeg=MAX_JPEG_BYTES):
+        width, height = size
+        shm = shared_memory.SharedMemory(create=True, size=RING_HEADER_SIZE + slots * slot_bytes(size, max_jpeg))
+        RING_HEADER.pack_into(shm.buf, 0, MAGIC, slots, width, height, 0, max_jpeg)
+        ring = cls(shm, slots, width, height, max_jpeg, owner=True)
+        for seq in range(slots):
+            SLOT_HEADER.pack_into(shm.buf, ring._slot_offset(seq), 0, 0.0, 0, 0.0)
+        return ring
+
+    @classmethod
+    def attach(cls, name):
+        # Processes spawned by the creator share its resource tracker, so the
+        # segment is only unlinked once, by the creator's close()
+        shm = shared_memory.SharedMemory(name=name)
+        magic, slots, width, height, _, max_jpeg = RING_HEADER.unpack_from(shm.buf, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{name} is not a frame ring")
+        return cls(shm, slots, width, height, max_jpeg, owner=False)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def _slot_offset(self, seq):
+        return RING_HEADER_SIZE + (seq % self.slots) * self.slot_bytes
+
+    # --- writer side -------------------------------------------------
+
+    def write_seq(self):
+        """Number of frames written so far (also the seq the next frame gets)"""
+        return struct.unpack_from("<Q", self.buf, WRITE_SEQ_OFFSET)[0]
+
+    def begin_write(self):
+        """Claim the next slot. Returns (seq, pixel view) - decode straight into the view."""
+        seq = self.write_seq()
+        offset = self._slot_offset(seq)
+        SLOT_HEADER.pack_into(self.buf, offset, 0, 0.0, 0, 0.0)  # readers now skip this slot
+        return seq, self.buf[offset + SLOT_HEADER_SIZE:offset + SLOT_HEADER_SIZE + self.frame_bytes]
+
+    def commit(self, seq, timestamp, jpeg=b"", motion=0.0):
+        offset = self._slot_offset(seq)
+        if len(jpeg) > self.max_jpeg:
+            jpeg = b""
+        jpeg_at = offset + SLOT_HEADER_SIZE + self.frame_bytes
+        self.buf[jpeg_at:jpeg_at + len(jpeg)] = jpeg
+        SLOT_HEADER.pack_into(self.buf, offset, seq + 1, timestamp, len(jpeg), motion)
+        struct.pack_into("<Q", self.buf, WRITE_SEQ_OFFSET, seq + 1)
+
+    # --- reader side -------------------------------------------------
+
+    def is_valid(self, seq):
+        """True while frame seq is still in its slot"""
+        return struct.unpack_from("<Q", self.buf, self._slot_offset(seq))[0] == seq + 1
+
+    def timestamp(self, seq):
+        stored, ts, _, _ = SLOT_HEADER.unpack_from(self.buf, self._slot_offset(seq))
+        return ts if stored == seq + 1 else None
+
+    def motion(self, seq):
+        stored, _, _, motion = SLOT_HEADER.unpack_from(self.buf, self._slot_offset(seq))
+        return motion if stored == seq + 1 else None
+
+    def oldest_seq(self):
+        return max(0, self.write_seq() - self.slots)
+
+    def pixels(self, seq):
+        """Zero-copy view of frame seq, or None if it was overwritten"""
+        if not self.is_valid(seq):
+            return None
+        offset = self._slot_offset(seq) + SLOT_HEADER_SIZE
+        return self.buf[offset:offset + self.frame_bytes]
+
+    def jpeg(self, seq):
+        """Zero-copy view of the original JPEG of frame seq (None if overwritten or too big)"""
+        offset = self._slot_offset(seq)
+        stored, _, length, _ = SLOT_HEADER.unpack_from(self.buf, offset)
+        if stored != seq + 1 or not length:
+            return None
+        jpeg_at = offset + SLOT_HEADER_SIZE + self.frame_bytes
+        return self.buf[jpeg_at:jpeg_at + length]
+
+    def surface(self, seq):
+        """pygame Surface backed by the shared memory of frame seq (or None).
+        Check is_valid(seq) after using it to catch a frame overwritten mid-read."""
+        view = self.pixels(seq)
+        if view is None:
+            return None
+        return pygame.image.frombuffer(view, self.size, "RGB")
+
+    def close(self):
+        self.buf = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # a surface still points into the ring; the OS frees it at exit
+        if self.owner:
+            self.shm.unlink()
+
+
+MAX_SKEW_S = 0.5  # frames further apart than this don't count as "the same moment"
+
+
+def align_times(times, offsets=None):
+    """Replay timeline across cameras from each camera's frame timestamps
+    (ascending). For every frame of the first camera, a tuple with its index
+    and the index of the closest-in-time frame of each other camera (None if
+    that camera has nothing within MAX_SKEW_S)."""
+    offsets = offsets or [0.0] * len(times)
+    primary = [ts + offsets[0] for ts in times[0]]
+    columns = [list(range(len(primary)))]
+    for camera_times, offset in zip(times[1:], offsets[1:]):
+        shifted = [ts + offset for ts in camera_times]
+        column = []
+        for ts in primary:
+            i = bisect.bisect_left(shifted, ts)
+            best = None
+            for j in (i - 1, i):
+                if 0 <= j < len(shifted) and abs(shifted[j] - ts) <= MAX_SKEW_S:
+                    if best is None or abs(shifted[j] - ts) < abs(shifted[best] - ts):
+                        best = j
+            column.append(best)
+        columns.append(column)
+    return list(zip(*columns))
+
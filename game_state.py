@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Game State - Ping Pong Scorer
+Scoring rules for one table, with no pygame or Flask in sight, plus a
+registry so one process can host many tables. Each table has its own lock,
+so a busy table never waits on another one.
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+
+MAX_UNDO = 100        # points that can be taken back
+DEDUP_WINDOW = 1024   # command ids remembered to drop retries
+COMMAND_TYPES = ("score", "undo", "reset", "set-server")
+MAX_TABLES = 256      # per registry; ids past this are refused, not created
+
+
+class GameState:
+    """One table's game. Every mutation holds self.lock and bumps self.version."""
+
+    def __init__(self, p1_name="Player 1", p2_name="Player 2", points_to_win=11, serves_per_turn=2, first_server=1):
+        self.lock = threading.RLock()
+        self.changed = threading.Condition(self.lock)  # notified on every version bump
+        self.version = 0
+        self.batching = False  # inside apply(): bump() waits for the end of the batch
+        self.batch_changed = False
+
+        self.p1_name = p1_name
+        self.p2_name = p2_name
+        self.p1_score = 0
+        self.p2_score = 0
+        self.serving = first_server
+        self.points_serve = 0
+        self.game_started = False
+        self.game_over = False
+        self.history = deque(maxlen=MAX_UNDO)  # state before each point
+        self.applied = OrderedDict()  # command key -> result, oldest first
+        self.point_log = None  # points.PointLog: scored(record), undone(count), new_game()
+
+        # Game Settings
+        self.points_to_win = points_to_win
+        self.serves_per_turn = serves_per_turn
+        self.first_server = first_server
+
+    def start(self, p1_name=None, p2_name=None):
+        with self.lock:
+            if p1_name:
+                self.p1_name = p1_name
+            if p2_name:
+                self.p2_name = p2_name
+            self.game_started = True
+            self.reset()
+
+    def stop(self):
+        """Back to the setup screen"""
+        with self.lock:
+            self.game_started = False
+            self.game_over = False
+            self.bump()
+
+    def reset(self):
+        with self.lock:
+            self.p1_score = 0
+            self.p2_score = 0
+            self.serving = self.first_server
+            self.points_serve = 0
+            self.game_over = False
+            self.history.clear()
+            if self.point_log:
+                self.point_log.new_game()
+            self.bump()
+
+    def score(self, player):
+        """Add a point. Returns 'point', 'win', or None if the game isn't running."""
+        with self.lock:
+            if self.game_over or not self.game_started:
+                return None
+
+            before = (self.p1_score, self.p2_score, self.serving)
+            self.history.append((self.p1_score, self.p2_score, self.serving, self.points_serve))
+            if player == 1:
+                self.p1_score += 1
+            else:
+                self.p2_score += 1
+
+            # Serve Logic
+            self.points_serve += 1
+            deuce = (self.p1_score >= self.points_to_win - 1 and self.p2_score >= self.points_to_win - 1)
+            threshold = 1 if deuce else self.serves_per_turn
+            if self.points_serve >= threshold:
+                self.serving = 2 if self.serving == 1 else 1
+                self.points_serve = 0
+
+            self.bump()
+            if self.point_log:
+                self.point_log.scored({
+                    # a batch is published as one version, bumped at its end
+                    "time": time.time(), "version": self.version + 1 if self.batching else self.version,
+                    "scorer": player, "server": before[2],
+                    "p1_before": before[0], "p2_before": before[1],
+                    "p1_after": self.p1_score, "p2_after": self.p2_score,
+                    "points_to_win": self.points_to_win, "serves_per_turn": self.serves_per_turn,
+                    "first_server": self.first_server,
+                    "p1_name": self.p1_name, "p2_name": self.p2_name,
+                })
+
+            # Win Logic
+            if (self.p1_score >= self.points_to_win or self.p2_score >= self.points_to_win) and abs(self.p1_score - self.p2_score) >= 2:
+                self.game_over = True
+                return 'win'
+            return 'point'
+
+    def undo(self, count=1):
+        """Take back the last count points. Returns how many were undone."""
+        with self.lock:
+            if not self.game_started:
+                return 0
+            undone = 0
+            while undone < count and self.history:
+                self.p1_score, self.p2_score, self.serving, self.points_serve = self.history.pop()
+                undone += 1
+            if undone:
+                self.game_over = False
+                if self.point_log:
+                    self.point_log.undone(undone)
+                self.bump()
+            return undone
+
+    def set_server(self, player):
+        with self.lock:
+            self.serving = player
+            self.points_serve = 0
+            self.bump()
+
+    def apply(self, commands, client=""):
+        """Run a batch of commands as one state change.
+        commands: dicts with a client-made "id", a "type" from COMMAND_TYPES and
+        "player" (score, set-server) or "count" (undo). A command whose id was
+        already applied is not run again; its first result is returned instead,
+        so a client can resend a batch it got no reply for. Results also carry
+        the scores right after their command and the batch's version.
+        Raises ValueError, with nothing applied, if any command is malformed."""
+        parsed = [parse_command(command) for command in commands]
+        with self.lock:
+            self.batching = True
+            self.batch_changed = False
+            results = []  # (result, duplicate)
+            try:
+                for command_id, kind, arg in parsed:
+                    key = (client, command_id)
+                    if key in self.applied:
+                        results.append((self.applied[key], True))
+                        continue
+                    if kind == "score":
+                        outcome = self.score(arg)
+                    elif kind == "undo":
+                        outcome = self.undo(arg)
+                    elif kind == "reset":
+                        self.reset()
+                        outcome = "reset"
+                    else:
+                        self.set_server(arg)
+                        outcome = "ok"
+                    result = {"id": command_id, "type": kind, "result": outcome,
+                              "p1_score": self.p1_score, "p2_score": self.p2_score}
+                    self.applied[key] = result
+                    if len(self.applied) > DEDUP_WINDOW:
+                        self.applied.popitem(last=False)
+                    results.append((result, False))
+            finally:
+                # Watchers see one new version for the whole batch
+                self.batching = False
+                if self.batch_changed:
+                    self.bump()
+            for result, duplicate in results:
+                if not duplicate:
+                    result["version"] = self.version
+            return [dict(result, duplicate=duplicate) for result, duplicate in results]
+
+    def bump(self):
+        """Mark a state change (caller holds the lock) and wake long-pollers"""
+        if self.batching:
+            self.batch_changed = True
+            return
+        self.version += 1
+        self.changed.notify_all()
+
+    def wait_for_version(self, version, timeout):
+        """Block until the state moves past version or timeout runs out. Returns the current version."""
+        with self.changed:
+            self.changed.wait_for(lambda: self.version > version, timeout)
+            return self.version
+
+    def load(self, state):
+        """Copy fields from another table's to_dict() (mirror displays)"""
+        with self.lock:
+            for key, value in state.items():
+                if key != "version" and hasattr(self, key):
+                    setattr(self, key, value)
+            self.bump()
+
+    def name(self, player):
+        return self.p1_name if player == 1 else self.p2_name
+
+    def player_score(self, player):
+        return self.p1_score if player == 1 else self.p2_score
+
+    def winner(self):
+        return self.p1_name if self.p1_score > self.p2_score else self.p2_name
+
+    def to_dict(self):
+        with self.lock:
+            return dict(
+                version=self.version,
+                p1_name=self.p1_name,
+                p1_score=self.p1_score,
+                p2_name=self.p2_name,
+                p2_score=self.p2_score,
+                serving=self.serving,
+                game_started=self.game_started,
+                game_over=self.game_over,
+                # What a client needs to run the rules itself (the phone remote)
+                points_serve=self.points_serve,
+                points_to_win=self.points_to_win,
+                serves_per_turn=self.serves_per_turn,
+                first_server=self.first_server,
+            )
+
+
+def parse_command(command):
+    """(id, type, player or count) from one command dict, or ValueError"""
+    if not isinstance(command, dict):
+        raise ValueError("command must be an object")
+    command_id = command.get("id")
+    kind = command.get("type")
+    if not isinstance(command_id, (str, int)) or command_id == "":
+        raise ValueError("command needs an id")
+    if kind not in COMMAND_TYPES:
+        raise ValueError(f"unknown command type {kind!r}")
+    if kind in ("score", "set-server"):
+        arg = command.get("player")
+        if arg not in (1, 2):
+            raise ValueError(f"{kind} needs player 1 or 2")
+    elif kind == "undo":
+        arg = command.get("count", 1)
+        if not isinstance(arg, int) or arg < 1:
+            raise ValueError("undo count must be a positive integer")
+    else:
+        arg = None
+    return command_id, kind, arg
+
+
+class TableRegistry:
+    """Table id -> GameState. The registry lock only guards creating tables."""
+
+    def __init__(self, max_tables=MAX_TABLES, **defaults):
+        self.defaults = defaults
+        self.max_tables = max_tables
+        self.tables = {}
+        self.lock = threading.Lock()
+
+    def get(self, table_id, create=True):
+        """Table table_id; a new one if create, unless max_tables exist (None then)"""
+        game = self.tables.get(table_id)
+        if game is None and create:
+            with self.lock:
+                game = self.tables.get(table_id)
+                if game is None:
+                    if len(self.tables) >= self.max_tables:
+                        return None
+                    game = GameState(**self.defaults)
+                    self.tables[table_id] = game
+        return game
+
+    def remove(self, table_id):
+        with self.lock:
+            return self.tables.pop(table_id, None)
+
+    def ids(self):
+        return sorted(self.tables)
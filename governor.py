@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Thermal governor - Ping Pong Scorer
+A Pi in a hot room throttles its CPU and then the display, capture and
+replay all stutter together. The governor samples CPU temperature and load
+every few seconds and steps the expensive work down before that happens:
+render fps, how many stream frames get decoded, and replay decoding. It
+moves one level per sample, with some hysteresis on the way back down.
+Scoring doesn't slow down with it - the render loop wakes early for input
+(see PingPongDisplay.wait_for_frame).
+For tests, point temp_path/load_path at plain files in the same format as
+/sys/class/thermal/thermal_zone0/temp (millidegrees) and /proc/loadavg.
+"""
+import os
+import time
+import threading
+from collections import deque
+
+TEMP_PATH = "/sys/class/thermal/thermal_zone0/temp"
+LOAD_PATH = "/proc/loadavg"
+SAMPLE_EVERY_S = 2.0
+
+# Level i+1 starts above these (a Pi 4 throttles itself at 80 C)
+TEMP_STEPS_C = (65.0, 72.0, 77.0)
+LOAD_STEPS = (0.85, 1.0, 1.5)  # 1-minute load average per core
+TEMP_HYSTERESIS_C = 3.0
+LOAD_HYSTERESIS = 0.1
+
+LEVELS = [
+    # decode_every: decode one stream frame in N; replay_scale: replay frames
+    # read from disk are decoded at 1/N of the screen size and stretched
+    {"name": "normal", "fps": 60, "decode_every": 1, "replay_scale": 1, "pip": True},
+    {"name": "warm", "fps": 45, "decode_every": 1, "replay_scale": 1, "pip": True},
+    {"name": "hot", "fps": 30, "decode_every": 2, "replay_scale": 2, "pip": False},
+    {"name": "critical", "fps": 20, "decode_every": 3, "replay_scale": 4, "pip": False},
+]
+HISTORY = 50  # decisions kept for /metrics
+
+
+def read_temp_c(path=TEMP_PATH):
+    try:
+        with open(path) as f:
+            return int(f.read().strip()) / 1000
+    except (OSError, ValueError):
+        return None
+
+
+def read_load(path=LOAD_PATH):
+    """1-minute load average per core"""
+    try:
+        with open(path) as f:
+            return float(f.read().split()[0]) / (os.cpu_count() or 1)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def level_for(value, steps, current, hysteresis):
+    """Highest level whose step value is exceeded; stepping down needs value
+    to be hysteresis below the step"""
+    if value is None:
+        return 0
+    level = 0
+    for i, step in enumerate(steps):
+        if value > step or (current > i and value > step - hysteresis):
+            level = i + 1
+    return level
+
+
+class Governor:
+    def __init__(self, on_change, temp_path=TEMP_PATH, load_path=LOAD_PATH, interval=SAMPLE_EVERY_S):
+        """on_change(settings) is called from the governor thread with a LEVELS entry"""
+        self.on_change = on_change
+        self.temp_path = temp_path
+        self.load_path = load_path
+        self.interval = interval
+        self.level = 0
+        self.temp_c = None
+        self.load = None
+        self.changes = 0
+        self.history = deque(maxlen=HISTORY)
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    @property
+    def settings(self):
+        return LEVELS[self.level]
+
+    def sample(self):
+        """Read the sensors and move at most one level. Returns the current level."""
+        temp_c = read_temp_c(self.temp_path)
+        load = read_load(self.load_path)
+        want = max(level_for(temp_c, TEMP_STEPS_C, self.level, TEMP_HYSTERESIS_C),
+                   level_for(load, LOAD_STEPS, self.level, LOAD_HYSTERESIS))
+        with self.lock:
+            self.temp_c, self.load = temp_c, load
+            if want == self.level:
+                return self.level
+            old = self.level
+            self.level += 1 if want > old else -1
+            self.changes += 1
+            decision = {
+                "time": time.time(),
+                "from": LEVELS[old]["name"],
+                "to": LEVELS[self.level]["name"],
+                "temp_c": temp_c,
+                "load_per_core": round(load, 2) if load is not None else None,
+            }
+            self.history.append(decision)
+        print(f"Governor: {decision['from']} -> {decision['to']} "
+              f"(temp {temp_c if temp_c is not None else '?'} C, load {decision['load_per_core']}/core)", flush=True)
+        self.on_change(self.settings)
+        return self.level
+
+    def _loop(self):
+        while not self.stop_event.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        self.sample()
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "level": self.settings["name"],
+                "settings": dict(self.settings),
+                "temp_c": self.temp_c,
+                "load_per_core": round(self.load, 2) if self.load is not None else None,
+                "changes": self.changes,
+                "history": list(self.history),
+            }
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+GPIO Button Input - Ping Pong Scorer
+- Edge-triggered callbacks (no polling loop)
+- Software debounce on top of the backend's own bouncetime
+- Fake pin backend so it runs on any Linux box
+"""
+import queue
+import threading
+import time
+
+# Wiring from the README: GPIO -> button -> ground, internal pull-up.
+# Pin -> button number, same meaning as /score/player1 and /score/player2
+BUTTON_PINS = {15: 1, 18: 2}
+DEBOUNCE_MS = 200
+
+
+class RPiGpioBackend:
+    """Real pins through RPi.GPIO (falling edge = button pressed)"""
+    name = "rpi"
+
+    def __init__(self):
+        import RPi.GPIO as GPIO
+        self.GPIO = GPIO
+        GPIO.setwarnings(False)
+        GPIO.setmode(GPIO.BCM)
+
+    def add_button(self, pin, callback, bouncetime_ms):
+        GPIO = self.GPIO
+        GPIO.setup(pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+        # RPi.GPIO runs callbacks on its own event thread
+        GPIO.add_event_detect(pin, GPIO.FALLING, callback=callback, bouncetime=bouncetime_ms)
+
+    def close(self):
+        self.GPIO.cleanup()
+
+
+class FakePinBackend:
+    """In-memory pins for tests and benchmarks.
+    press() queues a falling edge, delivered on a single event thread like RPi.GPIO."""
+    name = "fake"
+
+    def __init__(self):
+        self.callbacks = {}
+        self.edges = queue.Queue()
+        self.running = True
+        self.thread = threading.Thread(target=self._dispatch, daemon=True)
+        self.thread.start()
+
+    def add_button(self, pin, callback, bouncetime_ms):
+        # bouncetime is left to GpioButtons so the software debounce gets exercised
+        self.callbacks[pin] = callback
+
+    def press(self, pin, bounces=0):
+        """Simulate a press, optionally with contact bounce (extra edges right after)"""
+        for _ in range(1 + bounces):
+            self.edges.put(pin)
+
+    def _dispatch(self):
+        while self.running:
+            pin = self.edges.get()
+            if pin is None:
+                break
+            callback = self.callbacks.get(pin)
+            if callback:
+                callback(pin)
+
+    def close(self):
+        self.running = False
+        self.edges.put(None)
+
+
+def make_backend(name="auto"):
+    """Pick a backend: 'rpi', 'fake', 'auto' (RPi.GPIO if importable) or 'off'"""
+    if name == "off":
+        return None
+    if name == "fake":
+        return FakePinBackend()
+    try:
+        return RPiGpioBackend()
+    except (ImportError, RuntimeError) as e:
+        if name == "rpi":
+            raise
+        print(f"GPIO not available ({e}) - buttons disabled", flush=True)
+        return None
+
+
+class GpioButtons:
+    """Calls on_press(button, pressed_at) once per debounced press.
+    pressed_at is a time.perf_counter() stamp taken in the edge callback."""
+
+    def __init__(self, on_press, backend, pins=None, debounce_ms=DEBOUNCE_MS):
+        self.on_press = on_press
+        self.backend = backend
+        self.pins = dict(pins or BUTTON_PINS)
+        self.debounce_ms = debounce_ms
+        self.last_edge = {}
+        self.lock = threading.Lock()
+        self.presses = 0
+        self.bounces_ignored = 0
+
+    def start(self):
+        for pin in self.pins:
+            self.backend.add_button(pin, self._edge, self.debounce_ms)
+        print(f"GPIO buttons ({self.backend.name}): " +
+              ", ".join(f"GPIO {pin} -> /score/player{btn}" for pin, btn in self.pins.items()), flush=True)
+
+    def _edge(self, pin):
+        now = time.perf_counter()
+        with self.lock:
+            last = self.last_edge.get(pin)
+            if last is not None and (now - last) * 1000 < self.debounce_ms:
+                self.bounces_ignored += 1
+                return
+            self.last_edge[pin] = now
+            self.presses += 1
+        self.on_press(self.pins[pin], now)
+
+    def close(self):
+        self.backend.close()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Highlight reel - Ping Pong Scorer
+Every saved rally of the current game gets an intensity score from things
+that are already known when it's saved: how long it lasted, how much the
+picture moved (capture_process.motion, kept per frame by the rally spool) and what was
+at stake (deuce, game point, the winning point). The reel keeps the top
+REEL_SIZE rallies sorted as points come in, so when the game ends it's
+already there - no pass over the match afterwards. It plays back-to-back in
+match order, on the replay screen and as one MJPEG stream.
+"""
+import bisect
+import threading
+
+REEL_SIZE = 5
+FULL_DURATION_S = 20.0  # a rally this long gets the whole duration share
+FULL_MOTION = 12.0      # mean brightness change per frame that counts as frantic
+DURATION_WEIGHT = 1.0
+MOTION_WEIGHT = 1.0
+CONTEXT_BONUS = {"deuce": 0.4, "game_point": 0.5, "winner": 0.8}
+GAP_S = 1.0             # pause between rallies in the reel
+
+
+def rally_activity(times, motions):
+    """{"seconds", "motion"} of a rally from its frames' timestamps and motion"""
+    return {
+        "seconds": round(times[-1] - times[0], 2) if times else 0.0,
+        "motion": round(sum(motions) / len(motions), 2) if motions else 0.0,
+    }
+
+
+def score_context(player, p1_score, p2_score, points_to_win, won):
+    """What was at stake on a point, from the score after it"""
+    before = [p1_score - (player == 1), p2_score - (player == 2)]
+    tags = []
+    if min(before) >= points_to_win - 1:
+        tags.append("deuce")
+    if max(before) >= points_to_win - 1 and before[0] != before[1]:
+        tags.append("game_point")
+    if won:
+        tags.append("winner")
+    return tags
+
+
+def intensity(seconds, motion, context):
+    return round(DURATION_WEIGHT * min(1.0, seconds / FULL_DURATION_S)
+                 + MOTION_WEIGHT * min(1.0, motion / FULL_MOTION)
+                 + sum(CONTEXT_BONUS[tag] for tag in context), 3)
+
+
+class Playlist:
+    """Several stored rallies as one rally for ReplayStreamer: frames joined
+    end to end, timestamps shifted so each rally follows the last after GAP_S"""
+
+    def __init__(self, playlist_id, rallies):
+        self.id = playlist_id
+        self.rallies = rallies
+        self.ready = threading.Event()
+        self.ready.set()  # made from saved rallies only
+        self.frames = []  # (offset, length, timestamp) like Rally.frames
+        self.sources = []  # (rally, frame index) per frame
+        shift = None
+        for rally in rallies:
+            if not rally.frames:
+                continue
+            start = rally.frames[0][2]
+            if shift is None:
+                shift = -start
+            else:
+                shift = self.frames[-1][2] + GAP_S - start
+            for i, (offset, length, ts) in enumerate(rally.frames):
+                self.frames.append((offset, length, ts + shift))
+                self.sources.append((rally, i))
+
+    def frame(self, i):
+        rally, j = self.sources[i]
+        return rally.frame(j)
+
+
+class HighlightReel:
+    """Top rallies of the current game, ranked as each one is saved"""
+
+    def __init__(self, size=REEL_SIZE):
+        self.size = size
+        self.lock = threading.Lock()
+        self.ranked = []  # (-intensity, rally id, entry), best first
+        self.keys = []  # (-intensity, rally id) of each ranked item, for bisect
+        self.version = 0  # bumped whenever the reel changes
+        self.rallies_seen = 0
+        self.cached = None  # (version, Playlist): viewers of one reel share a stream
+
+    def add(self, rally, context):
+        """Rank one saved rally (rally.info has rally_activity's fields)"""
+        entry = {
+            "rally": rally.id,
+            "intensity": intensity(rally.info.get("seconds", 0.0), rally.info.get("motion", 0.0), context),
+            "context": context,
+            "seconds": rally.info.get("seconds", 0.0),
+            "motion": rally.info.get("motion", 0.0),
+        }
+        with self.lock:
+            self.rallies_seen += 1
+            key = (-entry["intensity"], rally.id)
+            if len(self.ranked) >= self.size and key > self.ranked[-1][:2]:
+                return entry  # not good enough
+            i = bisect.bisect_right(self.keys, key)
+            self.keys.insert(i, key)
+            self.ranked.insert(i, key + (entry,))
+            del self.keys[self.size:]
+            del self.ranked[self.size:]
+            self.version += 1
+        return entry
+
+    def clear(self):
+        with self.lock:
+            self.ranked = []
+            self.keys = []
+            self.rallies_seen = 0
+            self.version += 1
+
+    def entries(self):
+        """Reel entries in match order (the order they play in)"""
+        with self.lock:
+            return sorted((item[2] for item in self.ranked), key=lambda entry: entry["rally"])
+
+    def playlist(self, store, timeout=5.0):
+        """Playlist of the reel's rallies still in store (None if empty).
+        timeout: how long to wait for a rally that is still being written"""
+        with self.lock:
+            version, cached = self.version, self.cached
+        if cached and cached[0] == version:
+            return cached[1]
+        rallies = [store.get(entry["rally"]) for entry in self.entries()]
+        rallies = [r for r in rallies if r is not None and r.ready.wait(timeout) and r.frames]
+        if not rallies:
+            return None
+        playlist = Playlist(f"highlights-{version}", rallies)
+        if len(rallies) == len(self.entries()):
+            self.cached = (version, playlist)
+        return playlist
+
+    def stats(self):
+        with self.lock:
+            return {"rallies_seen": self.rallies_seen, "version": self.version, "size": self.size}
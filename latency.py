@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Input-to-pixel latency tracing - Ping Pong Scorer
+Every score command gets a trace stamped on arrival. The trace is marked as it
+goes through the state change and the event publish, and closed by the flip
+of the first frame drawn after it. Each stage feeds its own histogram.
+"""
+import bisect
+import threading
+import time
+
+# Bucket upper bounds in ms (last bucket is everything above)
+BUCKETS_MS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 16, 25, 33, 50, 100, 250, 500, 1000]
+
+# Stage name -> (start mark, end mark)
+STAGES = {
+    'dispatch': ('arrival', 'handler'),      # WSGI entry -> route handler
+    'score': ('handler', 'scored'),          # state change
+    'publish': ('scored', 'published'),      # handing the events to the bus
+    'frame_wait': ('published', 'shown'),    # until the flip that shows it
+    'total': ('arrival', 'shown'),
+}
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers (None if empty)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+class LatencyHistogram:
+    """Fixed-bucket histogram, cheap enough to record on every input"""
+
+    def __init__(self, bounds=BUCKETS_MS):
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, ms):
+        self.counts[bisect.bisect_left(self.bounds, ms)] += 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th sample (at most the max seen)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return min(self.bounds[i], self.max) if i < len(self.bounds) else self.max
+        return self.max
+
+    def snapshot(self):
+        buckets = {f"le_{b}": n for b, n in zip(self.bounds, self.counts)}
+        buckets['inf'] = self.counts[-1]
+        return {
+            'count': self.count,
+            'mean_ms': self.total / self.count if self.count else None,
+            'p50_ms': self.quantile(0.5),
+            'p99_ms': self.quantile(0.99),
+            'max_ms': self.max if self.count else None,
+            'buckets': buckets,
+        }
+
+
+class ScoreTrace:
+    __slots__ = ('source', 'marks')
+
+    def __init__(self, source, arrival):
+        self.source = source
+        self.marks = {'arrival': arrival}
+
+    def mark(self, name):
+        self.marks[name] = time.perf_counter()
+
+
+class LatencyTracer:
+    """Collects traces from request/GPIO threads and closes them from the render loop"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = []
+        self.stages = {name: LatencyHistogram() for name in STAGES}
+        self.by_source = {}
+
+    def begin(self, source, arrival=None):
+        trace = ScoreTrace(source, arrival if arrival is not None else time.perf_counter())
+        trace.mark('handler')
+        return trace
+
+    def submit(self, trace):
+        """Trace reached the state change; wait for the next flip"""
+        with self.lock:
+            self.pending.append(trace)
+
+    def frame_drawing(self):
+        """Call before drawing a frame: takes the traces whose state change
+        it will show. Traces submitted while it's drawn wait for the next one."""
+        if not self.pending:
+            return []
+        with self.lock:
+            drawing, self.pending = self.pending, []
+        return drawing
+
+    def frame_shown(self, drawing):
+        """Call right after the flip, with what frame_drawing returned"""
+        if not drawing:
+            return
+        now = time.perf_counter()
+        with self.lock:
+            for trace in drawing:
+                trace.marks['shown'] = now
+                for name, (start, end) in STAGES.items():
+                    if start in trace.marks and end in trace.marks:
+                        self.stages[name].record((trace.marks[end] - trace.marks[start]) * 1000)
+                if trace.source not in self.by_source:
+                    self.by_source[trace.source] = LatencyHistogram()
+                self.by_source[trace.source].record((now - trace.marks['arrival']) * 1000)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'stages': {name: h.snapshot() for name, h in self.stages.items()},
+                'press_to_screen': {src: h.snapshot() for src, h in self.by_source.items()},
+            }
+
+
+class ArrivalStamp:
+    """WSGI middleware: stamp each request before Werkzeug hands it to Flask"""
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        environ['pingpong.arrival'] = time.perf_counter()
+        return self.wsgi_app(environ, start_response)
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Mirror displays - Ping Pong Scorer
+The primary scorer streams its game state over TCP to any number of
+follower screens (far end of the table, hallway). Each follower gets one
+full snapshot when it connects, then one line of JSON per state change with
+only the fields that changed:
+    {"b": 41, "v": 42, "t": 1718000000.12, "d": {"p1_score": 7}}
+b is the version the delta applies to. A follower that sees b != its own
+version has missed something and asks for a snapshot ("snapshot\\n"). The
+publisher wakes on GameState's condition, so a point goes out as soon as it
+is scored, not on a poll interval. When nothing happens a heartbeat
+({"v": 42, "t": ...}) goes out every HEARTBEAT_S so dead followers are
+noticed.
+"""
+import json
+import socket
+import threading
+import time
+
+from latency import LatencyHistogram
+
+MIRROR_PORT = 5010
+HEARTBEAT_S = 2.0
+SEND_TIMEOUT_S = 1.0     # a follower this slow is dropped (it reconnects)
+RECONNECT_S = 1.0
+FIELDS = ("p1_name", "p1_score", "p2_name", "p2_score", "serving", "game_started", "game_over")
+
+
+def encode(message):
+    return json.dumps(message, separators=(",", ":")).encode() + b"\n"
+
+
+class MirrorClient:
+    def __init__(self, conn, addr):
+        self.conn = conn
+        self.addr = addr
+        self.lock = threading.Lock()  # snapshot replies and broadcasts share the socket
+
+    def send(self, data):
+        with self.lock:
+            self.conn.sendall(data)
+
+
+class MirrorServer:
+    """Primary side: publishes game's state to every connected follower"""
+
+    def __init__(self, game, port=MIRROR_PORT, host="0.0.0.0"):
+        self.game = game
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((host, port))
+        self.port = self.sock.getsockname()[1]
+        self.clients = []
+        self.lock = threading.Lock()
+        self.deltas = 0
+        self.snapshots = 0
+
+    def start(self):
+        self.sock.listen()
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        threading.Thread(target=self._publish_loop, daemon=True).start()
+        return self
+
+    def snapshot(self):
+        state = self.game.to_dict()
+        return {"v": state["version"], "t": time.time(), "s": {k: state[k] for k in FIELDS}}
+
+    def _accept_loop(self):
+        while True:
+            try:
+                conn, addr = self.sock.accept()
+            except OSError:
+                return  # closed
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            conn.settimeout(SEND_TIMEOUT_S)
+            client = MirrorClient(conn, addr)
+            try:
+                client.send(encode(self.snapshot()))
+            except OSError:
+                conn.close()
+                continue
+            self.snapshots += 1
+            with self.lock:
+                self.clients.append(client)
+            print(f"Mirror follower connected from {addr[0]}", flush=True)
+            threading.Thread(target=self._read_loop, args=(client,), daemon=True).start()
+
+    def _read_loop(self, client):
+        """Followers only ever ask for a snapshot"""
+        buffer = b""
+        while True:
+            try:
+                data = client.conn.recv(1024)
+            except socket.timeout:
+                continue
+            except OSError:
+                data = b""
+            if not data:
+                self._drop(client)
+                return
+            buffer += data
+            while b"\n" in buffer:
+                line, buffer = buffer.split(b"\n", 1)
+                if line.strip() != b"snapshot":
+                    continue
+                try:
+                    client.send(encode(self.snapshot()))
+                    self.snapshots += 1
+                except OSError:
+                    self._drop(client)
+                    return
+
+    def _drop(self, client):
+        with self.lock:
+            if client not in self.clients:
+                return
+            self.clients.remove(client)
+        client.conn.close()
+        print(f"Mirror follower {client.addr[0]} left", flush=True)
+
+    def _publish_loop(self):
+        last = self.game.to_dict()
+        while True:
+            self.game.wait_for_version(last["version"], HEARTBEAT_S)
+            state = self.game.to_dict()
+            if state["version"] == last["version"]:
+                message = {"v": state["version"], "t": time.time()}
+            else:
+                delta = {k: state[k] for k in FIELDS if state[k] != last[k]}
+                message = {"b": last["version"], "v": state["version"], "t": time.time(), "d": delta}
+                self.deltas += 1
+            last = state
+            self._broadcast(encode(message))
+
+    def _broadcast(self, data):
+        with self.lock:
+            clients = list(self.clients)
+        for client in clients:
+            try:
+                client.send(data)
+            except OSError:
+                self._drop(client)
+
+    def stats(self):
+        with self.lock:
+            followers = [c.addr[0] for c in self.clients]
+        return {"port": self.port, "followers": followers, "deltas": self.deltas, "snapshots": self.snapshots}
+
+    def close(self):
+        self.sock.close()
+        with self.lock:
+            clients, self.clients = self.clients, []
+        for client in clients:
+            client.conn.close()
+
+
+class MirrorFollower:
+    """Follower side: keeps a copy of the primary's state.
+    on_state(state, changed) runs on the follower thread for every snapshot
+    and delta applied (changed: the field names that moved)."""
+
+    def __init__(self, host, port=MIRROR_PORT, on_state=None):
+        self.host = host
+        self.port = port
+        self.on_state = on_state
+        self.state = None
+        self.version = None
+        self.applied = 0
+        self.gaps = 0
+        self.snapshots = 0
+        self.lag = LatencyHistogram()  # primary publish -> applied here, ms
+        self.connected = False
+        self.stop_event = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+        return self
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            try:
+                with socket.create_connection((self.host, self.port), timeout=HEARTBEAT_S * 3) as conn:
+                    conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                    self.connected = True
+                    print(f"Mirroring {self.host}:{self.port}", flush=True)
+                    reader = conn.makefile("rb")
+                    for line in reader:
+                        if self.stop_event.is_set():
+                            return
+                        if not self.handle(json.loads(line)):
+                            conn.sendall(b"snapshot\n")
+            except (OSError, ValueError) as e:
+                if self.connected:
+                    print(f"Mirror connection lost: {e}", flush=True)
+            self.connected = False
+            self.version = None  # the next connection starts with a snapshot
+            self.stop_event.wait(RECONNECT_S)
+
+    def handle(self, message):
+        """Apply one message. Returns False if a snapshot is needed."""
+        version = message["v"]
+        if "s" in message:
+            self.state = dict(message["s"])
+            self.version = version
+            self.snapshots += 1
+            self._applied(message, list(self.state))
+            return True
+        if self.version is None:
+            return True  # waiting for the snapshot already asked for
+        if version <= self.version:
+            return True  # old news (heartbeat, or a delta the snapshot already had)
+        if message.get("b") != self.version:
+            self.gaps += 1
+            self.version = None
+            return False
+        self.state.update(message["d"])
+        self.version = version
+        self._applied(message, list(message["d"]))
+        return True
+
+    def _applied(self, message, changed):
+        self.applied += 1
+        self.lag.record(max(0.0, time.time() - message["t"]) * 1000)
+        if self.on_state:
+            self.on_state(dict(self.state), changed)
+
+    def stats(self):
+        return {
+            "primary": f"{self.host}:{self.port}",
+            "connected": self.connected,
+            "version": self.version,
+            "applied": self.applied,
+            "gaps": self.gaps,
+            "snapshots": self.snapshots,
+            "lag": self.lag.snapshot(),
+        }
+
+    def stop(self):
+        self.stop_event.set()
@@ -1,79 +1,186 @@
 #!/usr/bin/env python3
 """
 Ping Pong Scorer - Headless HTTP Server
-Test the HTTP endpoints without a display
+Test the HTTP endpoints without a display, or host many tables at once:
+every table id gets its own GameState under /tables/<id>/...
+The old single-table routes drive the "default" table.
+With --shards N, N worker processes split the tables between them
+(ports 5000..5000+N-1); a request that lands on the wrong worker is
+redirected to the one that owns the table.
 """
+import sys
+import zlib
+import multiprocessing
 
-from flask import Flask, jsonify
+from flask import Flask, jsonify, redirect, request
+
+from game_state import TableRegistry
+from status_cache import StatusCache
 
 app = Flask(__name__)
 
-# Game state
-player1_name = "Player 1"
-player2_name = "Player 2"
-player1_score = 0
-player2_score = 0
-serving_player = 1
-game_started = True  # Auto-start for testing
-game_over = False
-points_to_serve = 0
+DEFAULT_TABLE = "default"
+BASE_PORT = 5000
+
+# Set per worker process by serve()
+shard_index = 0
+shard_count = 1
+
+# Table id -> GameState (auto-started for testing)
+tables = TableRegistry(p1_name="Player 1", p2_name="Player 2")
+status_caches = {}  # GameState -> StatusCache
+
+
+def shard_for(table_id, shards):
+    """Stable table -> worker mapping (same answer in every process)"""
+    return zlib.crc32(table_id.encode()) % shards
+
+
+def wrong_shard(table_id):
+    """Redirect to the worker that owns table_id, or None if it's ours"""
+    owner = shard_for(table_id, shard_count)
+    if owner == shard_index:
+        return None
+    host = request.host.rsplit(':', 1)[0]
+    return redirect(f"http://{host}:{BASE_PORT + owner}{request.full_path.rstrip('?')}", code=307)
+
+
+def get_table(table_id, create=True):
+    """Started table, or None if it doesn't exist (create=False) or no more can be made"""
+    game = tables.get(table_id, create)
+    if game is not None and not game.game_started:
+        game.start()
+    return game
+
+
+def with_table(table_id, respond, create=True):
+    """respond(game) for table_id on the worker that owns it. Reads don't
+    create tables, so a mistyped id can't leave one behind."""
+    redirect_to = wrong_shard(table_id)
+    if redirect_to:
+        return redirect_to
+    game = get_table(table_id, create)
+    if game is None:
+        if create:
+            return jsonify({"status": "error", "message": f"Table limit ({tables.max_tables}) reached"}), 503
+        return jsonify({"status": "error", "message": "No such table"}), 404
+    return respond(game)
+
+
+def score_response(game, player):
+    if game.score(player) is None:
+        return jsonify({"status": "error", "message": "Game not active"})
+    print(f"{game.name(player)} scored! Score: {game.p1_score}-{game.p2_score}")
+    return jsonify({"status": "ok", "player": game.name(player), "score": game.player_score(player)})
+
+
+def render_status(state):
+    return {
+        "player1": {"name": state["p1_name"], "score": state["p1_score"]},
+        "player2": {"name": state["p2_name"], "score": state["p2_score"]},
+        "serving": state["p1_name"] if state["serving"] == 1 else state["p2_name"],
+        "game_started": state["game_started"],
+        "game_over": state["game_over"],
+        "version": state["version"]
+    }
+
+
+def status_response(game):
+    # ETag/304 and ?wait=<version> long-polling; body cached per version
+    cache = status_caches.get(game)
+    if cache is None:
+        cache = status_caches.setdefault(game, StatusCache(game, render_status))
+    return cache.respond(request.args, request.headers)
+
+
+def commands_response(game):
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict) or not isinstance(body.get("commands"), list):
+        return jsonify({"status": "error", "message": 'Expected {"client": ..., "commands": [...]}'}), 400
+    try:
+        results = game.apply(body["commands"], str(body.get("client", "")))
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    return jsonify({"status": "ok", "results": results, **game.to_dict()})
+
+
+def reset_response(game):
+    game.reset()
+    print("Game reset!")
+    return jsonify({"status": "ok", "message": "Game reset"})
+
+
+@app.route('/tables/<table_id>/score/player<int:player>', methods=['GET', 'POST'])
+def table_score(table_id, player):
+    if player not in (1, 2):
+        return jsonify({"status": "error", "message": "Unknown player"}), 404
+    return with_table(table_id, lambda game: score_response(game, player))
+
+@app.route('/tables/<table_id>/status', methods=['GET'])
+def table_status(table_id):
+    return with_table(table_id, status_response, create=False)
+
+@app.route('/tables/<table_id>/reset', methods=['GET', 'POST'])
+def table_reset(table_id):
+    return with_table(table_id, reset_response)
+
+@app.route('/tables/<table_id>/commands', methods=['POST'])
+def table_commands(table_id):
+    return with_table(table_id, commands_response)
+
+@app.route('/tables', methods=['GET'])
+def list_tables():
+    return jsonify({table_id: tables.get(table_id, create=False).to_dict() for table_id in tables.ids()})
 
 @app.route('/score/player1', methods=['GET', 'POST'])
 def score_player1():
-    global player1_score, points_to_serve, serving_player
-    if game_started and not game_over:
-        player1_score += 1
-        points_to_serve += 1
-        if points_to_serve >= 2:
-            serving_player = 2 if serving_player == 1 else 1
-            points_to_serve = 0
-        print(f"Player 1 scored! Score: {player1_score}-{player2_score}")
-        return jsonify({"status": "ok", "player": player1_name, "score": player1_score})
-    return jsonify({"status": "error", "message": "Game not active"})
+    return with_table(DEFAULT_TABLE, lambda game: score_response(game, 1))
 
 @app.route('/score/player2', methods=['GET', 'POST'])
 def score_player2():
-    global player2_score, points_to_serve, serving_player
-    if game_started and not game_over:
-        player2_score += 1
-        points_to_serve += 1
-        if points_to_serve >= 2:
-            serving_player = 2 if serving_player == 1 else 1
-            points_to_serve = 0
-        print(f"Player 2 scored! Score: {player1_score}-{player2_score}")
-        return jsonify({"status": "ok", "player": player2_name, "score": player2_score})
-    return jsonify({"status": "error", "message": "Game not active"})
+    return with_table(DEFAULT_TABLE, lambda game: score_response(game, 2))
 
 @app.route('/status', methods=['GET'])
 def get_status():
-    return jsonify({
-        "player1": {"name": player1_name, "score": player1_score},
-        "player2": {"name": player2_name, "score": player2_score},
-        "serving": player1_name if serving_player == 1 else player2_name,
-        "game_started": game_started,
-        "game_over": game_over
-    })
+    return with_table(DEFAULT_TABLE, status_response)
 
 @app.route('/reset', methods=['GET', 'POST'])
 def reset():
-    global player1_score, player2_score, serving_player, points_to_serve, game_over
-    player1_score = 0
-    player2_score = 0
-    serving_player = 1
-    points_to_serve = 0
-    game_over = False
-    print("Game reset!")
-    return jsonify({"status": "ok", "message": "Game reset"})
+    return with_table(DEFAULT_TABLE, reset_response)
+
+@app.route('/commands', methods=['POST'])
+def commands():
+    return with_table(DEFAULT_TABLE, commands_response)
 
 @app.route('/', methods=['GET'])
 def home():
-    return f"Ping Pong Scorer API - Score: {player1_score}-{player2_score}"
+    return with_table(DEFAULT_TABLE, lambda game: f"Ping Pong Scorer API - Score: {game.p1_score}-{game.p2_score} - Tables: {len(tables.ids())}")
+
+def serve(index=0, shards=1, host='0.0.0.0'):
+    """Run one worker; it owns the tables that shard_for() maps to index"""
+    global shard_index, shard_count
+    shard_index, shard_count = index, shards
+    app.run(host=host, port=BASE_PORT + index, threaded=True)
 
 if __name__ == "__main__":
+    shards = int(sys.argv[sys.argv.index("--shards") + 1]) if "--shards" in sys.argv else 1
     print("\n🏓 Ping Pong Headless Server Running!")
     print("Endpoints:")
     print("  http://192.168.1.200:5000/score/player1")
     print("  http://192.168.1.200:5000/score/player2")
     print("  http://192.168.1.200:5000/status")
-    print("  http://192.168.1.200:5000/reset\n")
-    app.run(host='0.0.0.0', port=5000)
\ No newline at end of file
+    print("  http://192.168.1.200:5000/reset")
+    print("  http://192.168.1.200:5000/commands (POST a batch)")
+    print("  http://192.168.1.200:5000/tables/<id>/score/player1 (any table id)")
+    print("  http://192.168.1.200:5000/tables")
+    if shards > 1:
+        print(f"  {shards} workers on ports {BASE_PORT}-{BASE_PORT + shards - 1}")
+    print()
+    if shards == 1:
+        serve()
+    else:
+        workers = [multiprocessing.Process(target=serve, args=(i, shards)) for i in range(shards)]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
@@ -2,12 +2,43 @@
 """
 Ping Pong Scorer - Raspberry Pi Version
 - Setup screen: clickable buttons
-- Game screen: HTTP only for scoring (no touch scoring)
+- Game screen: HTTP or GPIO buttons for scoring (no touch scoring)
+Startup is staged: the setup screen is drawn first, then sound, networking
+and the HTTP server load in the background (requests and flask are only
+imported when they are first needed).
 """
+import time
+STARTED_AT = time.perf_counter()  # for time-to-first-frame
+
+import io
+import sys
+import shutil
+import tempfile
+import zipfile
 import pygame
 import threading
 import socket
-import requests
+from functools import partial
+
+from gpio_input import GpioButtons, make_backend
+from latency import LatencyTracer, ArrivalStamp
+from game_state import GameState
+from status_cache import StatusCache, etag_matches
+from scoreboard import ScoreboardRenderer, clamp_size, DEFAULT_SIZE
+from remote_bundle import RemoteBundle
+from ui_layout import Layout, Button, Checkbox
+from capture_process import StreamCapture, HEADERS, CAPTURE_MEMORY_MB
+from frame_ring import align_times
+from rally_store import RallyStore
+from replay_stream import ReplayStreamer, BOUNDARY
+from exporter import ExportManager
+from thumbnails import ThumbnailMaker, decode_small, reduced_decode
+from highlights import HighlightReel, rally_activity, score_context
+from governor import Governor, LEVELS
+from events import EventBus, PointScored, GameWon, GameReset, ReplayRequested
+from mirror import MirrorServer, MirrorFollower, MIRROR_PORT
+import analytics
+import points
 
 # Colors - Purple and Pink theme
 C_P1_BG = (128, 0, 128)    # Purple
@@ -20,15 +51,37 @@ C_FLASH_P2 = (255, 150, 200)
 C_GREEN = (39, 174, 96)
 C_ORANGE = (243, 156, 18)
 C_GRAY = (80, 80, 80)
-
-from flask import Flask, jsonify
+C_RED = (200, 50, 50)
 
 # Player name options
 PLAYER_NAMES = ["Ryan", "Ethan", "Ben", "Guest"]
 
+# /scoreboard.mjpg resends the current frame this often even if nothing changed
+SCOREBOARD_KEEPALIVE_S = 10
+
+# Ball tracking on the first camera (hits, ball speed per rally); needs numpy
+BALL_TRACKING = True
+
+# Every point to points/ as columnar .npz chunks (see points.py); needs numpy
+POINT_LOG = True
+
+# Rally posters and contact sheets are cached on disk; browsers may keep them this long
+THUMB_MAX_AGE_S = 24 * 3600
+
+# Replays play at ~15 fps whatever the governor level (it shrinks decoding instead)
+REPLAY_FRAME_MS = 67
+
 # External replay server
 REPLAY_SERVER = "http://192.168.1.175"
 
+# Camera streams to capture. The first camera's frames are the replay
+# timeline; the others are lined up with it by capture timestamp (plus
+# "offset" seconds if a camera's stream lags). Add one per table end, e.g.
+#   {"name": "bong", "url": "http://192.168.1.176/stream", "offset": 0.0},
+CAMERAS = [
+    {"name": "door", "url": f"{REPLAY_SERVER}/stream", "offset": 0.0},
+]
+
 def get_ip():
     try:
         s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -40,30 +93,28 @@ def get_ip():
         return "localhost"
 
 class PingPongDisplay:
-    def __init__(self):
-        pygame.init()
-        pygame.mixer.init()
+    def __init__(self, size=None, gpio_backend="auto", mirror_of=None, point_log="auto"):
+        # Only what the first frame needs; the rest is in start_background_services
+        pygame.display.init()
+        pygame.font.init()
         pygame.mouse.set_visible(True)
+        self.sound_enabled = False  # until setup_sounds has run
+        self.startup = {}  # stage -> ms since process start
         
-        # Load or create sounds
-        self.setup_sounds()
-        
-        # Fullscreen on Pi
-        self.screen = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+        # Fullscreen on Pi (fixed size window for benchmarks)
+        if size:
+            self.screen = pygame.display.set_mode(size)
+        else:
+            self.screen = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
         self.W, self.H = self.screen.get_size()
         pygame.display.set_caption("Ping Pong Scorer")
         
-        # Game State
-        self.p1_name = PLAYER_NAMES[0]
-        self.p2_name = PLAYER_NAMES[1]
-        self.p1_score = 0
-        self.p2_score = 0
-        self.serving = 1
-        self.points_serve = 0
-        self.game_started = False
-        self.game_over = False
-        
-        # Game Settings
+        # Game State (rules live in GameState, this class only shows it)
+        self.game = GameState(PLAYER_NAMES[0], PLAYER_NAMES[1])
+        self.status_cache = StatusCache(self.game)
+        self.scoreboard = ScoreboardRenderer(self.game)  # /scoreboard.png and friends
+        
+        # Game Settings (applied to self.game on start)
         self.points_to_win = 11
         self.serves_per_turn = 2
         
@@ -81,17 +132,76 @@ class PingPongDisplay:
         self.replay_frames = []
         self.replay_frame_idx = 0
         self.replay_last_frame_time = 0
-        self.replay_close_btn = None
         
-        # Stream capture buffer (stores frames in RAM)
-        self.stream_buffer = []
-        self.stream_buffer_lock = threading.Lock()
-        self.max_buffer_seconds = 180  # 3 minutes max per rally
+        # Stream capture: one process per camera decodes frames into its own
+        # shared memory ring; a rally is a range of frame seqs in each ring
+        self.captures = []
+        self.replay_lock = threading.Lock()
+        self.max_buffer_seconds = 180  # 3 minutes max per rally (spooled to disk)
         self.stream_capturing = False
-        self.saved_replay_frames = []  # Saved replay from last rally
-        self.capture_start_time = None  # Reset on each new rally
+        self.saved_rallies = []  # Per camera: stored Rally of the last rally (None if empty)
+        self.replay_rallies = []  # The rallies being replayed; replay_frames indexes their frames
+        self.replay_decoded = {}  # camera -> (frame index, Surface) once the ring has lost it
+        self.spools = []  # Per camera: rally_store.RallySpool copying the rally to disk
+        self.replay_angle = 0  # Camera shown full screen during replay
+        self.replay_pip = False  # Show the next camera picture-in-picture
+        self.replay_reel = None  # highlights.Playlist while the reel plays instead
+        self.reel_surface = None  # decoded frame of the reel under replay_frame_idx
+        self.tracker = None  # analytics.BallTracker on the first camera's ring
+        
+        # Saved rallies on disk, streamed to phones as MJPEG
+        self.rallies = RallyStore()
+        self.replay_streamer = ReplayStreamer()
+        self.exports = ExportManager()
+        self.thumbnails = ThumbnailMaker()  # made in the background as rallies are saved
+        self.rallies.on_saved = self.thumbnails.submit
+        self.highlights = HighlightReel()  # best rallies of the current game
+        
+        # GPIO buttons (started in run)
+        self.gpio_backend = gpio_backend
+        self.gpio = None
+        
+        # Mirror displays: a primary publishes its state, a follower ("host[:port]"
+        # in mirror_of) shows the primary's game and takes no input
+        self.mirror_of = mirror_of
+        self.mirror = None
+        
+        # Point-by-point history for analysis (the primary's points only).
+        # point_log: "auto" (points/), "off", or a directory (benchmarks, tests)
+        self.point_log = None
+        if POINT_LOG and point_log != "off" and not mirror_of and points.available():
+            self.point_log = points.PointLog(points.POINTS_DIR if point_log == "auto" else point_log)
+            self.game.point_log = self.point_log
+        
+        # Side effects of scoring run on subscriber threads, not the tap's thread
+        self.events = EventBus()
+        self.subscribe_events()
+        
+        # Input-to-pixel latency: traces wait for the flip that shows them
+        self.latency = LatencyTracer()
+        # Set by every score so the render loop draws it without waiting out the frame
+        self.input_event = threading.Event()
+        self.clock = pygame.time.Clock()
+        
+        # Thermal governor: steps render fps, capture decoding and replay down when hot
+        self.governor = Governor(self.apply_governor)
+        self.target_fps = LEVELS[0]["fps"]
+        self.replay_frame_ms = REPLAY_FRAME_MS
+        self.replay_scale = LEVELS[0]["replay_scale"]
+        self.pip_allowed = LEVELS[0]["pip"]
+        
+        # Fonts and layouts - rebuilt when the screen size changes
+        self.setup_fonts()
+        
+        # Resolved in the background - get_ip can stall when offline
+        self.ip = "localhost"
         
-        # Fonts - scale based on screen size
+        # Flask app (built by start_flask)
+        self.app = None
+        self.mark_startup('display')
+
+    def setup_fonts(self):
+        """Fonts scale with screen height; layouts are rebuilt lazily for the new size"""
         scale = self.H / 600
         self.font_score = pygame.font.Font(None, int(150 * scale))
         self.font_name = pygame.font.Font(None, int(40 * scale))
@@ -100,17 +210,80 @@ class PingPongDisplay:
         self.font_button = pygame.font.Font(None, int(35 * scale))
         self.font_small = pygame.font.Font(None, int(28 * scale))
         self.font_url = pygame.font.Font(None, int(45 * scale))
+        self.setup_layout = None
+        self.game_layout = None
+        self.replay_layout = None
+
+    def on_resize(self):
+        self.screen = pygame.display.get_surface()
+        if self.screen.get_size() != (self.W, self.H):
+            self.W, self.H = self.screen.get_size()
+            self.setup_fonts()
+
+    def mark_startup(self, stage):
+        self.startup[stage] = round((time.perf_counter() - STARTED_AT) * 1000, 1)
+
+    def start_background_services(self):
+        """Everything the first frame doesn't need, loaded in parallel"""
+        def sound():
+            self.setup_sounds()
+            self.mark_startup('sound')
         
-        # Get IP for display
-        self.ip = get_ip()
+        def network():
+            self.ip = get_ip()
+            self.mark_startup('ip')
+            print(f"\n🏓 Ping Pong Scorer Running!")
+            print(f"📱 Remote Control: http://{self.ip}:5000")
+            print(f"   Score P1: http://{self.ip}:5000/score/player1")
+            print(f"   Score P2: http://{self.ip}:5000/score/player2")
+            print()
         
-        # Flask app
-        self.app = Flask(__name__)
-        self.setup_routes()
+        def inputs():
+            if self.mirror_of:
+                self.start_mirror_follower()
+                self.mark_startup('mirror')
+                return
+            self.start_flask()
+            self.mark_startup('http')
+            self.start_gpio()
+            self.mark_startup('gpio')
+            self.start_mirror_server()
+            self.mark_startup('mirror')
+        
+        for target in (sound, network, inputs, self.governor.start):
+            threading.Thread(target=target, daemon=True).start()
+
+    def start_mirror_server(self):
+        try:
+            self.mirror = MirrorServer(self.game).start()
+        except OSError as e:
+            print(f"Mirror server disabled: {e}", flush=True)
+
+    def start_mirror_follower(self):
+        host, _, port = self.mirror_of.partition(':')
+        self.mirror = MirrorFollower(host, int(port or MIRROR_PORT), self.on_mirror_state).start()
+
+    def on_mirror_state(self, state, changed):
+        """Follower: take the primary's state, flash and beep like the primary did"""
+        old = self.game.to_dict()
+        self.game.load(state)
+        gained = [p for p in (1, 2) if state[f'p{p}_score'] == old[f'p{p}_score'] + 1]
+        if len(gained) == 1 and state[f'p{3 - gained[0]}_score'] == old[f'p{3 - gained[0]}_score']:
+            self.publish_point(gained[0], 'win' if state['game_over'] and not old['game_over'] else 'point', state)
+        self.input_event.set()
+
+    def apply_governor(self, settings):
+        """Called from the governor thread with a governor.LEVELS entry"""
+        self.target_fps = settings["fps"]
+        self.replay_scale = settings["replay_scale"]
+        self.pip_allowed = settings["pip"]
+        for capture in self.captures:
+            capture.set_decode_every(settings["decode_every"])
 
     def setup_sounds(self):
         """Create simple beep sounds"""
         try:
+            pygame.mixer.init()
             sample_rate = 22050
             # Score sound - short beep
             duration = 0.15
@@ -147,292 +320,528 @@ class PingPongDisplay:
 
     def send_to_replay_server(self, endpoint):
         """Send HTTP request to replay server in background"""
+        import requests
+        
         def do_request():
             try:
-                headers = {
-                    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/144.0.0.0 Safari/537.36",
-                    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
-                    "Accept-Encoding": "gzip, deflate",
-                    "Accept-Language": "en-US,en;q=0.9",
-                    "Connection": "keep-alive",
-                    "Cache-Control": "max-age=0",
-                    "Upgrade-Insecure-Requests": "1"
-                }
-                requests.get(f"{REPLAY_SERVER}/{endpoint}", headers=headers, timeout=30)
+                requests.get(f"{REPLAY_SERVER}/{endpoint}", headers=HEADERS, timeout=30)
                 print(f"Sent /{endpoint} to replay server", flush=True)
             except Exception as e:
                 print(f"Failed to send /{endpoint}: {e}", flush=True)
         threading.Thread(target=do_request, daemon=True).start()
 
     def start_stream_capture(self):
-        """Start capturing the live stream into RAM buffer"""
-        import io
-        import time
-        
-        def capture_loop():
-            print("Starting stream capture...", flush=True)
-            self.stream_capturing = True
-            
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/144.0.0.0 Safari/537.36",
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
-                "Accept-Encoding": "gzip, deflate",
-                "Accept-Language": "en-US,en;q=0.9",
-                "Connection": "keep-alive",
-                "Cache-Control": "max-age=0",
-                "Upgrade-Insecure-Requests": "1"
-            }
-            
-            while self.stream_capturing:
-                try:
-                    response = requests.get(f"{REPLAY_SERVER}/stream", headers=headers, stream=True, timeout=30)
-                    print(f"Connected to stream, status: {response.status_code}", flush=True)
-                    
-                    buffer = b''
-                    for chunk in response.iter_content(chunk_size=4096):
-                        if not self.stream_capturing:
-                            break
-                        
-                        # Only capture if game is active and not over
-                        if not self.game_started or self.game_over:
-                            continue
-                        
-                        # Start timing when we begin capturing a new rally
-                        if self.capture_start_time is None:
-                            self.capture_start_time = time.time()
-                        
-                        # Stop after 3 minutes for this rally
-                        if time.time() - self.capture_start_time > self.max_buffer_seconds:
-                            continue
-                        
-                        if chunk:
-                            buffer += chunk
-                            
-                            # Look for complete JPEG frames
-                            while True:
-                                start = buffer.find(b'\xff\xd8')
-                                if start == -1:
-                                    buffer = b''
-                                    break
-                                    
-                                end = buffer.find(b'\xff\xd9', start)
-                                if end == -1:
-                                    # Keep data from start marker
-                                    buffer = buffer[start:]
-                                    break
-                                
-                                # Extract complete frame
-                                jpg_data = buffer[start:end + 2]
-                                buffer = buffer[end + 2:]
-                                
-                                # Convert to pygame surface
-                                try:
-                                    img_io = io.BytesIO(jpg_data)
-                                    surface = pygame.image.load(img_io)
-                                    surface = pygame.transform.scale(surface, (self.W, self.H))
-                                    
-                                    with self.stream_buffer_lock:
-                                        self.stream_buffer.append(surface)
-                                        if len(self.stream_buffer) % 100 == 0:
-                                            print(f"Buffer: {len(self.stream_buffer)} frames, last frame size: {surface.get_size()}", flush=True)
-                                except Exception as e:
-                                    print(f"Frame load error: {e}", flush=True)
-                                    
-                except Exception as e:
-                    print(f"Stream capture error: {e}", flush=True)
-                    time.sleep(2)  # Wait before reconnecting
-            
-            print("Stream capture stopped", flush=True)
-        
-        threading.Thread(target=capture_loop, daemon=True).start()
+        """Start one capture process per camera, splitting the memory budget"""
+        if self.captures:
+            return
+        memory_mb = CAPTURE_MEMORY_MB // len(CAMERAS)  # never more than CAPTURE_MEMORY_MB in all
+        for camera in CAMERAS:
+            try:
+                capture = StreamCapture(camera["url"], (self.W, self.H), memory_mb)
+            except ValueError as e:
+                print(f"Not capturing {len(CAMERAS)} camera(s): {e}", flush=True)
+                break
+            capture.set_decode_every(self.governor.settings["decode_every"])
+            capture.start()
+            self.captures.append(capture)
+        self.stream_capturing = True
+        self.spools = [self.rallies.spool(c.ring, camera["name"], self.max_buffer_seconds)
+                       for c, camera in zip(self.captures, CAMERAS)]
+        if self.captures and BALL_TRACKING and analytics.available():
+            self.tracker = analytics.BallTracker(self.captures[0].ring).start()
+
+    def stop_stream_capture(self):
+        if self.captures:
+            self.stream_capturing = False
+            if self.tracker:
+                self.tracker.stop()
+                self.tracker = None
+            with self.replay_lock:
+                for spool in self.spools:
+                    spool.stop()
+                self.spools = []
+            for capture in self.captures:
+                capture.stop()
+            self.captures = []
 
     def trigger_replay(self):
-        """Play the saved replay buffer"""
-        print("Replay button pressed", flush=True)
+        """Play the saved replay buffer, or the highlight reel once the game is over"""
+        self.events.publish(ReplayRequested('button', time.time()))
+        
+        if self.game.game_over:
+            reel = self.highlights.playlist(self.rallies, timeout=0)
+            if reel:
+                print(f"Playing highlights: {len(reel.rallies)} rallies", flush=True)
+                self.replay_reel = reel
+                self.reel_surface = None
+                self.replay_frame_idx = 0
+                self.replay_last_frame_time = pygame.time.get_ticks()
+                self.playing_replay = True
+                return
         
-        if not self.saved_replay_frames:
+        if not self.saved_rallies:
             print("No saved replay available!", flush=True)
             return
         
-        self.replay_frames = self.saved_replay_frames.copy()
-        print(f"Playing {len(self.replay_frames)} frames", flush=True)
-        
+        # The timeline is built in draw_game once the rallies are on disk
+        self.replay_rallies = self.saved_rallies
+        self.replay_frames = []
+        self.replay_decoded = {}
+        self.replay_angle = min(self.replay_angle, len(self.replay_rallies) - 1)
         self.replay_frame_idx = 0
         self.replay_last_frame_time = pygame.time.get_ticks()
         self.playing_replay = True
 
-    def save_replay_buffer(self):
-        """Save current buffer as replay and clear for next rally"""
-        with self.stream_buffer_lock:
-            if self.stream_buffer:
-                self.saved_replay_frames = self.stream_buffer.copy()
-                print(f"Saved {len(self.saved_replay_frames)} frames for replay", flush=True)
-                self.stream_buffer = []
-            else:
-                print("No frames to save", flush=True)
-        # Reset timer for next rally
-        self.capture_start_time = None
+    def save_replay_buffer(self, until=None, info=None):
+        """Save the rally spooled so far and start the next one.
+        until: time.time() the rally ended (frames after it go to the next one)
+        info: extra fields for the first camera's stored rally (ball tracking)
+        Returns the first camera's Rally (None if it had no frames).
+        Every camera's cut is stored; the replay follows the first camera,
+        so without its frames the previous replay stays."""
+        with self.replay_lock:
+            cuts = [spool.cut(until) for spool in self.spools]
+            if not any(cuts):
+                return None
+            print(f"Saved {' + '.join(str(len(cut.frames) if cut else 0) for cut in cuts)} frames for replay", flush=True)
+            rallies = []
+            for i, (camera, cut) in enumerate(zip(CAMERAS, cuts)):
+                rally = None
+                if cut:
+                    # Duration and motion for the highlight reel
+                    extra = dict(info or {}, **rally_activity(cut.times, cut.motions)) if i == 0 else {}
+                    rally = self.rallies.archive(cut, {"camera": camera["name"], **extra})
+                rallies.append(rally)
+            if rallies[0] is not None:
+                self.saved_rallies = rallies
+            return rallies[0]
+
+    def next_angle(self):
+        if self.captures:
+            self.replay_angle = (self.replay_angle + 1) % len(self.captures)
+
+    def toggle_pip(self):
+        self.replay_pip = not self.replay_pip
+
+    def replay_surface(self, camera, index):
+        """Frame index of camera's replayed rally: straight from the shared
+        ring while it's still there, else decoded from the rally file"""
+        rally = self.replay_rallies[camera]
+        if index < len(rally.seqs) and any(c.ring is rally.ring for c in self.captures):
+            frame = rally.ring.surface(rally.seqs[index])
+            if frame is not None:
+                if frame.get_size() != (self.W, self.H):
+                    frame = pygame.transform.scale(frame, (self.W, self.H))  # ring scaled down to fit memory
+                return frame
+        decoded = self.replay_decoded.get(camera)
+        if decoded is None or decoded[0] != index:
+            try:
+                frame = self.decode_replay(bytes(rally.frame(index)))
+            except (OSError, ValueError, pygame.error) as e:
+                print(f"Replay frame unavailable: {e}", flush=True)
+                return None
+            decoded = self.replay_decoded[camera] = (index, frame)
+        return decoded[1]
+
+    def decode_replay(self, jpeg):
+        """Screen-size Surface of a stored JPEG. When the governor sets
+        replay_scale, the JPEG is decoded at that fraction of the screen size
+        (a reduced DCT decode with Pillow) and stretched back up."""
+        if self.replay_scale > 1 and reduced_decode():
+            frame = decode_small(jpeg, (max(1, self.W // self.replay_scale), max(1, self.H // self.replay_scale)))
+        else:
+            frame = pygame.image.load(io.BytesIO(jpeg), "frame.jpg")
+        if frame.get_size() != (self.W, self.H):
+            frame = pygame.transform.scale(frame, (self.W, self.H))
+        return frame
+
+    def draw_pip(self, entry, angle):
+        """Second camera in the bottom-right corner at quarter size"""
+        index = entry[angle]
+        frame = self.replay_surface(angle, index) if index is not None else None
+        if frame is None:
+            return
+        w, h = self.W // 4, self.H // 4
+        rect = pygame.Rect(self.W - w - 20, self.H - h - 20, w, h)
+        self.screen.blit(pygame.transform.scale(frame, rect.size), rect)
+        del frame
+        pygame.draw.rect(self.screen, C_WHITE, rect, 3)
 
     def stop_replay(self):
         """Stop replay and return to game"""
         self.playing_replay = False
+        self.replay_reel = None
+        self.reel_surface = None
         self.replay_frames = []
+        self.replay_rallies = []
+        self.replay_decoded = {}
         self.replay_frame_idx = 0
         print("Replay stopped", flush=True)
 
+    def handle_button(self, button, pressed_at=None, source='http'):
+        """Scoring path shared by the HTTP routes and the GPIO buttons"""
+        trace = self.latency.begin(source, pressed_at)
+        # Button 1 scores for Player 2, Button 2 scores for Player 1
+        player = 2 if button == 1 else 1
+        result, state = self.score_point(player)
+        trace.mark('scored')
+        # The rally is saved by the "replay" subscriber, off this thread
+        self.publish_point(player, result, state)
+        trace.mark('published')
+        self.latency.submit(trace)
+        self.input_event.set()
+        return player
+
+    def on_gpio_press(self, button, pressed_at):
+        self.handle_button(button, pressed_at, source='gpio')
+
+    def start_gpio(self):
+        backend = self.gpio_backend
+        if isinstance(backend, str):
+            backend = make_backend(backend)
+        if backend is None:
+            return
+        self.gpio = GpioButtons(self.on_gpio_press, backend)
+        self.gpio.start()
+
     def setup_routes(self):
+        from flask import jsonify, request, Response, send_file
+        
         @self.app.route('/score/player1', methods=['GET', 'POST'])
         def s1():
-            # Save current buffer for replay, then clear it
-            self.save_replay_buffer()
-            self.score(2)  # Button 1 scores for Player 2
-            return jsonify(status='ok', player=self.p2_name, score=self.p2_score)
+            player = self.handle_button(1, request.environ.get('pingpong.arrival'))
+            return jsonify(status='ok', player=self.game.name(player), score=self.game.player_score(player))
         
         @self.app.route('/score/player2', methods=['GET', 'POST'])
         def s2():
-            # Save current buffer for replay, then clear it
-            self.save_replay_buffer()
-            self.score(1)  # Button 2 scores for Player 1
-            return jsonify(status='ok', player=self.p1_name, score=self.p1_score)
+            player = self.handle_button(2, request.environ.get('pingpong.arrival'))
+            return jsonify(status='ok', player=self.game.name(player), score=self.game.player_score(player))
             
         @self.app.route('/reset', methods=['GET', 'POST'])
         def r():
             self.reset_game()
             return jsonify(status='ok')
         
+        @self.app.route('/commands', methods=['POST'])
+        def commands():
+            body = request.get_json(silent=True)
+            if not isinstance(body, dict) or not isinstance(body.get('commands'), list):
+                return jsonify(status='error', message='Expected {"client": ..., "commands": [...]}'), 400
+            try:
+                results = self.run_commands(body['commands'], str(body.get('client', '')),
+                                            request.environ.get('pingpong.arrival'))
+            except ValueError as e:
+                return jsonify(status='error', message=str(e)), 400
+            return jsonify(status='ok', results=results, **self.game.to_dict())
+
         @self.app.route('/status', methods=['GET'])
         def status():
+            # ETag/304 and ?wait=<version> long-polling; body cached per version
+            return self.status_cache.respond(request.args, request.headers)
+
+        def scoreboard_size():
+            try:
+                return clamp_size(int(request.args.get('w', DEFAULT_SIZE[0])), int(request.args.get('h', DEFAULT_SIZE[1])))
+            except ValueError:
+                return DEFAULT_SIZE
+
+        def scoreboard_image(kind):
+            size = scoreboard_size()
+            version, data = self.scoreboard.image(size, kind)
+            etag = f'"{self.status_cache.epoch}-{version}-{size[0]}x{size[1]}-{kind}"'
+            headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+            if etag_matches(request.headers.get('If-None-Match'), etag):
+                return Response(status=304, headers=headers)
+            return Response(data, mimetype='image/png', headers=headers)
+
+        @self.app.route('/scoreboard.png', methods=['GET'])
+        def scoreboard_png():
+            return scoreboard_image('png')
+
+        @self.app.route('/scoreboard/overlay.png', methods=['GET'])
+        def scoreboard_overlay():
+            return scoreboard_image('overlay')
+
+        @self.app.route('/scoreboard.mjpg', methods=['GET'])
+        def scoreboard_mjpeg():
+            size = scoreboard_size()
+
+            def frames():
+                # A new frame only when the score changes (plus a keep-alive resend)
+                version = -1
+                while True:
+                    version, data = self.scoreboard.image(size, 'jpeg')
+                    yield b"".join((
+                        f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(data)}\r\n\r\n".encode(),
+                        data,
+                        b"\r\n",
+                    ))
+                    self.game.wait_for_version(version, SCOREBOARD_KEEPALIVE_S)
+
+            return Response(frames(), mimetype=f'multipart/x-mixed-replace; boundary={BOUNDARY}',
+                            headers={'Cache-Control': 'no-cache'})
+
+        def stream_rally(rally):
+            if rally is None or not rally.ready.wait(timeout=5) or not rally.frames:
+                return jsonify(status='error', message='No such replay'), 404
+            return Response(self.replay_streamer.stream(rally),
+                            mimetype=f'multipart/x-mixed-replace; boundary={BOUNDARY}',
+                            headers={'Cache-Control': 'no-cache'})
+
+        @self.app.route('/replay/last.mjpg', methods=['GET'])
+        def replay_last():
+            return stream_rally(self.rallies.last(request.args.get('camera')))
+
+        @self.app.route('/replay/<int:rally_id>.mjpg', methods=['GET'])
+        def replay_rally(rally_id):
+            return stream_rally(self.rallies.get(rally_id))
+
+        @self.app.route('/replay', methods=['GET'])
+        def replay_list():
+            return jsonify(rallies=[dict(rally.to_dict(), thumb=f'/replay/{rally.id}/thumb.jpg',
+                                         sheet=f'/replay/{rally.id}/sheet.jpg') for rally in self.rallies.list()])
+
+        @self.app.route('/replay/<int:rally_id>/<any(thumb, sheet):kind>.jpg', methods=['GET'])
+        def replay_thumbnail(rally_id, kind):
+            # Poster or filmstrip; made once per rally, then served from disk
+            rally = self.rallies.get(rally_id)
+            if rally is None or not rally.ready.wait(timeout=5) or not rally.frames:
+                return jsonify(status='error', message='No such replay'), 404
+            etag = f'"{rally.id}-{int(rally.info.get("created", 0))}-{kind}"'
+            headers = {'ETag': etag, 'Cache-Control': f'public, max-age={THUMB_MAX_AGE_S}'}
+            if etag_matches(request.headers.get('If-None-Match'), etag):
+                return Response(status=304, headers=headers)
+            path = self.thumbnails.path(rally, kind)
+            if path is None:
+                return jsonify(status='error', message='Thumbnail not ready'), 503
+            response = send_file(path, mimetype='image/jpeg', etag=False, conditional=False)
+            response.headers.update(headers)
+            return response
+
+        @self.app.route('/replay/highlights', methods=['GET'])
+        def replay_highlights():
+            # The current game's best rallies in the order they play
+            return jsonify(rallies=self.highlights.entries(), stream='/replay/highlights.mjpg')
+
+        @self.app.route('/replay/highlights.mjpg', methods=['GET'])
+        def replay_highlights_mjpeg():
+            return stream_rally(self.highlights.playlist(self.rallies))
+
+        @self.app.route('/points/export', methods=['GET'])
+        def points_export():
+            # Every point so far as a zip of .npz chunks, streamed chunk by chunk
+            if self.point_log is None:
+                return jsonify(status='error', message='Point log is off (needs numpy)'), 404
+            return Response(self.point_log.export(), mimetype='application/zip',
+                            headers={'Content-Disposition': 'attachment; filename=points.zip'})
+
+        @self.app.route('/points/import', methods=['POST'])
+        def points_import():
+            # Body: a /points/export zip (raw or as the "file" form field)
+            if self.point_log is None:
+                return jsonify(status='error', message='Point log is off (needs numpy)'), 404
+            upload = request.files.get('file')
+            with tempfile.TemporaryFile() as f:
+                if upload:
+                    upload.save(f)
+                else:
+                    shutil.copyfileobj(request.stream, f)
+                f.seek(0)
+                try:
+                    rows = self.point_log.import_zip(f)
+                except (ValueError, zipfile.BadZipFile) as e:
+                    return jsonify(status='error', message=f'Bad points file: {e}'), 400
+            return jsonify(status='ok', imported=rows, **self.point_log.stats())
+
+        @self.app.route('/exports', methods=['POST'])
+        def export_create():
+            # ?rally=<id>, default: the last rally
+            rally_id = request.values.get('rally', 'last')
+            rally = self.rallies.last() if rally_id == 'last' else self.rallies.get(int(rally_id)) if rally_id.isdigit() else None
+            if rally is None or not rally.ready.wait(timeout=5) or not rally.frames:
+                return jsonify(status='error', message='No such replay'), 404
+            job = self.exports.submit(rally)
+            if job is None:
+                return jsonify(status='error', message='Too many exports queued'), 429
+            return jsonify(job), 202
+
+        @self.app.route('/exports/<int:job_id>', methods=['GET'])
+        def export_status(job_id):
+            job = self.exports.get(job_id)
+            if job is None:
+                return jsonify(status='error', message='No such export'), 404
+            return jsonify(job)
+
+        @self.app.route('/exports/<int:job_id>/download', methods=['GET'])
+        def export_download(job_id):
+            path = self.exports.path(job_id)
+            if path is None:
+                return jsonify(status='error', message='Export not ready'), 404
+            return send_file(path, mimetype='video/x-msvideo', as_attachment=True)
+
+        @self.app.route('/metrics', methods=['GET'])
+        def metrics():
             return jsonify(
-                p1_name=self.p1_name,
-                p1_score=self.p1_score,
-                p2_name=self.p2_name, 
-                p2_score=self.p2_score,
-                serving=self.serving,
-                game_started=self.game_started,
-                game_over=self.game_over
+                latency=self.latency.snapshot(),
+                startup=self.startup,
+                capture={camera["name"]: c.stats_dict() for camera, c in zip(CAMERAS, self.captures)},
+                replay_viewers=self.replay_streamer.viewer_count(),
+                fps=round(self.clock.get_fps(), 1),
+                governor=self.governor.snapshot(),
+                events=self.events.stats(),
+                mirror=self.mirror.stats() if self.mirror else None,
+                ball_tracking=self.tracker.stats() if self.tracker else None,
+                thumbnails=self.thumbnails.stats(),
+                highlights=self.highlights.stats(),
+                points=self.point_log.stats() if self.point_log else None
             )
 
         @self.app.route('/')
         def remote():
-            return f'''
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <meta name="viewport" content="width=device-width, initial-scale=1">
-                <style>
-                    body {{ display:flex; flex-direction:column; margin:0; height:100vh; background:#1e1428; font-family:Arial; }}
-                    h1 {{ color:white; text-align:center; padding:20px; margin:0; }}
-                    .buttons {{ display:flex; flex:1; gap:10px; padding:10px; }}
-                    .btn {{ flex:1; border:none; border-radius:15px; font-size:28px; font-weight:bold; color:white; cursor:pointer; }}
-                    .btn:active {{ opacity:0.7; transform:scale(0.98); }}
-                    .p1 {{ background:#800080; }}
-                    .p2 {{ background:#ff1493; }}
-                    .reset {{ background:#f39c12; margin:10px; padding:20px; border-radius:10px; }}
-                    .status {{ color:#bdc3c7; text-align:center; padding:15px; font-size:18px; }}
-                </style>
-            </head>
-            <body>
-                <h1>🏓 Ping Pong Remote</h1>
-                <div class="buttons">
-                    <button class="btn p1" onclick="score(1)">{self.p1_name}</button>
-                    <button class="btn p2" onclick="score(2)">{self.p2_name}</button>
-                </div>
-                <button class="btn reset" onclick="reset()">Reset Game</button>
-                <div class="status" id="status">Tap player to score</div>
-                <script>
-                    function score(p) {{ 
-                        fetch('/score/player'+p, {{method:'POST'}})
-                            .then(r=>r.json())
-                            .then(d=>document.getElementById('status').textContent=d.player+': '+d.score); 
-                    }}
-                    function reset() {{ 
-                        fetch('/reset', {{method:'POST'}})
-                            .then(()=>document.getElementById('status').textContent='Game reset!'); 
-                    }}
-                </script>
-            </body>
-            </html>
-            '''
-
-    def start_flask(self):
+            return self.remote_bundle.respond('index.html', request.headers)
+
+        @self.app.route('/remote/<name>')
+        def remote_asset(name):
+            return self.remote_bundle.respond(name, request.headers)
+
+    def build_app(self):
+        from flask import Flask
+        self.app = Flask(__name__)
+        self.app.wsgi_app = ArrivalStamp(self.app.wsgi_app)
+        # Phone remote: read and compressed once, served from memory
+        self.remote_bundle = RemoteBundle()
+        self.setup_routes()
+
+    def start_flask(self, port=5000):
+        if self.app is None:
+            self.build_app()
         t = threading.Thread(
-            target=lambda: self.app.run(host='0.0.0.0', port=5000, use_reloader=False, threaded=True), 
+            target=lambda: self.app.run(host='0.0.0.0', port=port, use_reloader=False, threaded=True), 
             daemon=True
         )
         t.start()
 
     def score(self, player):
-        if self.game_over or not self.game_started:
+        self.publish_point(player, *self.score_point(player))
+
+    def score_point(self, player):
+        """game.score(player), plus the score and version it left - read
+        under the same lock, so a point scored meanwhile can't show up in it"""
+        with self.game.lock:
+            result = self.game.score(player)
+            return result, {'p1_score': self.game.p1_score, 'p2_score': self.game.p2_score, 'version': self.game.version}
+
+    def publish_point(self, player, result, state):
+        """Tell the subscribers about a point the game accepted.
+        state: p1_score, p2_score and version right after it"""
+        if result is None:
             return
-        
-        if player == 1:
-            self.p1_score += 1
+        now = time.time()
+        self.events.publish(PointScored(player, result, state['p1_score'], state['p2_score'], state['version'], now))
+        if result == 'win':
+            winner = self.game.name(1 if state['p1_score'] > state['p2_score'] else 2)
+            self.events.publish(GameWon(winner, state['p1_score'], state['p2_score'], state['version'], now))
+
+    def subscribe_events(self):
+        """Reactions to the game, each on its own worker (see events.py)"""
+        self.events.subscribe('flash', self.on_flash, PointScored)
+        self.events.subscribe('sound', self.on_sound, PointScored, GameWon)
+        if not self.mirror_of:
+            self.events.subscribe('replay', self.on_rally_event, PointScored, GameReset)
+        self.events.subscribe('log', self.on_log, PointScored, GameWon, GameReset, ReplayRequested)
+        if self.point_log:
+            self.events.subscribe('points', lambda event: self.point_log.flush(), GameWon, GameReset)
+
+    def on_flash(self, event):
+        if event.player == 1:
             self.flash_alpha_p1 = 255
         else:
-            self.p2_score += 1
             self.flash_alpha_p2 = 255
-        
-        self.play_sound('score')
-            
-        print(f"{self.p1_name if player == 1 else self.p2_name} scored! {self.p1_score}-{self.p2_score}")
-        
-        # Serve Logic
-        self.points_serve += 1
-        deuce = (self.p1_score >= self.points_to_win - 1 and self.p2_score >= self.points_to_win - 1)
-        threshold = 1 if deuce else self.serves_per_turn
-        if self.points_serve >= threshold:
-            self.serving = 2 if self.serving == 1 else 1
-            self.points_serve = 0
-            
-        # Win Logic
-        if (self.p1_score >= self.points_to_win or self.p2_score >= self.points_to_win) and abs(self.p1_score - self.p2_score) >= 2:
-            self.game_over = True
-            self.play_sound('win')
-            winner = self.p1_name if self.p1_score > self.p2_score else self.p2_name
-            print(f"Game Over! {winner} wins!")
+
+    def on_sound(self, event):
+        self.play_sound('win' if isinstance(event, GameWon) else 'score')
+
+    def on_rally_event(self, event):
+        if isinstance(event, PointScored):
+            # Ball tracking summary of the rally the point ended; the next one starts now
+            summary = self.tracker.finish_rally() if self.tracker else None
+            if summary:
+                print(f"Rally: {summary['hits']} hits in {summary['duration_s']} s, "
+                      f"peak {summary['peak_speed_ms']} m/s", flush=True)
+            # Save current buffer for replay, then clear it
+            rally = self.save_replay_buffer(until=event.at, info=summary)
+            if rally is not None:
+                context = score_context(event.player, event.p1_score, event.p2_score,
+                                        self.game.points_to_win, event.result == 'win')
+                self.highlights.add(rally, context)
+                if self.point_log:
+                    self.point_log.set_rally(event.version, rally.info.get("seconds", 0.0))
+                    if event.result == 'win':
+                        self.point_log.flush()  # again, now with the winning rally
+        else:
+            self.restart_rally()
+            self.highlights.clear()
+
+    def on_log(self, event):
+        if isinstance(event, PointScored):
+            print(f"{self.game.name(event.player)} scored! {event.p1_score}-{event.p2_score}", flush=True)
+        elif isinstance(event, GameWon):
+            print(f"Game Over! {event.winner} wins!", flush=True)
+        elif isinstance(event, GameReset):
+            print("Game reset!", flush=True)
+        else:
+            print(f"Replay requested ({event.source})", flush=True)
 
     def reset_game(self):
-        self.p1_score = 0
-        self.p2_score = 0
-        self.serving = self.first_server
-        self.points_serve = 0
-        self.game_over = False
-        
-        # Clear the stream buffer for new game
-        with self.stream_buffer_lock:
-            self.stream_buffer = []
-        
-        print("Game reset!", flush=True)
+        self.game.reset()
+        self.events.publish(GameReset(self.game.version, time.time()))
+
+    def restart_rally(self):
+        """Start the next rally at the newest frame"""
+        with self.replay_lock:
+            for spool in self.spools:
+                spool.restart()
+        if self.tracker:
+            self.tracker.reset_rally()
+
+    def run_commands(self, commands, client="", pressed_at=None):
+        """Apply a /commands batch in one state change, then publish the same
+        events as single taps"""
+        trace = self.latency.begin('commands', pressed_at)
+        results = self.game.apply(commands, client)
+        trace.mark('scored')
+        for command, result in zip(commands, results):
+            if result["duplicate"]:
+                continue
+            if result["type"] == "score":
+                self.publish_point(command["player"], result["result"], result)
+            elif result["type"] == "reset":
+                self.events.publish(GameReset(result["version"], time.time()))
+        trace.mark('published')
+        self.latency.submit(trace)
+        self.input_event.set()
+        return results
 
     def start_game(self):
-        self.p1_name = PLAYER_NAMES[self.p1_name_idx]
-        self.p2_name = PLAYER_NAMES[self.p2_name_idx]
-        self.game_started = True
+        self.game.points_to_win = self.points_to_win
+        self.game.serves_per_turn = self.serves_per_turn
+        self.game.first_server = self.first_server
+        self.game.start(PLAYER_NAMES[self.p1_name_idx], PLAYER_NAMES[self.p2_name_idx])
         self.reset_game()
         
         # Start capturing the stream
         if not self.stream_capturing:
             self.start_stream_capture()
 
-    def draw_button(self, rect, text, color, text_color=C_WHITE, selected=False):
-        if selected:
-            pygame.draw.rect(self.screen, color, rect, border_radius=8)
-        else:
-            pygame.draw.rect(self.screen, C_GRAY, rect, border_radius=8)
-            pygame.draw.rect(self.screen, color, rect, 3, border_radius=8)
-        
-        txt = self.font_button.render(text, True, text_color if selected else color)
-        self.screen.blit(txt, (rect.centerx - txt.get_width()//2, rect.centery - txt.get_height()//2))
-        return rect
-
-    def draw_setup(self):
-        self.screen.fill(C_DARK)
+    def build_setup_layout(self):
+        """Setup screen geometry and labels, computed once per screen size"""
+        background = pygame.Surface((self.W, self.H)).convert()
+        background.fill(C_DARK)
+        layout = Layout((self.W, self.H), background)
         
         # Title
         title = self.font_title.render("PING PONG SCORER", True, C_WHITE)
-        self.screen.blit(title, (self.W//2 - title.get_width()//2, 20))
-        
-        self.setup_buttons = {}
+        background.blit(title, (self.W//2 - title.get_width()//2, 20))
         
         btn_w = int(self.W * 0.12)
         btn_h = int(self.H * 0.08)
@@ -440,96 +849,109 @@ class PingPongDisplay:
         left_margin = int(self.W * 0.08)
         btn_start_x = int(self.W * 0.25)
         
-        # Player 1 Selection
-        y = int(self.H * 0.15)
-        p1_label = self.font_name.render("Door:", True, C_P1_BG)
-        self.screen.blit(p1_label, (left_margin, y + btn_h//3))
-        
-        for i, name in enumerate(PLAYER_NAMES):
-            x = btn_start_x + i * (btn_w + spacing)
-            rect = pygame.Rect(x, y, btn_w, btn_h)
-            self.draw_button(rect, name, C_P1_BG, selected=(i == self.p1_name_idx))
-            self.setup_buttons[f"p1_{i}"] = rect
-        
-        # Player 2 Selection
-        y = int(self.H * 0.27)
-        p2_label = self.font_name.render("Bong:", True, C_P2_BG)
-        self.screen.blit(p2_label, (left_margin, y + btn_h//3))
-        
-        for i, name in enumerate(PLAYER_NAMES):
-            x = btn_start_x + i * (btn_w + spacing)
-            rect = pygame.Rect(x, y, btn_w, btn_h)
-            self.draw_button(rect, name, C_P2_BG, selected=(i == self.p2_name_idx))
-            self.setup_buttons[f"p2_{i}"] = rect
-        
-        # Serve First checkbox (next to Guest for Player 2)
-        guest_idx = PLAYER_NAMES.index("Guest")
-        checkbox_x = btn_start_x + guest_idx * (btn_w + spacing) + btn_w + spacing
+        def choice_row(y, label, color, text_color, group, values, names, on_click):
+            row_label = self.font_name.render(label, True, color)
+            background.blit(row_label, (left_margin, y + btn_h//3))
+            for i, (value, name) in enumerate(zip(values, names)):
+                x = btn_start_x + i * (btn_w + spacing)
+                layout.add(Button((x, y, btn_w, btn_h), name, self.font_button, color, text_color, C_GRAY,
+                                  on_click=on_click, value=value, group=group))
+        
+        # Player rows, each with a "Serves First" checkbox after the last name
+        checkbox_x = btn_start_x + len(PLAYER_NAMES) * (btn_w + spacing)
         checkbox_size = int(btn_h * 0.6)
-        checkbox_y = y + (btn_h - checkbox_size) // 2
-        checkbox_rect = pygame.Rect(checkbox_x, checkbox_y, checkbox_size, checkbox_size)
-        
-        # Draw checkbox border
-        pygame.draw.rect(self.screen, C_GOLD, checkbox_rect, 3, border_radius=4)
-        # Fill if Bong serves first
-        if self.first_server == 2:
-            inner_rect = checkbox_rect.inflate(-8, -8)
-            pygame.draw.rect(self.screen, C_GOLD, inner_rect, border_radius=2)
-        
-        # Label for checkbox
-        serve_label = self.font_small.render("Serves First", True, C_GOLD)
-        self.screen.blit(serve_label, (checkbox_x + checkbox_size + 8, checkbox_y + (checkbox_size - serve_label.get_height()) // 2))
-        self.setup_buttons["serve_first_p2"] = checkbox_rect
-        
-        # Also add checkbox for Player 1 (Door)
-        y_p1 = int(self.H * 0.15)
-        checkbox_rect_p1 = pygame.Rect(checkbox_x, y_p1 + (btn_h - checkbox_size) // 2, checkbox_size, checkbox_size)
-        pygame.draw.rect(self.screen, C_GOLD, checkbox_rect_p1, 3, border_radius=4)
-        if self.first_server == 1:
-            inner_rect = checkbox_rect_p1.inflate(-8, -8)
-            pygame.draw.rect(self.screen, C_GOLD, inner_rect, border_radius=2)
-        serve_label_p1 = self.font_small.render("Serves First", True, C_GOLD)
-        self.screen.blit(serve_label_p1, (checkbox_x + checkbox_size + 8, y_p1 + (btn_h - serve_label_p1.get_height()) // 2))
-        self.setup_buttons["serve_first_p1"] = checkbox_rect_p1
-        
-        # Points to Win
-        y = int(self.H * 0.42)
-        pts_label = self.font_name.render("Points:", True, C_GOLD)
-        self.screen.blit(pts_label, (left_margin, y + btn_h//3))
-        
-        for i, pts in enumerate([7, 11, 21]):
-            x = btn_start_x + i * (btn_w + spacing)
-            rect = pygame.Rect(x, y, btn_w, btn_h)
-            self.draw_button(rect, str(pts), C_GOLD, C_DARK, selected=(self.points_to_win == pts))
-            self.setup_buttons[f"pts_{pts}"] = rect
-        
-        # Serves per Turn
-        y = int(self.H * 0.54)
-        srv_label = self.font_name.render("Serves:", True, C_GOLD)
-        self.screen.blit(srv_label, (left_margin, y + btn_h//3))
-        
-        for i, srv in enumerate([1, 2, 5]):
-            x = btn_start_x + i * (btn_w + spacing)
-            rect = pygame.Rect(x, y, btn_w, btn_h)
-            self.draw_button(rect, str(srv), C_GOLD, C_DARK, selected=(self.serves_per_turn == srv))
-            self.setup_buttons[f"srv_{srv}"] = rect
+        for player, y, label, color in ((1, int(self.H * 0.15), "Door:", C_P1_BG), (2, int(self.H * 0.27), "Bong:", C_P2_BG)):
+            choice_row(y, label, color, C_WHITE, f"p{player}", range(len(PLAYER_NAMES)), PLAYER_NAMES,
+                       partial(setattr, self, f"p{player}_name_idx"))
+            checkbox_y = y + (btn_h - checkbox_size) // 2
+            layout.add(Checkbox((checkbox_x, checkbox_y, checkbox_size, checkbox_size), C_GOLD,
+                                on_click=partial(setattr, self, "first_server"), value=player, group="first_server"))
+            serve_label = self.font_small.render("Serves First", True, C_GOLD)
+            background.blit(serve_label, (checkbox_x + checkbox_size + 8, checkbox_y + (checkbox_size - serve_label.get_height()) // 2))
+        
+        # Points to Win / Serves per Turn
+        choice_row(int(self.H * 0.42), "Points:", C_GOLD, C_DARK, "pts", [7, 11, 21], ["7", "11", "21"],
+                   partial(setattr, self, "points_to_win"))
+        choice_row(int(self.H * 0.54), "Serves:", C_GOLD, C_DARK, "srv", [1, 2, 5], ["1", "2", "5"],
+                   partial(setattr, self, "serves_per_turn"))
         
         # Start Button
         start_w = int(self.W * 0.35)
         start_h = int(self.H * 0.12)
-        start_rect = pygame.Rect(self.W//2 - start_w//2, int(self.H * 0.68), start_w, start_h)
-        pygame.draw.rect(self.screen, C_GREEN, start_rect, border_radius=15)
-        start_text = self.font_title.render("START GAME", True, C_WHITE)
-        self.screen.blit(start_text, (start_rect.centerx - start_text.get_width()//2, 
-                                      start_rect.centery - start_text.get_height()//2))
-        self.setup_buttons["start"] = start_rect
+        layout.add(Button((self.W//2 - start_w//2, int(self.H * 0.68), start_w, start_h), "START GAME", self.font_title,
+                          C_GREEN, C_WHITE, C_GREEN, solid=True, radius=15, on_click=lambda _: self.start_game()))
+        return layout
+
+    def build_game_layouts(self):
+        """Game screen buttons, plus the close button shown over a replay"""
+        self.game_layout = Layout((self.W, self.H))
+        # New Game button (small, top corner)
+        btn_w = int(self.W * 0.12)
+        btn_h = int(self.H * 0.06)
+        self.game_layout.add(Button((self.W - btn_w - 10, 10, btn_w, btn_h), "NEW GAME", self.font_small,
+                                    C_ORANGE, C_WHITE, C_ORANGE, solid=True, radius=5, on_click=lambda _: self.game.stop()))
+        # Replay button (bottom center)
+        replay_w = int(self.W * 0.15)
+        replay_h = int(self.H * 0.08)
+        self.game_layout.add(Button((self.W//2 - replay_w//2, int(self.H * 0.88), replay_w, replay_h), "REPLAY", self.font_button,
+                                    C_GREEN, C_WHITE, C_GREEN, solid=True, on_click=lambda _: self.trigger_replay()))
+        
+        self.replay_layout = Layout((self.W, self.H))
+        # Close button (top right)
+        btn_w = int(self.W * 0.1)
+        btn_h = int(self.H * 0.06)
+        self.replay_layout.add(Button((self.W - btn_w - 20, 20, btn_w, btn_h), "CLOSE", self.font_small,
+                                      C_RED, C_WHITE, C_RED, solid=True, radius=5, on_click=lambda _: self.stop_replay()))
+        if len(CAMERAS) > 1:
+            # Angle switch and picture-in-picture toggle, left of CLOSE
+            x = self.W - btn_w - 20
+            x -= btn_w + 10
+            self.replay_layout.add(Button((x, 20, btn_w, btn_h), "ANGLE", self.font_small,
+                                          C_ORANGE, C_WHITE, C_ORANGE, solid=True, radius=5, on_click=lambda _: self.next_angle()))
+            x -= btn_w + 10
+            self.replay_layout.add(Button((x, 20, btn_w, btn_h), "PIP", self.font_small, C_GOLD, C_DARK, C_GRAY, radius=5,
+                                          on_click=lambda _: self.toggle_pip(), value=True, group="pip"))
+        self.replay_label = self.font_title.render("▶ REPLAY", True, C_GOLD)
+        self.highlights_label = self.font_title.render("▶ HIGHLIGHTS", True, C_GOLD)
+        self.camera_labels = [self.font_small.render(camera["name"].upper(), True, C_WHITE) for camera in CAMERAS]
+
+    def setup_selections(self):
+        return {
+            "p1": self.p1_name_idx,
+            "p2": self.p2_name_idx,
+            "first_server": self.first_server,
+            "pts": self.points_to_win,
+            "srv": self.serves_per_turn,
+        }
+
+    def draw_setup(self):
+        if self.setup_layout is None:
+            self.setup_layout = self.build_setup_layout()
+        self.setup_layout.draw(self.screen, self.setup_selections())
 
     def draw_game(self):
+        if self.game_layout is None:
+            self.build_game_layouts()
+        
+        if self.playing_replay and self.replay_reel:
+            self.draw_reel()
+            return
+        
+        # Timeline of the first camera, with the closest frame of every other
+        # one - once the rallies are on disk (until then the score stays up)
+        if self.playing_replay and not self.replay_frames and self.replay_rallies and self.replay_rallies[0].ready.is_set():
+            offsets = [camera.get("offset", 0.0) for camera in CAMERAS]
+            times = [[ts for _, _, ts in rally.frames] if rally else [] for rally in self.replay_rallies]
+            self.replay_frames = align_times(times, offsets)
+            print(f"Playing {len(self.replay_frames)} frames from {len(self.replay_rallies)} camera(s)", flush=True)
+            if not self.replay_frames:
+                self.stop_replay()
+        
         # Check if playing replay
         if self.playing_replay and self.replay_frames:
             current_time = pygame.time.get_ticks()
             # Play at ~15fps (67ms per frame)
-            if current_time - self.replay_last_frame_time > 67:
+            if current_time - self.replay_last_frame_time > self.replay_frame_ms:
                 self.replay_frame_idx += 1
                 self.replay_last_frame_time = current_time
                 
@@ -537,25 +959,26 @@ class PingPongDisplay:
                     # Replay finished - loop back to start
                     self.replay_frame_idx = 0
             
-            # Draw current frame
+            # Draw current frame (shared memory while the ring has it, else disk)
+            frame = None
             if self.replay_frame_idx < len(self.replay_frames):
-                self.screen.blit(self.replay_frames[self.replay_frame_idx], (0, 0))
-                
-                # Draw "REPLAY" text overlay
-                replay_text = self.font_title.render("▶ REPLAY", True, C_GOLD)
-                self.screen.blit(replay_text, (20, 20))
+                entry = self.replay_frames[self.replay_frame_idx]
+                angle = self.replay_angle if entry[self.replay_angle] is not None else 0
+                frame = self.replay_surface(angle, entry[angle])
+            if frame is not None:
+                self.screen.blit(frame, (0, 0))
+                del frame
+                if self.replay_pip and self.pip_allowed and len(entry) > 1:
+                    self.draw_pip(entry, (angle + 1) % len(entry))
                 
-                # Draw close button (top right)
-                btn_w = int(self.W * 0.1)
-                btn_h = int(self.H * 0.06)
-                close_rect = pygame.Rect(self.W - btn_w - 20, 20, btn_w, btn_h)
-                pygame.draw.rect(self.screen, (200, 50, 50), close_rect, border_radius=5)
-                close_txt = self.font_small.render("CLOSE", True, C_WHITE)
-                self.screen.blit(close_txt, (close_rect.centerx - close_txt.get_width()//2, close_rect.centery - close_txt.get_height()//2))
-                self.replay_close_btn = close_rect
-            return
-        
-        self.replay_close_btn = None
+                # "REPLAY" text overlay, camera name and buttons
+                self.screen.blit(self.replay_label, (20, 20))
+                if len(self.replay_rallies) > 1:
+                    self.screen.blit(self.camera_labels[angle], (20, 20 + self.replay_label.get_height()))
+                self.replay_layout.draw(self.screen, {"pip": self.replay_pip})
+                return
+            # The rally file is gone (pruned)
+            self.stop_replay()
         
         # Left half (P1) - Purple
         pygame.draw.rect(self.screen, C_P1_BG, (0, 0, self.W//2, self.H))
@@ -566,32 +989,31 @@ class PingPongDisplay:
         center_p2 = (self.W // 4) * 3
         
         # Names
-        n1 = self.font_name.render(self.p1_name.upper(), True, C_WHITE)
+        n1 = self.font_name.render(self.game.p1_name.upper(), True, C_WHITE)
         self.screen.blit(n1, (center_p1 - n1.get_width()//2, int(self.H * 0.08)))
         
-        n2 = self.font_name.render(self.p2_name.upper(), True, C_WHITE)
+        n2 = self.font_name.render(self.game.p2_name.upper(), True, C_WHITE)
         self.screen.blit(n2, (center_p2 - n2.get_width()//2, int(self.H * 0.08)))
         
         # Scores
-        score_color_p1 = C_GOLD if self.game_over and self.p1_score > self.p2_score else C_WHITE
-        score_color_p2 = C_GOLD if self.game_over and self.p2_score > self.p1_score else C_WHITE
+        score_color_p1 = C_GOLD if self.game.game_over and self.game.p1_score > self.game.p2_score else C_WHITE
+        score_color_p2 = C_GOLD if self.game.game_over and self.game.p2_score > self.game.p1_score else C_WHITE
         
-        s1 = self.font_score.render(str(self.p1_score), True, score_color_p1)
+        s1 = self.font_score.render(str(self.game.p1_score), True, score_color_p1)
         self.screen.blit(s1, (center_p1 - s1.get_width()//2, self.H//2 - s1.get_height()//2))
         
-        s2 = self.font_score.render(str(self.p2_score), True, score_color_p2)
+        s2 = self.font_score.render(str(self.game.p2_score), True, score_color_p2)
         self.screen.blit(s2, (center_p2 - s2.get_width()//2, self.H//2 - s2.get_height()//2))
         
         # Serve indicator
-        if not self.game_over:
+        if not self.game.game_over:
             serve_text = self.font_serve.render("● SERVING", True, C_GOLD)
-            if self.serving == 1:
+            if self.game.serving == 1:
                 self.screen.blit(serve_text, (center_p1 - serve_text.get_width()//2, int(self.H * 0.78)))
             else:
                 self.screen.blit(serve_text, (center_p2 - serve_text.get_width()//2, int(self.H * 0.78)))
         else:
-            winner = self.p1_name if self.p1_score > self.p2_score else self.p2_name
-            win_text = self.font_title.render(f"🏆 {winner} WINS! 🏆", True, C_GOLD)
+            win_text = self.font_title.render(f"🏆 {self.game.winner()} WINS! 🏆", True, C_GOLD)
             self.screen.blit(win_text, (self.W//2 - win_text.get_width()//2, int(self.H * 0.78)))
         
         # Flash effects
@@ -609,82 +1031,91 @@ class PingPongDisplay:
             self.screen.blit(flash_surface, (self.W//2, 0))
             self.flash_alpha_p2 = max(0, self.flash_alpha_p2 - 12)
         
-        # Store buttons for click handling
-        self.game_buttons = {}
-        
-        # New Game button (small, top corner)
-        btn_w = int(self.W * 0.12)
-        btn_h = int(self.H * 0.06)
-        new_rect = pygame.Rect(self.W - btn_w - 10, 10, btn_w, btn_h)
-        pygame.draw.rect(self.screen, C_ORANGE, new_rect, border_radius=5)
-        new_txt = self.font_small.render("NEW GAME", True, C_WHITE)
-        self.screen.blit(new_txt, (new_rect.centerx - new_txt.get_width()//2, new_rect.centery - new_txt.get_height()//2))
-        self.game_buttons["new_game"] = new_rect
-        
-        # Replay button (bottom center)
-        replay_w = int(self.W * 0.15)
-        replay_h = int(self.H * 0.08)
-        replay_rect = pygame.Rect(self.W//2 - replay_w//2, int(self.H * 0.88), replay_w, replay_h)
-        pygame.draw.rect(self.screen, C_GREEN, replay_rect, border_radius=8)
-        replay_txt = self.font_button.render("REPLAY", True, C_WHITE)
-        self.screen.blit(replay_txt, (replay_rect.centerx - replay_txt.get_width()//2, replay_rect.centery - replay_txt.get_height()//2))
-        self.game_buttons["replay"] = replay_rect
+        # New Game and Replay buttons
+        self.game_layout.draw(self.screen)
 
-    def handle_setup_click(self, pos):
-        for key, rect in self.setup_buttons.items():
-            if rect.collidepoint(pos):
-                if key.startswith("p1_"):
-                    self.p1_name_idx = int(key.split("_")[1])
-                elif key.startswith("p2_"):
-                    self.p2_name_idx = int(key.split("_")[1])
-                elif key.startswith("pts_"):
-                    self.points_to_win = int(key.split("_")[1])
-                elif key.startswith("srv_"):
-                    self.serves_per_turn = int(key.split("_")[1])
-                elif key == "serve_first_p1":
-                    self.first_server = 1
-                elif key == "serve_first_p2":
-                    self.first_server = 2
-                elif key == "start":
-                    self.start_game()
+    def draw_reel(self):
+        """Highlight reel: stored JPEGs from disk, decoded one per replay frame"""
+        reel = self.replay_reel
+        current_time = pygame.time.get_ticks()
+        if current_time - self.replay_last_frame_time > self.replay_frame_ms:
+            index = self.replay_frame_idx + 1
+            if index >= len(reel.frames):
+                # The match point's rally may have been saved since the reel
+                # started: it comes last, so play on into it before looping
+                fresh = self.highlights.playlist(self.rallies, timeout=0)
+                if fresh is not None and fresh is not reel:
+                    if fresh.rallies[:len(reel.rallies)] != reel.rallies:
+                        index = 0
+                    reel = self.replay_reel = fresh
+                if index >= len(reel.frames):
+                    index = 0
+            self.replay_frame_idx = index
+            self.replay_last_frame_time = current_time
+            self.reel_surface = None
+        if self.reel_surface is None:
+            try:
+                self.reel_surface = self.decode_replay(bytes(reel.frame(self.replay_frame_idx)))
+            except (OSError, ValueError, pygame.error) as e:
+                print(f"Highlight frame unavailable: {e}", flush=True)
+                self.stop_replay()
                 return
+        self.screen.blit(self.reel_surface, (0, 0))
+        self.screen.blit(self.highlights_label, (20, 20))
+        self.replay_layout.draw(self.screen, {"pip": self.replay_pip})
+
+    def handle_setup_click(self, pos):
+        if self.mirror_of:
+            return  # followers are read-only
+        if self.setup_layout:
+            self.setup_layout.click(pos)
 
     def handle_game_click(self, pos):
-        # Check for replay close button first
-        if self.playing_replay and self.replay_close_btn and self.replay_close_btn.collidepoint(pos):
-            self.stop_replay()
+        if self.game_layout is None or self.mirror_of:
             return
-        
-        # Only handle New Game and Replay buttons - no tap-to-score
-        for key, rect in self.game_buttons.items():
-            if rect.collidepoint(pos):
-                if key == "new_game":
-                    self.game_started = False
-                    self.game_over = False
-                elif key == "replay":
-                    self.trigger_replay()
-                return
+        # Replay close button first, then New Game and Replay - no tap-to-score
+        if self.playing_replay and self.replay_layout.click(pos):
+            return
+        self.game_layout.click(pos)
+
+    def render_frame(self):
+        """Draw the current screen and flip it"""
+        drawing = self.latency.frame_drawing()  # scores this frame is drawn from
+        if self.game.game_started:
+            self.draw_game()
+        else:
+            self.draw_setup()
+        pygame.display.flip()
+        self.latency.frame_shown(drawing)
+        recording = self.game.game_started and not self.game.game_over
+        for capture in self.captures:
+            capture.set_recording(recording)
+        if 'first_frame' not in self.startup:
+            self.mark_startup('first_frame')
+            print(f"First frame after {self.startup['first_frame']:.0f} ms", flush=True)
+
+    def wait_for_frame(self, frame_start):
+        """Sleep until the next frame at the governed fps, but wake at once for a score"""
+        remaining = frame_start + 1 / self.target_fps - time.perf_counter()
+        if remaining > 0:
+            self.input_event.wait(remaining)
+        self.input_event.clear()
 
     def run(self):
-        # Start Flask server
-        self.start_flask()
-        
-        clock = pygame.time.Clock()
         running = True
         
-        print(f"\n🏓 Ping Pong Scorer Running!")
-        print(f"📱 Remote Control: http://{self.ip}:5000")
-        print(f"   Score P1: http://{self.ip}:5000/score/player1")
-        print(f"   Score P2: http://{self.ip}:5000/score/player2")
-        print()
+        # Setup screen first, then sound, network, HTTP and GPIO behind it
+        self.render_frame()
+        self.start_background_services()
         
         while running:
+            frame_start = time.perf_counter()
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     running = False
                     
                 elif event.type == pygame.MOUSEBUTTONDOWN:
-                    if self.game_started:
+                    if self.game.game_started:
                         self.handle_game_click(event.pos)
                     else:
                         self.handle_setup_click(event.pos)
@@ -694,18 +1125,32 @@ class PingPongDisplay:
                         running = False
                     elif event.key == pygame.K_F11:
                         pygame.display.toggle_fullscreen()
+                        self.on_resize()
 
-            # Draw
-            if self.game_started:
-                self.draw_game()
-            else:
-                self.draw_setup()
-                
-            pygame.display.flip()
-            clock.tick(60)
-            
+            self.render_frame()
+            self.clock.tick()
+            self.wait_for_frame(frame_start)
+        
+        for source, stats in self.latency.snapshot()['press_to_screen'].items():
+            print(f"Press-to-screen ({source}): p50 <= {stats['p50_ms']} ms, p99 <= {stats['p99_ms']} ms over {stats['count']} presses")
+        if self.gpio:
+            self.gpio.close()
+        if isinstance(self.mirror, MirrorFollower):
+            lag = self.mirror.lag.snapshot()
+            print(f"Mirror lag: p50 <= {lag['p50_ms']} ms, p99 <= {lag['p99_ms']} ms over {lag['count']} updates")
+            self.mirror.stop()
+        elif self.mirror:
+            self.mirror.close()
+        self.governor.stop()
+        self.events.close()
+        self.stop_stream_capture()
+        self.exports.shutdown()
+        if self.point_log:
+            self.point_log.flush()
         pygame.quit()
 
 if __name__ == "__main__":
-    game = PingPongDisplay()
+    # --mirror <primary ip>[:port] runs this screen as a read-only copy of another scorer
+    mirror_of = sys.argv[sys.argv.index("--mirror") + 1] if "--mirror" in sys.argv else None
+    game = PingPongDisplay(mirror_of=mirror_of)
     game.run()
\ No newline at end of file
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Point log - Ping Pong Scorer
+Every point scored on this table, kept on disk column by column as NumPy
+.npz chunks for offline analysis (pandas, notebooks, ...). Rows collect in
+memory and are written out when a game ends: points/tail.npz is rewritten
+until it holds CHUNK_ROWS points, then it is sealed as chunk-<n>.npz and a
+new tail starts. Undone points are taken back out of the log.
+
+Export is a zip of the chunk files, streamed one chunk at a time, so a
+year of points costs one chunk of memory and is mostly file copying.
+Import takes such a zip and adds its chunks as they are (game numbers
+shifted after the games already here) - e.g. to reseed a new Pi:
+    python3 points.py export points.zip      # or GET /points/export
+    python3 points.py import points.zip      # or POST /points/import
+    python3 points.py stats
+Needs numpy (pip3 install numpy); without it no points are logged.
+"""
+import io
+import os
+import sys
+import threading
+import time
+import zipfile
+from collections import deque
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+POINTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "points")
+CHUNK_ROWS = 8192
+NAME_CHARS = 16
+
+# Column name -> dtype. rally_s is the saved rally's length (NaN if none).
+COLUMNS = {
+    "time": "f8",
+    "game": "i4",
+    "scorer": "i1",
+    "server": "i1",
+    "p1_before": "i4",
+    "p2_before": "i4",
+    "p1_after": "i4",
+    "p2_after": "i4",
+    "points_to_win": "i4",
+    "serves_per_turn": "i2",
+    "first_server": "i1",
+    "rally_s": "f4",
+    "p1_name": f"U{NAME_CHARS}",
+    "p2_name": f"U{NAME_CHARS}",
+}
+
+
+def available():
+    return np is not None
+
+
+def read_chunk(source):
+    """Columns of one chunk (path or file object), checked against COLUMNS"""
+    with np.load(source, allow_pickle=False) as data:
+        missing = set(COLUMNS) - set(data.files)
+        if missing:
+            raise ValueError(f"chunk is missing columns: {', '.join(sorted(missing))}")
+        columns = {name: data[name].astype(dtype, copy=False) for name, dtype in COLUMNS.items()}
+    rows = len(columns["time"])
+    if any(len(column) != rows for column in columns.values()):
+        raise ValueError("chunk columns differ in length")
+    return columns
+
+
+def write_chunk(path, columns):
+    """Write columns to path atomically"""
+    with open(path + ".tmp", "wb") as f:
+        np.savez_compressed(f, **columns)
+    os.replace(path + ".tmp", path)
+
+
+class ZipStream(io.RawIOBase):
+    """Write-only file for ZipFile that hands out what was written so far"""
+
+    def __init__(self):
+        self.parts = []
+        self.written = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.written += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.written
+
+    def take(self):
+        data, self.parts = b"".join(self.parts), []
+        return data
+
+
+class PointLog:
+    """GameState.point_log: GameState calls scored() and undone() under its lock"""
+
+    def __init__(self, directory=POINTS_DIR):
+        self.directory = directory
+        self.tail_path = os.path.join(directory, "tail.npz")
+        self.lock = threading.Lock()
+        self.rows = {name: [] for name in COLUMNS}  # the tail, not yet sealed
+        self.versions = []  # game version after each tail row, to match rallies
+        self.chunks = 0  # sealed chunk files
+        self.sealed_rows = 0
+        self.game = 0
+        self.game_rows = 0  # points logged in the current game
+        self.rejected = 0  # points with a value their column can't hold
+        self.logged = deque(maxlen=1024)  # per recent point: whether it has a row (for undone)
+        self.dirty = False
+        os.makedirs(directory, exist_ok=True)
+        for name in self.chunk_names():
+            self.chunks += 1
+            with np.load(os.path.join(directory, name)) as data:
+                self.sealed_rows += len(data["time"])
+                self.game = max(self.game, int(data["game"].max(initial=-1)) + 1)
+        if os.path.exists(self.tail_path):
+            for name, column in read_chunk(self.tail_path).items():
+                self.rows[name] = column.tolist()
+            self.versions = [None] * len(self.rows["time"])
+            self.game = max([self.game] + [g + 1 for g in self.rows["game"]])
+
+    def chunk_names(self):
+        return sorted(name for name in os.listdir(self.directory) if name.startswith("chunk-") and name.endswith(".npz"))
+
+    # --- called by GameState -----------------------------------------
+
+    def scored(self, record):
+        """record: GameState's view of one point (see GameState.score).
+        A point with a number too big for its column is left out (and
+        counted), so it can't make every later flush fail."""
+        with self.lock:
+            row = dict(record, game=self.game, rally_s=float("nan"),
+                       p1_name=record["p1_name"][:NAME_CHARS], p2_name=record["p2_name"][:NAME_CHARS])
+            for name, dtype in COLUMNS.items():
+                if dtype[0] == "i" and not np.iinfo(dtype).min <= row[name] <= np.iinfo(dtype).max:
+                    self.rejected += 1
+                    self.logged.append(False)
+                    print(f"Point not logged: {name}={row[name]} doesn't fit {dtype}", flush=True)
+                    return
+            for name in COLUMNS:
+                self.rows[name].append(row[name])
+            self.versions.append(record["version"])
+            self.logged.append(True)
+            self.game_rows += 1
+            self.dirty = True
+
+    def undone(self, count):
+        with self.lock:
+            count = sum(self.logged.pop() for _ in range(min(count, len(self.logged))))
+            count = min(count, len(self.versions))
+            if count:
+                for column in self.rows.values():
+                    del column[-count:]
+                del self.versions[-count:]
+                self.game_rows = max(0, self.game_rows - count)
+                self.dirty = True
+
+    # --- called by the display (flush: off the game lock) ---------------
+
+    def set_rally(self, version, seconds):
+        """Fill in rally_s of the point that moved the game to version. The
+        points of one /commands batch share a version; they're filled in order."""
+        with self.lock:
+            rally_s = self.rows["rally_s"]
+            for i, v in enumerate(self.versions):
+                if v == version and rally_s[i] != rally_s[i]:  # still NaN
+                    rally_s[i] = seconds
+                    self.dirty = True
+                    return
+
+    def new_game(self):
+        """Points from here on get the next game number"""
+        with self.lock:
+            if self.game_rows:
+                self.game += 1
+                self.game_rows = 0
+
+    def flush(self):
+        """Write the tail to disk, sealing it as a chunk once it's full"""
+        with self.lock:
+            if not self.dirty:
+                return
+            columns = {name: np.array(values, dtype=COLUMNS[name]) for name, values in self.rows.items()}
+            rows = len(self.versions)
+            if rows >= CHUNK_ROWS:
+                write_chunk(os.path.join(self.directory, f"chunk-{self.chunks:06d}.npz"), columns)
+                self.chunks += 1
+                self.sealed_rows += rows
+                self.rows = {name: [] for name in COLUMNS}
+                self.versions = []
+                try:
+                    os.remove(self.tail_path)
+                except OSError:
+                    pass
+            else:
+                write_chunk(self.tail_path, columns)
+            self.dirty = False
+
+    # --- bulk export / import -----------------------------------------
+
+    def export(self):
+        """Generator of a zip with every chunk (tail last), one chunk at a time"""
+        self.flush()
+        with self.lock:
+            names = self.chunk_names() + (["tail.npz"] if os.path.exists(self.tail_path) else [])
+        out = ZipStream()
+        with zipfile.ZipFile(out, "w", zipfile.ZIP_STORED) as archive:  # .npz is compressed already
+            for name in names:
+                try:
+                    archive.write(os.path.join(self.directory, name), name)
+                except FileNotFoundError:
+                    continue  # the tail was sealed meanwhile; its rows are in the new chunk
+                yield out.take()
+        yield out.take()
+
+    def import_zip(self, source):
+        """Add the chunks of an export (path or seekable file). Returns rows added.
+        Raises ValueError, with nothing added, if any chunk is malformed."""
+        with zipfile.ZipFile(source) as archive:
+            names = sorted(name for name in archive.namelist() if name.endswith(".npz"))
+            # Check everything before adding anything
+            counts = []
+            first_game = None
+            for name in names:
+                with archive.open(name) as f:
+                    columns = read_chunk(io.BytesIO(f.read()))
+                counts.append(len(columns["time"]))
+                if counts[-1]:
+                    low = int(columns["game"].min())
+                    first_game = low if first_game is None else min(first_game, low)
+            self.flush()
+            with self.lock:
+                # Imported games are numbered from the current one on; the
+                # game being played (if started) moves after them
+                shift = self.game - (first_game or 0)
+                last_game = self.game - 1
+                for name, rows in zip(names, counts):
+                    if not rows:
+                        continue
+                    with archive.open(name) as f:
+                        columns = read_chunk(io.BytesIO(f.read()))
+                    columns["game"] = columns["game"] + shift
+                    last_game = max(last_game, int(columns["game"].max()))
+                    write_chunk(os.path.join(self.directory, f"chunk-{self.chunks:06d}.npz"), columns)
+                    self.chunks += 1
+                    self.sealed_rows += rows
+                if last_game >= self.game:
+                    self.rows["game"] = [last_game + 1 if g == self.game else g for g in self.rows["game"]]
+                    self.game = last_game + 1
+                    self.dirty = True
+        self.flush()
+        return sum(counts)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "points": self.sealed_rows + len(self.versions),
+                "chunks": self.chunks,
+                "tail": len(self.versions),
+                "game": self.game,
+                "rejected": self.rejected,
+            }
+
+
+def main():
+    if not available():
+        raise SystemExit("points.py needs numpy (pip3 install numpy)")
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    log = PointLog()
+    if command == "export":
+        path = sys.argv[2]
+        t0 = time.perf_counter()
+        with open(path, "wb") as f:
+            for data in log.export():
+                f.write(data)
+        print(f"Exported {log.stats()['points']} points to {path} in {time.perf_counter() - t0:.2f} s")
+    elif command == "import":
+        t0 = time.perf_counter()
+        rows = log.import_zip(sys.argv[2])
+        print(f"Imported {rows} points in {time.perf_counter() - t0:.2f} s")
+    else:
+        print(log.stats())
+
+
+if __name__ == "__main__":
+    main()
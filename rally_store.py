@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Rally store - Ping Pong Scorer
+Every saved rally is written to disk as its original JPEG frames back to
+back (<id>.mjpeg) plus a small JSON index of offsets and capture timestamps
+(<id>.json). Frames are read back through a memory map, so serving a rally
+costs page cache, not per-request copies. While a rally is played, a
+RallySpool per camera appends each new JPEG from the frame ring to a spool
+file, so the whole rally is on disk however far the ring has wrapped; saving
+it renames the spool into place on one background thread.
+"""
+import bisect
+import os
+import json
+import mmap
+import queue
+import threading
+import time
+
+RALLY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rallies")
+MAX_RALLIES = 500  # oldest rallies are deleted past this
+MAX_RALLY_BYTES = 4 * 1024 ** 3  # ... or once all their files take more than this
+SPOOL_POLL_S = 0.01  # how often a spool looks for new frames in its ring
+
+
+class Rally:
+    def __init__(self, rally_id, directory, frames=None, info=None):
+        self.id = rally_id
+        self.data_path = os.path.join(directory, f"{rally_id}.mjpeg")
+        self.index_path = os.path.join(directory, f"{rally_id}.json")
+        self.thumb_path = os.path.join(directory, f"{rally_id}.thumb.jpg")  # see thumbnails.py
+        self.sheet_path = os.path.join(directory, f"{rally_id}.sheet.jpg")
+        self.frames = frames or []  # (offset, length, timestamp)
+        self.info = info or {}
+        self.ring = None  # the ring it was saved from, and the seq of each frame:
+        self.seqs = []    # ring.surface(seq) skips decoding while the ring still has it
+        self.ready = threading.Event()
+        self.lock = threading.Lock()
+        self.map = None
+
+    @property
+    def duration(self):
+        if len(self.frames) < 2:
+            return 0.0
+        return self.frames[-1][2] - self.frames[0][2]
+
+    def frame(self, i):
+        """Zero-copy view of JPEG i from the memory-mapped rally file"""
+        if self.map is None:
+            with self.lock:
+                if self.map is None:
+                    with open(self.data_path, "rb") as f:
+                        self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        offset, length, _ = self.frames[i]
+        return memoryview(self.map)[offset:offset + length]
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "frames": len(self.frames),
+            "duration": round(self.duration, 2),
+            "ready": self.ready.is_set(),
+            **self.info,
+        }
+
+    def disk_bytes(self):
+        """Size of the rally's files (data, index, thumbnail, filmstrip)"""
+        total = 0
+        for path in (self.data_path, self.index_path, self.thumb_path, self.sheet_path):
+            try:
+                total += os.path.getsize(path)
+            except OSError:
+                pass
+        return total
+
+    def close(self):
+        with self.lock:
+            if self.map is not None:
+                try:
+                    self.map.close()
+                except BufferError:
+                    pass  # a viewer still holds a frame; freed with the last reference
+                self.map = None
+
+
+class RallyStore:
+    def __init__(self, directory=RALLY_DIR, max_rallies=MAX_RALLIES, max_bytes=MAX_RALLY_BYTES):
+        self.directory = directory
+        self.max_rallies = max_rallies
+        self.max_bytes = max_bytes
+        self.rallies = {}
+        self.next_id = 1
+        self.lock = threading.Lock()
+        self.loaded = False
+        self.jobs = queue.Queue()
+        self.writer = None
+        self.on_saved = None  # called with each Rally once it's on disk (writer thread)
+
+    def _load(self):
+        """Pick up rallies saved by earlier runs (first use only)"""
+        with self.lock:
+            if self.loaded:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            for name in os.listdir(self.directory):
+                if not name.endswith(".json"):
+                    continue
+                try:
+                    with open(os.path.join(self.directory, name)) as f:
+                        index = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                rally = Rally(index["id"], self.directory, [tuple(fr) for fr in index["frames"]], index.get("info"))
+                rally.ready.set()
+                self.rallies[rally.id] = rally
+            self.next_id = max(self.rallies, default=0) + 1
+            self.loaded = True
+
+    def spool(self, ring, name, max_seconds):
+        """Start a RallySpool for ring, spooling into this store's directory"""
+        self._load()
+        return RallySpool(ring, os.path.join(self.directory, f".spool-{name}.mjpeg"), max_seconds).start()
+
+    def archive(self, cut, info=None):
+        """Queue a RallySpool.cut() to be saved as a new rally. Returns the Rally."""
+        self._load()
+        with self.lock:
+            rally = Rally(self.next_id, self.directory, info=dict(info or {}, created=time.time()))
+            self.next_id += 1
+            self.rallies[rally.id] = rally
+            if self.writer is None:
+                self.writer = threading.Thread(target=self._write_loop, daemon=True)
+                self.writer.start()
+        self.jobs.put((rally, cut))
+        return rally
+
+    def _write_loop(self):
+        while True:
+            rally, cut = self.jobs.get()
+            try:
+                self._write(rally, cut)
+            except Exception as e:
+                print(f"Rally {rally.id} save failed: {e}", flush=True)
+            rally.ready.set()
+            if self.on_saved and rally.frames:
+                self.on_saved(rally)
+            self._prune()
+
+    def _write(self, rally, cut):
+        os.replace(cut.path, rally.data_path)
+        rally.frames = [frame[:3] for frame in cut.frames]
+        rally.ring, rally.seqs = cut.ring, [frame[3] for frame in cut.frames]
+        with open(rally.index_path, "w") as f:
+            json.dump({"id": rally.id, "frames": rally.frames, "info": rally.info}, f)
+        print(f"Archived rally {rally.id}: {len(rally.frames)} frames", flush=True)
+
+    def _prune(self):
+        """Delete the oldest rallies past max_rallies or max_bytes. The newest
+        one stays even if it alone is over max_bytes."""
+        with self.lock:
+            sizes = {rally_id: rally.disk_bytes() for rally_id, rally in self.rallies.items()}
+            total = sum(sizes.values())
+            while len(self.rallies) > self.max_rallies or (total > self.max_bytes and len(self.rallies) > 1):
+                rally = self.rallies.pop(min(self.rallies))
+                total -= sizes[rally.id]
+                rally.close()
+                for path in (rally.data_path, rally.index_path, rally.thumb_path, rally.sheet_path):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+
+    def get(self, rally_id):
+        self._load()
+        return self.rallies.get(rally_id)
+
+    def last(self, camera=None):
+        """Most recent rally, optionally only from one camera"""
+        self._load()
+        with self.lock:
+            for rally_id in sorted(self.rallies, reverse=True):
+                rally = self.rallies[rally_id]
+                if camera is None or rally.info.get("camera") == camera:
+                    return rally
+            return None
+
+    def list(self):
+        self._load()
+        with self.lock:
+            return [self.rallies[i] for i in sorted(self.rallies)]
+
+
+class SpoolCut:
+    """One rally cut from a spool: its file and (offset, length, timestamp,
+    ring seq, motion) per frame"""
+
+    def __init__(self, path, frames, ring):
+        self.path = path
+        self.frames = frames
+        self.ring = ring
+
+    @property
+    def times(self):
+        return [frame[2] for frame in self.frames]
+
+    @property
+    def motions(self):
+        return [frame[4] for frame in self.frames]
+
+
+class RallySpool:
+    """Copies each new JPEG of one frame ring to a spool file as it arrives.
+    A rally longer than max_seconds keeps its first max_seconds."""
+
+    def __init__(self, ring, path, max_seconds):
+        self.ring = ring
+        self.path = path
+        self.max_seconds = max_seconds
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.cuts = 0
+        self.dropped = 0  # frames the ring overwrote before they were copied
+        self._begin(ring.write_seq())
+
+    def _begin(self, seq, source=None, frames=()):
+        """New spool file going on from ring seq, starting with frames
+        (offset, length, ...) copied out of the file source"""
+        self.next_seq = seq
+        self.frames = []
+        self.times = []  # frame timestamps, for bisect (no key= before Python 3.10)
+        self.offset = 0
+        with open(self.path + ".next", "wb") as f:
+            if frames:
+                with open(source, "rb") as old:
+                    for offset, length, *rest in frames:
+                        old.seek(offset)
+                        f.write(old.read(length))
+                        self.frames.append((self.offset, length, *rest))
+                        self.times.append(rest[0])
+                        self.offset += length
+        os.replace(self.path + ".next", self.path)
+        self.file = open(self.path, "ab")
+
+    def start(self):
+        self.thread = threading.Thread(target=self._loop, name=f"spool {os.path.basename(self.path)}", daemon=True)
+        self.thread.start()
+        return self
+
+    def _loop(self):
+        while not self.stop_event.wait(SPOOL_POLL_S):
+            try:
+                self.copy_new()
+            except Exception as e:
+                print(f"Rally spool error: {e}", flush=True)
+
+    def copy_new(self):
+        """Append the frames written to the ring since the last call"""
+        ring = self.ring
+        end = ring.write_seq()
+        with self.lock:
+            if self.file.closed:
+                return
+            seq = max(self.next_seq, ring.oldest_seq())
+            self.dropped += seq - self.next_seq
+            for seq in range(seq, end):
+                ts = ring.timestamp(seq)
+                if ts is None:
+                    self.dropped += 1
+                    continue
+                if self.frames and ts - self.frames[0][2] > self.max_seconds:
+                    break  # full: the rest waits for the next rally
+                jpg = ring.jpeg(seq)
+                if jpg is None:
+                    continue  # kept decoded only (too big)
+                motion = ring.motion(seq)
+                data = bytes(jpg)
+                del jpg
+                if not ring.is_valid(seq):
+                    self.dropped += 1
+                    continue  # overwritten while we copied it
+                self.file.write(data)
+                self.frames.append((self.offset, len(data), ts, seq, motion or 0.0))
+                self.times.append(ts)
+                self.offset += len(data)
+            self.next_seq = end
+            self.file.flush()
+
+    def cut(self, until=None):
+        """End the rally at time.time() until (default: now). Returns a
+        SpoolCut of its frames (None if there were none); frames after until
+        start the next rally."""
+        self.copy_new()
+        with self.lock:
+            n = len(self.frames)
+            if until is not None:
+                n = bisect.bisect_right(self.times, until)
+            if not n:
+                return None
+            rally, rest = self.frames[:n], self.frames[n:]
+            self.file.close()
+            self.cuts += 1
+            path = f"{self.path}.{self.cuts}"
+            os.replace(self.path, path)
+            self._begin(self.next_seq, path, rest)
+            os.truncate(path, rally[-1][0] + rally[-1][1])  # without rest
+            return SpoolCut(path, rally, self.ring)
+
+    def restart(self):
+        """Drop what's spooled; the next rally starts at the newest frame"""
+        with self.lock:
+            self.file.close()
+            self._begin(self.ring.write_seq())
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=1)
+        with self.lock:
+            self.file.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
@@ -0,0 +1,120 @@
+// Ping Pong Remote. The page itself is static and cached; names and score
+// come from /status, which is long-polled so the buttons follow the table.
+
+// Taps show up straight away: the page keeps a copy of the scoring rules
+// (game_state.py) and draws the last state the server confirmed with the
+// unconfirmed commands replayed on top. Commands are numbered per phone and
+// go out as one /commands batch per round trip; a batch that gets no reply is
+// resent as-is, the ids make that safe. Whenever the server's state arrives
+// the prediction is rebuilt from it, so a point scored on the table or a tap
+// the server didn't take corrects the screen instead of drifting from it.
+const client = localStorage.client || (localStorage.client = Math.random().toString(36).slice(2));
+let next = Number(localStorage.nextCommand || 0), queue = [], inflight = null;
+let confirmed = null, shown = null, guessed = false;
+
+function show(text) { document.getElementById('status').textContent = text; }
+
+function showState(d) {
+    document.getElementById('p1').textContent = d.p1_name;
+    document.getElementById('p2').textContent = d.p2_name;
+    show(d.p1_name + ' ' + d.p1_score + ' - ' + d.p2_score + ' ' + d.p2_name);
+}
+
+// GameState.score/undo/reset/set_server on a plain copy of the state.
+// history only holds points scored in this prediction, so an undo reaching
+// further back can't be predicted and waits for the server.
+function step(s, c, history) {
+    if (c.type == 'score') {
+        if (s.game_over || !s.game_started) return;
+        history.push([s.p1_score, s.p2_score, s.serving, s.points_serve]);
+        if (c.player == 1) s.p1_score++; else s.p2_score++;
+        s.points_serve++;
+        const deuce = s.p1_score >= s.points_to_win - 1 && s.p2_score >= s.points_to_win - 1;
+        if (s.points_serve >= (deuce ? 1 : s.serves_per_turn)) {
+            s.serving = s.serving == 1 ? 2 : 1;
+            s.points_serve = 0;
+        }
+        if ((s.p1_score >= s.points_to_win || s.p2_score >= s.points_to_win) &&
+            Math.abs(s.p1_score - s.p2_score) >= 2) s.game_over = true;
+    } else if (c.type == 'undo') {
+        if (!s.game_started) return;
+        let undone = 0;
+        while (undone < (c.count || 1) && history.length) {
+            [s.p1_score, s.p2_score, s.serving, s.points_serve] = history.pop();
+            undone++;
+        }
+        if (undone) s.game_over = false;
+    } else if (c.type == 'reset') {
+        s.p1_score = s.p2_score = s.points_serve = 0;
+        s.serving = s.first_server;
+        s.game_over = false;
+        history.length = 0;
+    } else if (c.type == 'set-server') {
+        s.serving = c.player;
+        s.points_serve = 0;
+    }
+}
+
+function render() {
+    if (!confirmed) return;
+    const s = Object.assign({}, confirmed), history = [];
+    const pending = (inflight || []).concat(queue);
+    pending.forEach(c => step(s, c, history));
+    const status = document.getElementById('status');
+    status.classList.toggle('pending', pending.length > 0);
+    // Rolled back: the server settled on something other than our guess,
+    // e.g. the game was over or a point was scored on the table meanwhile
+    if (guessed && !pending.length && (shown.p1_score != s.p1_score || shown.p2_score != s.p2_score)) {
+        status.classList.add('corrected');
+        setTimeout(() => status.classList.remove('corrected'), 600);
+    }
+    shown = s;
+    guessed = pending.length > 0;
+    showState(s);
+}
+
+function send(type, player) {
+    localStorage.nextCommand = ++next;
+    queue.push({id: client + '-' + next, type: type, player: player});
+    render();
+    flush();
+}
+
+function score(p) { send('score', p); }
+
+function flush() {
+    if (inflight || !queue.length) return;
+    inflight = queue.splice(0);
+    fetch('/commands', {method:'POST', headers:{'Content-Type':'application/json'},
+                        body: JSON.stringify({client: client, commands: inflight})})
+        .then(r => r.json())
+        .then(d => {
+            inflight = null;
+            // The reply is the state just after this batch: the new base
+            if (d.status == 'ok') { confirmed = d; render(); } else show(d.message);
+            flush();
+        })
+        .catch(() => {
+            queue = inflight.concat(queue); inflight = null;
+            show('Reconnecting...');
+            setTimeout(flush, 1000);
+        });
+}
+
+// Follow the table: each request returns as soon as the version moves on.
+// While a batch is in flight its reply is the next base, so pushes wait.
+function watch(version) {
+    fetch('/status' + (version === undefined ? '' : '?wait=' + version))
+        .then(r => r.json())
+        .then(d => {
+            // Older than what we have only after a restart (or a wait that timed out)
+            if (!inflight && (!confirmed || d.version >= confirmed.version || d.version <= version)) {
+                confirmed = d;
+                render();
+            }
+            watch(d.version);
+        })
+        .catch(() => setTimeout(() => watch(version), 2000));
+}
+
+watch();
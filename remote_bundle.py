@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Remote page bundle - Ping Pong Scorer
+The phone remote is static files in remote/. They are read and compressed
+once (gzip, plus brotli when the brotli module is installed). Scripts and
+styles get a content hash in their name and a one-year immutable cache
+header; index.html keeps its name, is revalidated by ETag and points at the
+hashed names - so a phone downloads the page once and after that only sends
+a conditional request for the small index.
+No Flask in here - respond() returns a (body, status, headers) tuple.
+"""
+import os
+import gzip
+import hashlib
+
+from status_cache import etag_matches
+
+REMOTE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "remote")
+INDEX = "index.html"
+IMMUTABLE = "public, max-age=31536000, immutable"
+CONTENT_TYPES = {
+    ".html": "text/html; charset=utf-8",
+    ".js": "text/javascript; charset=utf-8",
+    ".css": "text/css; charset=utf-8",
+    ".svg": "image/svg+xml",
+    ".png": "image/png",
+    ".ico": "image/x-icon",
+}
+COMPRESSIBLE = (".html", ".js", ".css", ".svg")
+
+
+class Asset:
+    def __init__(self, name, body, cache_control):
+        self.name = name
+        self.content_type = CONTENT_TYPES.get(os.path.splitext(name)[1], "application/octet-stream")
+        self.cache_control = cache_control
+        self.etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+        # Encoding -> body, best first
+        self.bodies = {}
+        if name.endswith(COMPRESSIBLE):
+            try:
+                import brotli
+                self.bodies["br"] = brotli.compress(body, quality=11)
+            except ImportError:
+                pass
+            self.bodies["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+        self.bodies["identity"] = body
+
+    def pick(self, accept_encoding):
+        accepted = {part.split(";")[0].strip() for part in (accept_encoding or "").split(",")}
+        for encoding, body in self.bodies.items():
+            if encoding in accepted or encoding == "identity":
+                return encoding, body
+
+
+class RemoteBundle:
+    def __init__(self, directory=REMOTE_DIR):
+        self.assets = {}  # URL name -> Asset
+        renames = {}
+        for name in sorted(os.listdir(directory)):
+            if name == INDEX or name.startswith("."):
+                continue
+            with open(os.path.join(directory, name), "rb") as f:
+                body = f.read()
+            stem, ext = os.path.splitext(name)
+            hashed = f"{stem}.{hashlib.sha256(body).hexdigest()[:10]}{ext}"
+            renames[name] = hashed
+            self.assets[hashed] = Asset(hashed, body, IMMUTABLE)
+        with open(os.path.join(directory, INDEX), encoding="utf-8") as f:
+            index = f.read()
+        for name, hashed in renames.items():
+            index = index.replace(f'"{name}"', f'"/remote/{hashed}"')
+        self.assets[INDEX] = Asset(INDEX, index.encode(), "no-cache")
+
+    def respond(self, name, headers):
+        """headers: request headers (anything with .get)"""
+        asset = self.assets.get(name)
+        if asset is None:
+            return b"Not found", 404, {"Content-Type": "text/plain"}
+        reply_headers = {"ETag": asset.etag, "Cache-Control": asset.cache_control, "Vary": "Accept-Encoding"}
+        if etag_matches(headers.get("If-None-Match"), asset.etag):
+            return b"", 304, reply_headers
+        encoding, body = asset.pick(headers.get("Accept-Encoding"))
+        reply_headers["Content-Type"] = asset.content_type
+        if encoding != "identity":
+            reply_headers["Content-Encoding"] = encoding
+        return body, 200, reply_headers
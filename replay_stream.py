@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+MJPEG replay streaming - Ping Pong Scorer
+Streams a stored rally to browsers as multipart/x-mixed-replace, paced by
+the frames' capture timestamps. Each rally being watched has one producer
+thread moving a shared cursor: it reads the stored JPEG from the rally's
+memory map (no re-encode) into one multipart chunk, and every viewer sends
+that same bytes object. A slow viewer skips frames instead of queueing
+them, so memory stays flat no matter how many phones are watching. If the
+rally can't be read any more (pruned, I/O error) the producer ends every
+viewer's stream instead of leaving them waiting.
+"""
+import threading
+import time
+
+BOUNDARY = "frame"
+MAX_GAP_S = 0.5     # cap on the pause between frames (capture hiccups)
+LOOP_PAUSE_S = 1.0  # pause before the rally starts over
+IDLE_WAIT_S = 5.0
+
+
+class RallyBroadcast:
+    """One paced cursor over a rally, shared by all its viewers"""
+
+    def __init__(self, rally):
+        self.rally = rally
+        self.cond = threading.Condition()
+        self.cursor = 0
+        self.chunk = b""  # multipart chunk of the frame under the cursor (None: stream ended)
+        self.tick = 0  # bumped each time the cursor moves
+        self.viewers = 0
+        self.producer = None
+
+    def _produce(self):
+        try:
+            self._play()
+        except Exception as e:
+            print(f"Replay stream of rally {self.rally.id} failed: {e}", flush=True)
+            with self.cond:
+                self.producer = None
+                self.chunk = None
+                self.tick += 1
+                self.cond.notify_all()
+
+    def _play(self):
+        frames = self.rally.frames
+        i = 0
+        while True:
+            # WSGI servers want bytes, so build the chunk once for everybody
+            frame = self.rally.frame(i)
+            chunk = b"".join((
+                f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(frame)}\r\n\r\n".encode(),
+                frame,
+                b"\r\n",
+            ))
+            del frame
+            with self.cond:
+                if self.viewers == 0:
+                    self.producer = None
+                    return
+                self.cursor = i
+                self.chunk = chunk
+                self.tick += 1
+                self.cond.notify_all()
+            if i + 1 < len(frames):
+                gap = min(MAX_GAP_S, max(0.0, frames[i + 1][2] - frames[i][2]))
+                i += 1
+            else:
+                gap = LOOP_PAUSE_S
+                i = 0
+            time.sleep(gap)
+
+    def viewer(self):
+        """Generator of multipart chunks for one HTTP response"""
+        with self.cond:
+            self.viewers += 1
+            if self.producer is None:
+                self.producer = threading.Thread(target=self._produce, daemon=True)
+                self.producer.start()
+            seen = self.tick
+        try:
+            while True:
+                with self.cond:
+                    if not self.cond.wait_for(lambda: self.tick != seen, timeout=IDLE_WAIT_S):
+                        continue
+                    seen = self.tick
+                    chunk = self.chunk
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            with self.cond:
+                self.viewers -= 1
+
+
+class ReplayStreamer:
+    def __init__(self):
+        self.broadcasts = {}
+        self.lock = threading.Lock()
+
+    def stream(self, rally):
+        with self.lock:
+            broadcast = self.broadcasts.get(rally.id)
+            if broadcast is None or broadcast.rally is not rally:
+                broadcast = RallyBroadcast(rally)
+                self.broadcasts[rally.id] = broadcast
+        return self._watch(broadcast)
+
+    def _watch(self, broadcast):
+        try:
+            yield from broadcast.viewer()
+        finally:
+            # Forget the rally once nobody watches it
+            with self.lock:
+                with broadcast.cond:
+                    idle = broadcast.viewers == 0
+                if idle and self.broadcasts.get(broadcast.rally.id) is broadcast:
+                    del self.broadcasts[broadcast.rally.id]
+
+    def viewer_count(self):
+        with self.lock:
+            return sum(b.viewers for b in self.broadcasts.values())
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Scoreboard images - Ping Pong Scorer
+Renders the score offscreen for stream overlays: names, scores and who is
+serving at any requested size, as an opaque PNG/JPEG or a PNG with a
+transparent background. Encoded images are cached per (state version,
+size, kind), so any number of overlays refreshing the same score cost one
+render per point.
+"""
+import io
+import threading
+
+import pygame
+
+# Same palette as the display
+C_P1_BG = (128, 0, 128)
+C_P2_BG = (255, 20, 147)
+C_WHITE = (255, 255, 255)
+C_GOLD = (255, 215, 0)
+OVERLAY_ALPHA = 190  # player panels on the transparent variant
+
+DEFAULT_SIZE = (640, 120)
+MIN_SIZE = (64, 24)
+MAX_SIZE = (3840, 2160)
+MAX_CACHED = 16  # (size, kind) entries kept for the current version
+
+
+def clamp_size(width, height):
+    return (min(MAX_SIZE[0], max(MIN_SIZE[0], width)), min(MAX_SIZE[1], max(MIN_SIZE[1], height)))
+
+
+class ScoreboardRenderer:
+    def __init__(self, game):
+        self.game = game
+        self.lock = threading.Lock()  # pygame fonts aren't safe to share between threads
+        self.fonts = {}
+        self.version = None
+        self.cache = {}  # (size, kind) -> bytes, for self.version only
+        self.renders = 0
+
+    def font(self, px):
+        font = self.fonts.get(px)
+        if font is None:
+            font = self.fonts[px] = pygame.font.Font(None, px)
+        return font
+
+    def render(self, state, size, transparent=False):
+        """One frame of the scoreboard as a Surface: a half per player,
+        name on the left, score on the right, a dot for the server"""
+        width, height = size
+        flags = pygame.SRCALPHA if transparent else 0
+        surface = pygame.Surface(size, flags)
+        half = width // 2
+        name_font = self.font(max(8, int(height * 0.38)))
+        score_font = self.font(max(8, int(height * 0.85)))
+        pad = max(2, height // 10)
+        for player, x, color in ((1, 0, C_P1_BG), (2, half, C_P2_BG)):
+            panel = pygame.Rect(x, 0, width - half if player == 2 else half, height)
+            surface.fill(color + ((OVERLAY_ALPHA,) if transparent else ()), panel)
+            won = state["game_over"] and state[f"p{player}_score"] > state[f"p{3 - player}_score"]
+            text_color = C_GOLD if won else C_WHITE
+
+            score = score_font.render(str(state[f"p{player}_score"]), True, text_color)
+            surface.blit(score, (panel.right - pad - score.get_width(), panel.centery - score.get_height() // 2))
+
+            dot = max(3, height // 12)
+            name_x = panel.x + pad
+            if state["serving"] == player and not state["game_over"]:
+                pygame.draw.circle(surface, C_GOLD, (name_x + dot, panel.centery), dot)
+                name_x += dot * 3
+            name = name_font.render(state[f"p{player}_name"].upper(), True, text_color)
+            # Long names are cut rather than running into the score
+            room = panel.right - pad * 2 - score.get_width() - name_x
+            surface.blit(name, (name_x, panel.centery - name.get_height() // 2), pygame.Rect(0, 0, max(0, room), name.get_height()))
+        return surface
+
+    def image(self, size, kind="png"):
+        """(version, bytes) of the current scoreboard. kind: 'png', 'overlay' (transparent PNG) or 'jpeg'"""
+        state = self.game.to_dict()
+        key = (size, kind)
+        with self.lock:
+            if state["version"] != self.version:
+                self.version = state["version"]
+                self.cache = {}
+            data = self.cache.get(key)
+            if data is None:
+                surface = self.render(state, size, transparent=(kind == "overlay"))
+                out = io.BytesIO()
+                pygame.image.save(surface, out, "scoreboard.jpg" if kind == "jpeg" else "scoreboard.png")
+                data = out.getvalue()
+                if len(self.cache) >= MAX_CACHED:
+                    self.cache.pop(next(iter(self.cache)))
+                self.cache[key] = data
+                self.renders += 1
+            return state["version"], data
@@ -9,7 +9,7 @@ sudo apt update
 
 # Install system dependencies
 echo "Installing system dependencies..."
-sudo apt install -y python3-pygame python3-flask alsa-utils
+sudo apt install -y python3-pygame python3-flask python3-pil alsa-utils
 
 # Make the main script executable
 chmod +x ping_pong_scorer.py
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Status responses - Ping Pong Scorer
+/status for clients that poll: ESP32 scoreboards, shell scripts, phones.
+The JSON body is serialized once per game version and shared by every
+poller. The ETag is the version, so an unchanged score costs a 304 with no
+body, and ?wait=<version> parks the request on the game's condition until
+the score moves past that version (or LONG_POLL_MAX_S passes).
+No Flask in here - respond() returns a (body, status, headers) tuple.
+"""
+import json
+import math
+import time
+
+LONG_POLL_MAX_S = 25.0  # under the usual 30 s proxy/client timeouts
+
+
+class StatusCache:
+    def __init__(self, game, render=dict):
+        """render: GameState.to_dict() result -> JSON-able status body"""
+        self.game = game
+        self.render = render
+        # Versions restart at 0 with the process; keep old ETags from matching
+        self.epoch = format(int(time.time() * 1000), "x")
+        self.entry = None  # (version, body bytes, etag)
+
+    def get(self):
+        """(version, body, etag) for the current state, serialized at most once per version"""
+        state = self.game.to_dict()
+        entry = self.entry
+        if entry is None or entry[0] != state["version"]:
+            body = json.dumps(self.render(state)).encode()
+            entry = (state["version"], body, f'"{self.epoch}-{state["version"]}"')
+            self.entry = entry  # two threads racing here just both serialize once
+        return entry
+
+    def respond(self, args, headers, max_wait=LONG_POLL_MAX_S):
+        """args/headers: request query args and headers (anything with .get)"""
+        wait = args.get("wait")
+        if wait is not None:
+            try:
+                since = int(wait)
+            except ValueError:
+                return json.dumps({"status": "error", "message": "wait must be a version number"}), 400, \
+                    {"Content-Type": "application/json"}
+            self.game.wait_for_version(since, wait_timeout(args.get("timeout"), max_wait))
+        _, body, etag = self.get()
+        reply_headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag_matches(headers.get("If-None-Match"), etag):
+            return b"", 304, reply_headers
+        reply_headers["Content-Type"] = "application/json"
+        return body, 200, reply_headers
+
+
+def wait_timeout(value, max_wait):
+    """?timeout= as seconds in [0, max_wait]; max_wait if missing, unparsable,
+    NaN or infinite (a NaN timeout would never expire)"""
+    try:
+        timeout = float(value)
+    except (TypeError, ValueError):
+        return max_wait
+    if not math.isfinite(timeout):
+        return max_wait
+    return min(max(timeout, 0.0), max_wait)
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Rally thumbnails - Ping Pong Scorer
+Each saved rally gets a poster (<id>.thumb.jpg, the middle of the rally) and
+a filmstrip contact sheet (<id>.sheet.jpg, SHEET_FRAMES frames across it)
+next to its frames in the rally directory. They are made once, on a single
+low-priority background thread, from a handful of frames sampled out of the
+stored JPEGs - the capture rings are never touched. With Pillow installed
+the sampled JPEGs are decoded straight at reduced size (libjpeg's 1/2, 1/4,
+1/8 scaling); it's in requirements.txt and setup.sh, and only if it's
+missing does pygame decode them in full and scale down.
+"""
+import io
+import os
+import queue
+import threading
+import time
+
+import pygame
+
+from exporter import jpeg_size
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+THUMB_WIDTH = 320
+TILE_WIDTH = 160
+SHEET_FRAMES = 8
+SHEET_GAP = 2
+SHEET_BG = (30, 20, 40)
+JPEG_QUALITY = 80  # Pillow only; pygame uses its own
+THUMB_NICE = 10    # per-thread on Linux
+
+
+def reduced_decode():
+    """Whether decode_small decodes fewer pixels (needs Pillow) or decodes
+    the whole JPEG and scales it"""
+    return Image is not None
+
+
+def scaled_size(size, width):
+    return width, max(1, round(size[1] * width / size[0]))
+
+
+def decode_small(jpeg, size):
+    """Surface of size from JPEG bytes, decoding no more pixels than needed"""
+    if Image is not None:
+        image = Image.open(io.BytesIO(jpeg))
+        image.draft("RGB", size)  # picks the smallest DCT scale still >= size
+        image = image.convert("RGB")
+        surface = pygame.image.frombuffer(image.tobytes(), image.size, "RGB")
+    else:
+        surface = pygame.image.load(io.BytesIO(jpeg), "frame.jpg")
+    if surface.get_size() == size:
+        return surface
+    if surface.get_bitsize() not in (24, 32):
+        surface = surface.convert(24)
+    return pygame.transform.smoothscale(surface, size)
+
+
+def save_jpeg(surface, path):
+    """Write surface to path atomically"""
+    tmp = path + ".tmp.jpg"  # pygame picks the format from the extension
+    if Image is not None:
+        image = Image.frombytes("RGB", surface.get_size(), pygame.image.tobytes(surface, "RGB"))
+        image.save(tmp, "JPEG", quality=JPEG_QUALITY)
+    else:
+        pygame.image.save(surface, tmp)
+    os.replace(tmp, path)
+
+
+def sample_indices(count, samples=SHEET_FRAMES):
+    """Frame numbers spread evenly over a rally of count frames"""
+    return sorted({int((i + 0.5) * count / samples) for i in range(min(samples, count))})
+
+
+class ThumbnailMaker:
+    def __init__(self):
+        self.jobs = queue.Queue()
+        self.pending = {}  # rally id -> Event set when its images are done
+        self.lock = threading.Lock()
+        self.thread = None
+        self.made = 0
+        self.failed = 0
+        self.ms_total = 0.0
+
+    def ready(self, rally):
+        return os.path.exists(rally.thumb_path) and os.path.exists(rally.sheet_path)
+
+    def submit(self, rally):
+        """Queue rally's poster and sheet (once). Returns an Event set when they're done."""
+        with self.lock:
+            done = self.pending.get(rally.id)
+            if done is None:
+                done = self.pending[rally.id] = threading.Event()
+                self.jobs.put(rally)
+                if self.thread is None:
+                    self.thread = threading.Thread(target=self._loop, name="thumbnails", daemon=True)
+                    self.thread.start()
+        return done
+
+    def path(self, rally, kind, timeout=5.0):
+        """Path of rally's 'thumb' or 'sheet' image, made first if needed (None if it couldn't be)"""
+        path = rally.thumb_path if kind == "thumb" else rally.sheet_path
+        if not os.path.exists(path):
+            self.submit(rally).wait(timeout)
+        return path if os.path.exists(path) else None
+
+    def _loop(self):
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), THUMB_NICE)
+        except (AttributeError, OSError):
+            pass
+        while True:
+            rally = self.jobs.get()
+            try:
+                if not self.ready(rally):
+                    t0 = time.perf_counter()
+                    self.make(rally)
+                    self.ms_total += (time.perf_counter() - t0) * 1000
+                    self.made += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"Thumbnails for rally {rally.id} failed: {e}", flush=True)
+            with self.lock:
+                self.pending.pop(rally.id).set()
+
+    def make(self, rally):
+        rally.ready.wait()
+        if not rally.frames:
+            return
+        indices = sample_indices(len(rally.frames))
+        first = bytes(rally.frame(indices[0]))
+        thumb_size = scaled_size(jpeg_size(first), THUMB_WIDTH)
+        tile_size = scaled_size(thumb_size, TILE_WIDTH)
+
+        sheet = pygame.Surface(((tile_size[0] + SHEET_GAP) * len(indices) + SHEET_GAP, tile_size[1] + 2 * SHEET_GAP))
+        sheet.fill(SHEET_BG)
+        poster = None
+        for n, i in enumerate(indices):
+            frame = decode_small(first if n == 0 else bytes(rally.frame(i)), thumb_size)
+            if n == len(indices) // 2:
+                poster = frame
+            sheet.blit(pygame.transform.smoothscale(frame, tile_size), (SHEET_GAP + n * (tile_size[0] + SHEET_GAP), SHEET_GAP))
+        save_jpeg(sheet, rally.sheet_path)
+        save_jpeg(poster, rally.thumb_path)  # last: ready() means both exist
+
+    def stats(self):
+        return {
+            "made": self.made,
+            "failed": self.failed,
+            "queued": self.jobs.qsize(),
+            "ms_avg": round(self.ms_total / self.made, 1) if self.made else None,
+            "reduced_decode": reduced_decode(),
+        }
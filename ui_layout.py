@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+UI Layout - Ping Pong Scorer
+Widgets are laid out once per screen size with their labels pre-rendered.
+A Layout keeps its own surface and only redraws the widgets whose selected
+state changed; clicks go through a grid index straight to the widget's
+handler instead of scanning every button.
+"""
+from abc import ABC, abstractmethod
+
+import pygame
+
+GRID_CELL = 64  # px per grid index cell
+
+
+class Widget(ABC):
+    """A clickable rectangle. Clicking calls on_click(value).
+    If group is set, the widget is selected when selections[group] == value."""
+
+    def __init__(self, rect, on_click=None, value=None, group=None):
+        self.rect = pygame.Rect(rect)
+        self.on_click = on_click
+        self.value = value
+        self.group = group
+        self.drawn_selected = None  # state currently on the layout surface
+
+    def is_selected(self, selections):
+        return self.group is not None and selections.get(self.group) == self.value
+
+    @abstractmethod
+    def render(self, surface, selected):
+        """Draw the widget on surface in its selected or idle state"""
+
+
+class Button(Widget):
+    """Toggle button (filled when selected, outlined otherwise) or a solid one"""
+
+    def __init__(self, rect, label, font, color, text_color, idle_color, solid=False, radius=8, **kwargs):
+        super().__init__(rect, **kwargs)
+        self.color = color
+        self.idle_color = idle_color
+        self.solid = solid
+        self.radius = radius
+        # Label for each state, rendered once
+        self.labels = {True: font.render(label, True, text_color)}
+        if not solid:
+            self.labels[False] = font.render(label, True, color)
+
+    def render(self, surface, selected):
+        selected = selected or self.solid
+        if selected:
+            pygame.draw.rect(surface, self.color, self.rect, border_radius=self.radius)
+        else:
+            pygame.draw.rect(surface, self.idle_color, self.rect, border_radius=self.radius)
+            pygame.draw.rect(surface, self.color, self.rect, 3, border_radius=self.radius)
+        txt = self.labels[selected]
+        surface.blit(txt, (self.rect.centerx - txt.get_width()//2, self.rect.centery - txt.get_height()//2))
+
+
+class Checkbox(Widget):
+    def __init__(self, rect, color, **kwargs):
+        super().__init__(rect, **kwargs)
+        self.color = color
+
+    def render(self, surface, selected):
+        pygame.draw.rect(surface, self.color, self.rect, 3, border_radius=4)
+        if selected:
+            pygame.draw.rect(surface, self.color, self.rect.inflate(-8, -8), border_radius=2)
+
+
+class GridIndex:
+    """Cell -> widgets overlapping it, so a hit test only looks at a handful"""
+
+    def __init__(self, cell=GRID_CELL):
+        self.cell = cell
+        self.cells = {}
+
+    def add(self, widget):
+        r = widget.rect
+        for cx in range(r.left // self.cell, (r.right - 1) // self.cell + 1):
+            for cy in range(r.top // self.cell, (r.bottom - 1) // self.cell + 1):
+                self.cells.setdefault((cx, cy), []).append(widget)
+
+    def hit(self, pos):
+        for widget in self.cells.get((pos[0] // self.cell, pos[1] // self.cell), ()):
+            if widget.rect.collidepoint(pos):
+                return widget
+        return None
+
+
+class Layout:
+    """Widgets for one screen at one size.
+    background: static surface (titles, labels) the widgets are drawn over,
+    or None for overlays drawn on top of whatever is already on screen."""
+
+    def __init__(self, size, background=None):
+        self.size = size
+        self.background = background
+        self.surface = None  # background + widgets, made on first draw
+        self.widgets = []
+        self.index = GridIndex()
+
+    def add(self, widget):
+        self.widgets.append(widget)
+        self.index.add(widget)
+        return widget
+
+    def draw(self, screen, selections=None):
+        selections = selections or {}
+        if self.background is None:
+            # Overlay: nothing to cache, draw every widget on the screen
+            for widget in self.widgets:
+                widget.render(screen, widget.is_selected(selections))
+            return
+        if self.surface is None:
+            self.surface = self.background.copy()
+        for widget in self.widgets:
+            selected = widget.is_selected(selections)
+            if selected != widget.drawn_selected:
+                self.surface.blit(self.background, widget.rect, widget.rect)
+                widget.render(self.surface, selected)
+                widget.drawn_selected = selected
+        screen.blit(self.surface, (0, 0))
+
+    def click(self, pos):
+        """Run the handler of the widget under pos. Returns the widget or None."""
+        widget = self.index.hit(pos)
+        if widget and widget.on_click:
+            widget.on_click(widget.value)
+        return widget